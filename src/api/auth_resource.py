@@ -1,9 +1,9 @@
-from werkzeug.security import generate_password_hash, check_password_hash
 from flask_restful import Resource
 from api.middleware.auth import role_required
 from flask import request
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt
-from api.extensions import db
+from api.extensions import db, hasher
+from api.hashing import HashPoolSaturated
 from api.models import User
 import re
 
@@ -48,7 +48,10 @@ class AuthResource(Resource):
             if data.get("role") not in [0, 1]:
                 return {"message": "Rol inválido"}, 400
 
-            hashed_password = generate_password_hash(data["password"], method="pbkdf2:sha256")
+            try:
+                hashed_password = hasher.generate_password_hash(data["password"])
+            except HashPoolSaturated:
+                return {"message": "Servicio ocupado, intenta de nuevo"}, 503, {"Retry-After": "1"}
             nuevo_usuario = User(
                 name=data["name"],
                 lstF=data["lstF"],
@@ -73,7 +76,11 @@ class AuthResource(Resource):
                 return {"message": f"Los siguientes campos son requeridos: {', '.join(missing_fields)}"}, 400
             
             usuario = User.query.filter_by(email=data["email"]).first()
-            if not usuario or not check_password_hash(usuario.password, data["password"]):
+            try:
+                valid = usuario is not None and hasher.check_password_hash(usuario.password, data["password"])
+            except HashPoolSaturated:
+                return {"message": "Servicio ocupado, intenta de nuevo"}, 503, {"Retry-After": "1"}
+            if not valid:
                 return {"message": "Credenciales incorrectas"}, 401
 
             # Usar email como identity y pasar otros datos en additional_claims
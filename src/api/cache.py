@@ -0,0 +1,149 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from functools import wraps
+from urllib.parse import urlencode
+
+from flask import current_app, g, request
+from flask_restful.utils import unpack
+
+
+class CacheBackend:
+    """Interfaz mínima de un backend de caché; los valores deben poder serializarse (pickle).
+
+    Para compartir la caché entre procesos basta con implementarla sobre Redis/Memcached
+    y pasarla en ``RESPONSE_CACHE_BACKEND``.
+    """
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def set(self, key, value, ttl=None):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+
+class MemoryCache(CacheBackend):
+    """Caché en proceso con TTL por entrada y desalojo LRU al superar ``maxsize``."""
+
+    def __init__(self, maxsize=1024, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and self.clock() >= expires_at:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = self.clock() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class ResponseCache:
+    """Caché de respuestas GET por ruta + query string, invalidada por espacios de nombres.
+
+    Cada espacio ("products", "categories", ...) tiene una generación; la llave de una respuesta
+    incluye las generaciones de los espacios de los que depende, así que invalidar es cambiar
+    una generación (O(1)) y las entradas viejas simplemente dejan de ser alcanzables.
+    Solo se activa en las apps que llaman a ``init_app``.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("RESPONSE_CACHE_TTL", 60)
+        app.config.setdefault("RESPONSE_CACHE_MAXSIZE", 1024)
+        app.config.setdefault("RESPONSE_CACHE_BACKEND", None)
+        backend = app.config["RESPONSE_CACHE_BACKEND"] or MemoryCache(app.config["RESPONSE_CACHE_MAXSIZE"])
+        app.extensions["response_cache"] = backend
+
+    @staticmethod
+    def backend():
+        return current_app.extensions.get("response_cache")
+
+    @staticmethod
+    def generation(backend, namespace):
+        key = f"gen:{namespace}"
+        value = backend.get(key)
+        if value is None:
+            # Generación aleatoria: si se pierde (desalojo/reinicio) nunca revive entradas viejas
+            value = uuid.uuid4().hex
+            backend.set(key, value)
+        return value
+
+    def invalidate(self, *namespaces):
+        backend = self.backend()
+        if backend is None:
+            return
+        for namespace in namespaces:
+            backend.set(f"gen:{namespace}", uuid.uuid4().hex)
+
+    def request_key(self, backend, namespaces):
+        generations = ",".join(self.generation(backend, namespace) for namespace in namespaces)
+        # Con @conditional la llave incluye la versión de la base: las escrituras de otros procesos
+        # (otros workers, checkout-worker) dejan de servir el cuerpo viejo aunque no invaliden aquí
+        version = g.get("response_version", "")
+        query = urlencode(sorted(request.args.items(multi=True)))
+        return f"resp:{generations}:{version}:{request.path}?{query}"
+
+    def cached(self, namespace, depends_on=()):
+        """Cachea las respuestas 200 del GET decorado; ponerlo debajo de ``@jwt_required()``."""
+        namespaces = (namespace,) + tuple(depends_on)
+
+        def decorator(fn):
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                backend = self.backend()
+                if backend is None:
+                    return fn(*args, **kwargs)
+                key = self.request_key(backend, namespaces)
+                hit = backend.get(key)
+                if hit is not None:
+                    data, code, headers = hit
+                    return data, code, dict(headers, **{"X-Cache": "HIT"})
+
+                data, code, headers = unpack(fn(*args, **kwargs))
+                if code == 200:
+                    backend.set(key, (data, code, dict(headers or {})), current_app.config["RESPONSE_CACHE_TTL"])
+                return data, code, dict(headers or {}, **{"X-Cache": "MISS"})
+            return wrapper
+        return decorator
+
+    def invalidates(self, *namespaces):
+        """Invalida ``namespaces`` cuando el método de escritura decorado termina sin error."""
+        def decorator(fn):
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                response = fn(*args, **kwargs)
+                code = getattr(response, "status_code", None) or unpack(response)[1]
+                if code < 400:
+                    self.invalidate(*namespaces)
+                return response
+            return wrapper
+        return decorator
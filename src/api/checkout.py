@@ -0,0 +1,197 @@
+import json
+import logging
+from datetime import timedelta
+
+from flask import current_app
+from sqlalchemy import and_, insert, or_, select, update
+from sqlalchemy.exc import OperationalError
+
+from api.extensions import db, response_cache
+from api.models import Cart, CheckoutJob, Order, OrderProduct, Product, utcnow
+from api.rollups import record_sales
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+
+
+class OutOfStock(Exception):
+    def __init__(self, product_id):
+        super().__init__(f"Insufficient stock for product {product_id}")
+        self.product_id = product_id
+
+
+class CartChanged(Exception):
+    def __init__(self):
+        super().__init__("The cart changed during checkout, please review it and retry")
+
+
+class LeaseLost(Exception):
+    def __init__(self, job_id):
+        super().__init__(f"Checkout job {job_id} was claimed by another worker")
+        self.job_id = job_id
+
+
+def place_order(user_id, cart_items, lease=None):
+    """Convierte ``cart_items`` en una orden dentro de una sola transacción.
+
+    Primero se borran del carrito las líneas leídas con un único DELETE: si alguna ya no existe
+    (otro checkout del mismo usuario la convirtió en orden) se hace rollback y se lanza
+    ``CartChanged``. El stock se descuenta con UPDATE condicionados (``stock >= cantidad``), las
+    líneas se insertan en bloque y se suman a las rollups de ventas. Si algún producto no alcanza
+    se hace rollback de todo y se lanza ``OutOfStock``. Con ``lease=(job_id,
+    worker_id)`` (checkout en cola) el trabajo se marca como completado en la misma transacción,
+    solo si ese worker lo sigue teniendo; si no, rollback y ``LeaseLost``. Devuelve la orden creada.
+    """
+    quantities = _quantities(cart_items)
+    total_amount = sum(item.total for item in cart_items)
+
+    try:
+        # Solo se borran las líneas leídas; lo agregado mientras tanto queda en el carrito
+        deleted = db.session.query(Cart).filter(Cart.id.in_([item.id for item in cart_items])).delete()
+        if deleted != len(cart_items):
+            raise CartChanged()
+
+        # Orden fijo por id para que checkouts concurrentes tomen los productos en el mismo orden
+        for product_id, quantity in sorted(quantities.items()):
+            result = db.session.execute(
+                update(Product)
+                .where(Product.id == product_id, Product.stock >= quantity)
+                .values(stock=Product.stock - quantity)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount != 1:
+                raise OutOfStock(product_id)
+
+        # created_at explícito: el día de la orden y el de sus rollups es el mismo
+        now = utcnow()
+        order = Order(user_id=user_id, total_amount=total_amount, created_at=now, updated_at=now)
+        db.session.add(order)
+        db.session.flush()
+
+        db.session.execute(insert(OrderProduct), [
+            {"order_id": order.id, "product_id": item.product_id, "quantity": item.quantity, "price": item.price}
+            for item in cart_items
+        ])
+        record_sales(((item.product_id, item.quantity, item.price) for item in cart_items), now.date())
+        if lease is not None and not _settle(*lease, status=SUCCEEDED, order_id=order.id, error=None):
+            raise LeaseLost(lease[0])
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return order
+
+
+def _quantities(cart_items):
+    quantities = {}
+    for item in cart_items:
+        quantities[item.product_id] = quantities.get(item.product_id, 0) + item.quantity
+    return quantities
+
+
+def check_stock(cart_items):
+    """Lanza ``OutOfStock`` si el stock actual no alcanza para ``cart_items``; una sola consulta.
+
+    Adelanta el rechazo antes de encolar: el descuento real sigue siendo el UPDATE condicionado de
+    ``place_order``, que vuelve a comprobarlo.
+    """
+    quantities = _quantities(cart_items)
+    stock = dict(db.session.query(Product.id, Product.stock).filter(Product.id.in_(quantities)))
+    for product_id, quantity in sorted(quantities.items()):
+        if stock.get(product_id, 0) < quantity:
+            raise OutOfStock(product_id)
+
+
+def enqueue_checkout(user_id, cart_items):
+    """Encola el checkout de las líneas ``cart_items`` ya validadas; devuelve el trabajo creado."""
+    now = utcnow()
+    job = CheckoutJob(user_id=user_id, cart_ids=json.dumps(sorted(item.id for item in cart_items)),
+                      status=QUEUED, attempts=0, available_at=now, created_at=now, updated_at=now)
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def claim_job(worker_id, now=None):
+    """Toma el siguiente trabajo disponible para ``worker_id``; ``None`` si la cola está vacía.
+
+    La elección y el cambio a "running" van en un solo UPDATE, así que dos workers (hilos o
+    procesos) nunca toman el mismo trabajo. Un trabajo "running" cuyo worker no terminó en
+    ``CHECKOUT_LEASE_TIMEOUT`` segundos (proceso caído) vuelve a estar disponible.
+    """
+    now = now or utcnow()
+    expired = now - timedelta(seconds=current_app.config.get("CHECKOUT_LEASE_TIMEOUT", 60))
+    available = or_(
+        and_(CheckoutJob.status == QUEUED, CheckoutJob.available_at <= now),
+        and_(CheckoutJob.status == RUNNING, CheckoutJob.locked_at < expired),
+    )
+    candidate = (select(CheckoutJob.id).where(available)
+                 .order_by(CheckoutJob.available_at, CheckoutJob.id).limit(1).scalar_subquery())
+    job_id = db.session.execute(
+        update(CheckoutJob).where(CheckoutJob.id == candidate, available)
+        .values(status=RUNNING, locked_by=worker_id, locked_at=now, attempts=CheckoutJob.attempts + 1, updated_at=now)
+        .returning(CheckoutJob.id)
+        .execution_options(synchronize_session=False)
+    ).scalar()
+    db.session.commit()
+    return db.session.get(CheckoutJob, job_id) if job_id is not None else None
+
+
+def _settle(job_id, worker_id, **values):
+    # Solo el worker que tiene el trabajo puede cerrarlo: si su lease venció y otro lo retomó, no
+    # pisa el resultado del otro. No hace commit
+    result = db.session.execute(
+        update(CheckoutJob)
+        .where(CheckoutJob.id == job_id, CheckoutJob.status == RUNNING, CheckoutJob.locked_by == worker_id)
+        .values(locked_by=None, updated_at=utcnow(), **values)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+
+def _fail(job_id, worker_id, error):
+    if not _settle(job_id, worker_id, status=FAILED, error=error[:255]):
+        logger.warning("Checkout job %s was claimed by another worker; not marking it failed", job_id)
+    db.session.commit()
+
+
+def _retry(job_id, worker_id, attempts, error, now):
+    if attempts >= current_app.config.get("CHECKOUT_MAX_ATTEMPTS", 5):
+        return _fail(job_id, worker_id, f"Checkout failed after {attempts} attempts: {error}")
+    # Espera exponencial: los reintentos no compiten con el pico que causó el bloqueo
+    delay = current_app.config.get("CHECKOUT_RETRY_DELAY", 1.0) * 2 ** (attempts - 1)
+    _settle(job_id, worker_id, status=QUEUED, error=error[:255], available_at=now + timedelta(seconds=delay))
+    db.session.commit()
+
+
+def run_job(job, worker_id):
+    """Ejecuta el checkout de ``job`` tomado por ``worker_id``; los errores transitorios se reintentan con espera."""
+    # Se copian antes de los commits: tras ellos el objeto se recarga y podría reflejar otro dueño
+    job_id, user_id, cart_ids, attempts = job.id, job.user_id, json.loads(job.cart_ids), job.attempts
+    cart_items = Cart.query.filter(Cart.id.in_(cart_ids), Cart.user_id == user_id).all()
+    if not cart_items:
+        return _fail(job_id, worker_id, "Your cart is empty")
+    try:
+        place_order(user_id, cart_items, lease=(job_id, worker_id))
+    except (OutOfStock, CartChanged) as e:
+        _fail(job_id, worker_id, str(e))
+    except LeaseLost:
+        logger.warning("Checkout job %s was claimed by another worker; order rolled back", job_id)
+    except OperationalError as e:
+        # Base de datos bloqueada por otros checkouts
+        _retry(job_id, worker_id, attempts, str(e.orig), utcnow())
+    except Exception as e:
+        logger.exception("Checkout job %s failed", job_id)
+        _retry(job_id, worker_id, attempts, str(e) or type(e).__name__, utcnow())
+    else:
+        response_cache.invalidate("products")  # El checkout descontó stock
+
+
+def process_next(worker_id):
+    """Toma y ejecuta un trabajo; devuelve ``False`` si la cola estaba vacía."""
+    job = claim_job(worker_id)
+    if job is None:
+        return False
+    run_job(job, worker_id)
+    return True
@@ -0,0 +1,114 @@
+import logging
+import os
+import socket
+import threading
+
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+
+class CheckoutWorkers:
+    """Hilos que vacían la cola de checkouts (tabla ``checkout_job``) dentro del proceso de la API.
+
+    Con ``CHECKOUT_ASYNC`` activo, ``POST /orders`` encola el checkout y responde 202; los
+    ``CHECKOUT_WORKERS`` hilos se arrancan con la primera petición que atiende el proceso (ya
+    dentro del worker, compatible con servidores pre-fork), así que lo que quedó en la cola tras
+    un reinicio se procesa sin esperar a un checkout nuevo. Despiertan con cada trabajo nuevo o
+    cada ``CHECKOUT_POLL_INTERVAL`` segundos. Con ``CHECKOUT_WORKERS = 0`` la cola la atienden procesos aparte
+    (``flask --app app checkout-worker``). Solo se activa en las apps que llaman a ``init_app``.
+
+    Al terminar un checkout se invalida la caché de respuestas "products". Con el backend en
+    memoria (``RESPONSE_CACHE_BACKEND = None``) eso solo llega a la caché del proceso que corrió el
+    trabajo, por eso ``checkout-worker`` exige un ``RESPONSE_CACHE_BACKEND`` compartido con la API.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("CHECKOUT_ASYNC", False)
+        app.config.setdefault("CHECKOUT_WORKERS", 2)
+        app.config.setdefault("CHECKOUT_POLL_INTERVAL", 1.0)
+        app.config.setdefault("CHECKOUT_MAX_ATTEMPTS", 5)
+        app.config.setdefault("CHECKOUT_RETRY_DELAY", 1.0)
+        app.config.setdefault("CHECKOUT_LEASE_TIMEOUT", 60)
+        app.extensions["checkout_workers"] = {"pid": None, "threads": [], "wake": threading.Event(),
+                                              "stop": threading.Event(), "lock": threading.Lock()}
+        app.before_request(self._before_request)
+
+    @staticmethod
+    def enabled():
+        return "checkout_workers" in current_app.extensions and current_app.config["CHECKOUT_ASYNC"]
+
+    def _before_request(self):
+        self.ensure_started()
+
+    def ensure_started(self):
+        """Arranca los hilos si este proceso aún no los tiene; devuelve su estado o ``None``."""
+        state = current_app.extensions.get("checkout_workers")
+        if state is None or not current_app.config["CHECKOUT_ASYNC"] or not current_app.config["CHECKOUT_WORKERS"]:
+            return None
+        if state["pid"] != os.getpid():
+            with state["lock"]:
+                # Tras un fork los hilos del padre no existen en el hijo: se vuelven a crear
+                if state["pid"] != os.getpid():
+                    state["pid"] = os.getpid()
+                    state["threads"] = self.start(current_app._get_current_object(),
+                                                  current_app.config["CHECKOUT_WORKERS"])
+        return state
+
+    def notify(self):
+        """Avisa que hay un trabajo nuevo; arranca los hilos si este proceso aún no los tiene."""
+        state = self.ensure_started()
+        if state is not None:
+            state["wake"].set()
+
+    def start(self, app, count, daemon=True):
+        state = app.extensions["checkout_workers"]
+        state["stop"].clear()
+        threads = []
+        for index in range(count):
+            worker_id = f"{socket.gethostname()}:{os.getpid()}:{index}"
+            thread = threading.Thread(target=self.run, args=(app, worker_id), name=f"checkout-worker-{index}",
+                                      daemon=daemon)
+            thread.start()
+            threads.append(thread)
+        return threads
+
+    def serve(self, app, count):
+        """Atiende la cola en primer plano (proceso aparte) hasta Ctrl+C."""
+        state = app.extensions["checkout_workers"]
+        state["pid"], state["threads"] = os.getpid(), self.start(app, count, daemon=False)
+        try:
+            while any(thread.is_alive() for thread in state["threads"]):
+                state["stop"].wait(1.0)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop(app)
+
+    def run(self, app, worker_id):
+        # Importación diferida: api.checkout depende de los modelos, que dependen de las extensiones
+        from api.checkout import process_next
+
+        state = app.extensions["checkout_workers"]
+        while not state["stop"].is_set():
+            with app.app_context():
+                try:
+                    processed = process_next(worker_id)
+                except Exception:
+                    logger.exception("Checkout worker %s crashed while polling", worker_id)
+                    processed = False
+            if not processed:
+                state["wake"].wait(app.config["CHECKOUT_POLL_INTERVAL"])
+                state["wake"].clear()
+
+    def stop(self, app):
+        state = app.extensions["checkout_workers"]
+        state["stop"].set()
+        state["wake"].set()
+        for thread in state["threads"]:
+            thread.join()
+        state["pid"], state["threads"] = None, []
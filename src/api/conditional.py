@@ -0,0 +1,78 @@
+import hashlib
+from datetime import datetime, timezone
+from functools import wraps
+from urllib.parse import urlencode
+
+from flask import Response, g, request
+from flask_restful.utils import unpack
+from sqlalchemy import func, select
+
+from api.extensions import db
+
+
+def table_state(*models, where=None):
+    """Estado barato de ``models``: (conteo, max(updated_at)) de cada uno en un solo SELECT.
+
+    ``where`` es una función opcional ``model -> condición`` para acotar, por ejemplo, por usuario.
+    """
+    columns = []
+    for model in models:
+        condition = where(model) if where else None
+        count = select(func.count()).select_from(model)
+        latest = select(func.max(model.updated_at))
+        if condition is not None:
+            count, latest = count.where(condition), latest.where(condition)
+        columns += [count.scalar_subquery(), latest.scalar_subquery()]
+    return tuple(db.session.query(*columns).one())
+
+
+def _http_datetime(value):
+    # updated_at se guarda como UTC sin zona (CURRENT_TIMESTAMP); HTTP solo maneja segundos
+    return value.replace(tzinfo=timezone.utc, microsecond=0)
+
+
+def _with_headers(response, headers):
+    if isinstance(response, Response):
+        response.headers.extend(headers)
+        return response
+    data, code, extra = unpack(response)
+    return data, code, dict(extra or {}, **headers)
+
+
+def conditional(state):
+    """GET condicional: ETag fuerte y Last-Modified calculados con ``state()`` antes de generar el cuerpo.
+
+    ``state`` devuelve una tupla de valores que cambia cuando cambia la respuesta (ver ``table_state``).
+    Si el cliente ya tiene esa versión (``If-None-Match``) se responde 304 sin ejecutar el handler.
+    ``If-Modified-Since`` no basta para responder 304: un borrado baja el conteo sin mover
+    max(updated_at). La versión queda en ``g.response_version`` mientras corre el handler para que
+    ``ResponseCache`` la sume a su llave: el cuerpo cacheado siempre corresponde al ETag, aunque la
+    escritura la haya hecho otro proceso. updated_at tiene resolución de segundos: dos ediciones
+    del mismo registro dentro del mismo segundo comparten ETag hasta la siguiente escritura.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            values = state()
+            query = urlencode(sorted(request.args.items(multi=True)))
+            digest = hashlib.sha1(repr((request.path, query, values)).encode()).hexdigest()
+            etag = f'"{digest}"'
+            timestamps = [value for value in values if isinstance(value, datetime)]
+            last_modified = _http_datetime(max(timestamps)) if timestamps else None
+
+            headers = {"ETag": etag}
+            if last_modified:
+                headers["Last-Modified"] = last_modified.strftime("%a, %d %b %Y %H:%M:%S GMT")
+
+            if request.if_none_match and request.if_none_match.contains(digest):
+                return Response(status=304, headers=headers)
+
+            g.response_version = digest
+            try:
+                response = fn(*args, **kwargs)
+            finally:
+                g.pop("response_version", None)
+            code = getattr(response, "status_code", None) or unpack(response)[1]
+            return _with_headers(response, headers) if code == 200 else response
+        return wrapper
+    return decorator
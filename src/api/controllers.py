@@ -1,14 +1,25 @@
 from flask import Flask, Response, request
 from flask_sqlalchemy import SQLAlchemy
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from api.extensions import db
-from sqlalchemy.exc import SQLAlchemyError
-from flask_restful import Api, Resource, reqparse, abort, fields, marshal_with,marshal
-from api.models import User, Category, Brand, Product, Order, Cart, OrderProduct, Wishlist, db
+from flask_jwt_extended import jwt_required
+from api.extensions import checkout_workers, db, response_cache
+from sqlalchemy.exc import SQLAlchemyError, OperationalError
+from sqlalchemy.orm import joinedload, selectinload
+from flask_restful import Api, Resource, reqparse, abort, fields, marshal_with,marshal, inputs
+from sqlalchemy import bindparam, func, insert, update
+from api.models import User, Category, Brand, Product, Order, Cart, OrderProduct, Wishlist, CheckoutJob, db
+import csv
+import io
 import json
 import re
 from werkzeug.security import generate_password_hash, check_password_hash
-from api.middleware.auth import role_required
+from api.middleware.auth import current_user_id, role_required
+from api.pagination import paginate, page_response
+from api.search import match_expression, product_fts, search_products
+from api.checkout import CartChanged, OutOfStock, check_stock, enqueue_checkout, place_order
+from api.conditional import conditional, table_state
+from api.serializers import compile_fields
+from api.idempotency import idempotent
+from api.rollups import record_sales
 
 
 user_args = reqparse.RequestParser()
@@ -41,6 +52,7 @@ user_fields = {
     'created_at': fields.DateTime,
     'updated_at': fields.DateTime
 }
+serialize_users = compile_fields(user_fields)
 
 class UserResource(Resource):
     @marshal_with(user_fields)
@@ -195,10 +207,9 @@ class UserResource(Resource):
         return '', 204
 
 class UserListResource(Resource):
-    @marshal_with(user_fields)
     def get(self):
-        user = User.query.all()
-        return user 
+        users, next_cursor = paginate(User.query, [User.id])
+        return page_response(serialize_users(users), next_cursor)
 
 
 product_args = reqparse.RequestParser()
@@ -225,69 +236,144 @@ product_fields = {
     'created_at': fields.DateTime,
     'updated_at': fields.DateTime
 }
+# Versión precompilada de marshal(..., product_fields) para los listados
+serialize_products = compile_fields(product_fields)
+
+def with_related_names(product):
+    # Usa las relaciones ya cargadas en lugar de consultar Category/Brand por fila
+    product.category_name = product.category.name if product.category else None
+    product.brand_username = product.brand.username if product.brand else None
+    return product
+
+
+def products_with_related():
+    # Un solo SELECT con LEFT OUTER JOIN a category y brand
+    return Product.query.options(joinedload(Product.category), joinedload(Product.brand))
+
+
+# Filtros de listado; cada uno está cubierto por los índices compuestos de Product
+product_filter_args = reqparse.RequestParser()
+product_filter_args.add_argument("category_id", type=int, location="args")
+product_filter_args.add_argument("brand_id", type=int, location="args")
+product_filter_args.add_argument("min_price", type=float, location="args")
+product_filter_args.add_argument("max_price", type=float, location="args")
+product_filter_args.add_argument("in_stock", type=inputs.boolean, location="args")
+product_filter_args.add_argument("sort", type=str, location="args", default="id",
+                                 choices=("id", "price", "-price"), help="Sort must be one of: id, price, -price")
+
+# Llave de orden para cada opción de ``sort``: (columnas, descendente)
+product_sorts = {
+    "id": ([Product.id], False),
+    "price": ([Product.price, Product.id], False),
+    "-price": ([Product.price, Product.id], True),
+}
+
+
+def filter_products(query, args, exclude=()):
+    if args["category_id"] is not None and "category_id" not in exclude:
+        query = query.filter(Product.category_id == args["category_id"])
+    if args["brand_id"] is not None and "brand_id" not in exclude:
+        query = query.filter(Product.brand_id == args["brand_id"])
+    if args["min_price"] is not None:
+        query = query.filter(Product.price >= args["min_price"])
+    if args["max_price"] is not None:
+        query = query.filter(Product.price <= args["max_price"])
+    if args["in_stock"] is True:
+        query = query.filter(Product.stock > 0)
+    elif args["in_stock"] is False:
+        query = query.filter(Product.stock <= 0)
+    return query
+
+
+def validate_product(values):
+    """Valida los campos de un producto nuevo; devuelve ``(campos normalizados, None)`` o ``(None, error)``.
+
+    La comparten ``ProductResource.post`` y la importación masiva. No consulta la base de datos:
+    la existencia de categoría, marca y nombre la resuelve cada llamador.
+    """
+    # Con JSON los campos pueden llegar como listas, objetos o booleanos: se rechazan por fila
+    name = values.get('name')
+    if not name or str(name).isspace():
+        return None, 'Name cannot be empty'
+    if not isinstance(name, str):
+        return None, 'Name must be a string'
+
+    # Validación para el precio (debe ser numérico y positivo)
+    try:
+        price = float(values.get('price'))
+    except (TypeError, ValueError):
+        return None, "Price must be a valid number"
+    if price <= 0:
+        return None, "Price must be greater than 0"
+
+    description = values.get('description')
+    if not description or str(description).isspace():
+        return None, 'description cannot be empty'
+    if not isinstance(description, str):
+        return None, 'description must be a string'
+
+    # Validación para el stock (debe ser un entero no negativo)
+    try:
+        stock = int(values.get('stock'))
+    except (TypeError, ValueError):
+        return None, "Stock must be a valid integer"
+    if stock < 0:
+        return None, "Stock cannot be negative"
+
+    # img es NOT NULL: una fila sin imagen haría fallar el INSERT de todo su bloque en la importación
+    img = values.get('img')
+    if not img or str(img).isspace():
+        return None, "Image URL is required"
+    if not isinstance(img, str):
+        return None, "Image URL must be a string"
+    if not str(img).startswith(('http://', 'https://')):
+        return None, "Image URL must start with 'http://' or 'https://'"
+
+    category_id = values.get('category_id')
+    if not category_id or str(category_id).isspace():
+        return None, "Category ID cannot be empty"
+    brand_id = values.get('brand_id')
+    if not brand_id or str(brand_id).isspace():
+        return None, "Brand ID cannot be empty or just spaces"
+    # bool es subclase de int: true no es la categoría 1
+    if any(isinstance(value, bool) or not isinstance(value, (int, str)) for value in (category_id, brand_id)):
+        return None, "Category ID and Brand ID must be valid integers"
+    try:
+        category_id, brand_id = int(category_id), int(brand_id)
+    except (TypeError, ValueError):
+        return None, "Category ID and Brand ID must be valid integers"
+
+    return {"name": name, "price": price, "description": description, "stock": stock,
+            "category_id": category_id, "brand_id": brand_id, "img": img}, None
+
 
 class ProductResource(Resource):
     @jwt_required()
+    @conditional(lambda: table_state(Product, Category, Brand))
+    @response_cache.cached("products", depends_on=("categories", "brands"))
     def get(self, product_id=None):
         if product_id:
-            product = Product.query.filter_by(id=product_id).first()
+            product = products_with_related().filter(Product.id == product_id).first()
             if not product:
                 # Retorna un mensaje de error directamente
                 return {"message": "Product not found"}, 404
-            # Completar información adicional
-            category = Category.query.get(product.category_id)
-            brand = Brand.query.get(product.brand_id)
-            product.category_name = category.name if category else None
-            product.brand_username = brand.username if brand else None
             # Formatear solo la respuesta válida
-            return marshal(product, product_fields), 200
+            return serialize_products(with_related_names(product)), 200
         else:
-            products = Product.query.all()
-            for product in products:
-                category = Category.query.get(product.category_id)
-                brand = Brand.query.get(product.brand_id)
-                product.category_name = category.name if category else None
-                product.brand_username = brand.username if brand else None
-            return marshal(products, product_fields), 200
+            args = product_filter_args.parse_args()
+            columns, descending = product_sorts[args["sort"]]
+            query = filter_products(products_with_related(), args)
+            products, next_cursor = paginate(query, columns, descending)
+            return page_response(serialize_products([with_related_names(product) for product in products]), next_cursor)
   
+    @response_cache.invalidates("products")
     @jwt_required()
     def post(self):
         args = product_args.parse_args()
-        
-        # Validaciones adicionales si es necesario
-        if not args['name'] or args['name'].isspace():
-            return{'error': 'Name cannot be empty'},400
-                             
-            
-         # Validación para el precio (debe ser numérico y positivo)
-        try:
-            price = float(args['price'])
-            if price <= 0:
-                return {"error":"Price must be greater than 0"},400
-        except ValueError:
-            return {"error":"Price must be a valid number"},400
+        product, error = validate_product(args)
+        if error:
+            return {"error": error}, 400
 
-        if not args['description'] or args['description'].isspace():
-            return {'error': 'description cannot be empty'},400
-            
-        # Validación para el stock (debe ser un entero no negativo)
-        try:
-            stock = int(args['stock'])
-            if stock < 0:
-                return {"error":"Stock cannot be negative"},400
-        except ValueError:
-            return {"error": "Stock must be a valid integer"}, 400
-         # Validación para la URL de la imagen (opcional, pero puede ser verificada si se requiere)
-        if args['img'] and not args['img'].startswith(('http://', 'https://')):
-            return {"error":"Image URL must start with 'http://' or 'https://'"},400
-        
-        # if not args['category_id'] and str(args['category_id']).isspace():
-        if not args['category_id'] or args['category_id'] == " ":
-            # return abort(404,message="category id cannot by empty")
-            return {"error": "Category ID cannot be empty"}, 400
-        
-        if not args['brand_id'] or str(args['brand_id']).isspace():
-            return ({"error": "Brand ID cannot be empty or just spaces"}), 400
         # Validaciones para categoría y marca (deben existir en la base de datos)
         category = Category.query.get(args['category_id'])
         if not category:
@@ -303,15 +389,7 @@ class ProductResource(Resource):
             return {"message": "Product already exists"}, 400
 
         # Crear el nuevo producto
-        new_product = Product(
-            name=args['name'],
-            price=args['price'],
-            description=args['description'],
-            stock=args['stock'],
-            category_id=args['category_id'],
-            brand_id=args['brand_id'],
-            img=args['img']
-        )
+        new_product = Product(**product)
         
         # Guardar el producto en la base de datos
         db.session.add(new_product)
@@ -319,6 +397,7 @@ class ProductResource(Resource):
         return marshal(new_product, product_fields), 201
         
        
+    @response_cache.invalidates("products")
     @jwt_required()
     @marshal_with(product_fields)
     def patch(self, product_id):
@@ -384,6 +463,7 @@ class ProductResource(Resource):
         db.session.commit()
         return product, 200
     
+    @response_cache.invalidates("products")
     @jwt_required()
     # @role_required(1) 
     def delete(self, product_id):
@@ -394,6 +474,252 @@ class ProductResource(Resource):
         db.session.commit()
         return '', 204
 
+class ProductImport(Resource):
+    # Filas por transacción: cada bloque se valida con tres consultas IN (...) y se inserta de una vez
+    chunk_size = 1000
+
+    @response_cache.invalidates("products")
+    @jwt_required()
+    def post(self):
+        created, errors, seen_names = 0, [], set()
+        chunk = []
+        for record in self.read_records():
+            chunk.append(record)
+            if len(chunk) == self.chunk_size:
+                created += self.import_chunk(chunk, seen_names, errors)
+                chunk = []
+        if chunk:
+            created += self.import_chunk(chunk, seen_names, errors)
+
+        if not created and not errors:
+            abort(400, message="No products to import")
+        report = {"message": f"{created} products imported, {len(errors)} rejected",
+                  "created": created, "failed": len(errors), "errors": errors}
+        return report, 201 if created else 400
+
+    def read_records(self):
+        """Genera ``(línea, registro, error)`` leyendo el cuerpo como CSV o JSON lines, sin cargarlo entero."""
+        stream = io.TextIOWrapper(request.stream, encoding="utf-8", newline="")
+        if request.mimetype == "text/csv" or request.args.get("format") == "csv":
+            reader = csv.DictReader(stream)
+            for record in reader:
+                yield reader.line_num, record, None
+            return
+
+        for line_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                yield line_number, None, "Invalid JSON"
+                continue
+            if not isinstance(record, dict):
+                yield line_number, None, "Each line must be a JSON object"
+            else:
+                yield line_number, record, None
+
+    def import_chunk(self, chunk, seen_names, errors):
+        valid = []
+        for line_number, record, error in chunk:
+            product = None
+            if error is None:
+                product, error = validate_product(record)
+            if error:
+                errors.append({"line": line_number, "message": error})
+            else:
+                valid.append((line_number, product))
+        if not valid:
+            return 0
+
+        # Categorías, marcas y nombres existentes del bloque en tres consultas
+        category_ids = {product["category_id"] for _, product in valid}
+        brand_ids = {product["brand_id"] for _, product in valid}
+        names = {product["name"] for _, product in valid}
+        categories = {id for (id,) in db.session.query(Category.id).filter(Category.id.in_(category_ids))}
+        brands = {id for (id,) in db.session.query(Brand.id).filter(Brand.id.in_(brand_ids))}
+        existing = {name for (name,) in db.session.query(Product.name).filter(Product.name.in_(names))}
+
+        rows, lines = [], []
+        for line_number, product in valid:
+            if product["category_id"] not in categories:
+                error = "Category not found"
+            elif product["brand_id"] not in brands:
+                error = "Brand not found"
+            elif product["name"] in existing or product["name"] in seen_names:
+                error = "Product already exists"
+            else:
+                seen_names.add(product["name"])
+                rows.append(product)
+                lines.append(line_number)
+                continue
+            errors.append({"line": line_number, "message": error})
+        if not rows:
+            return 0
+
+        try:
+            db.session.execute(insert(Product), rows)
+            db.session.commit()
+        except SQLAlchemyError:
+            db.session.rollback()
+            seen_names.difference_update(product["name"] for product in rows)
+            errors.extend({"line": line_number, "message": "Could not save product"} for line_number in lines)
+            return 0
+        return len(rows)
+
+
+class ProductBulkUpdate(Resource):
+    # Límite de líneas por petición para acotar el tamaño de la transacción
+    max_batch_lines = 10000
+
+    @response_cache.invalidates("products")
+    @jwt_required()
+    def patch(self):
+        data = request.get_json(silent=True)
+        items = data.get("items") if isinstance(data, dict) else None
+        if not isinstance(items, list) or not items:
+            abort(400, message="items must be a non-empty list.")
+        if len(items) > self.max_batch_lines:
+            abort(400, message=f"A batch can contain at most {self.max_batch_lines} items.")
+
+        changes, rejected = {}, []
+        for item in items:
+            product_id = item.get("id") if isinstance(item, dict) else None
+            # bool es subclase de int: {"id": true} no es el producto 1
+            valid_id = isinstance(product_id, int) and not isinstance(product_id, bool) and product_id > 0
+            error = self.validate_item(item) if valid_id else "Product ID must be greater than 0."
+            if error is None and product_id in changes:
+                error = "Duplicate product id"
+            if error:
+                rejected.append({"id": product_id, "message": error})
+            else:
+                changes[product_id] = item
+
+        # Stock actual de todos los productos en una consulta, dentro de la misma transacción
+        stocks = dict(db.session.query(Product.id, Product.stock).filter(Product.id.in_(changes))) if changes else {}
+        missing = [product_id for product_id in changes if product_id not in stocks]
+
+        # Agrupar por forma ({price}, {stock}, {price, stock_delta}, ...): un UPDATE con executemany por grupo
+        shapes = {}
+        for product_id, item in changes.items():
+            if product_id not in stocks:
+                continue
+            if stocks[product_id] + item.get("stock_delta", 0) < 0:
+                rejected.append({"id": product_id, "message": f"Stock cannot be negative. Only {stocks[product_id]} items are available."})
+                continue
+            shape = tuple(field for field in ("price", "stock", "stock_delta") if field in item)
+            shapes.setdefault(shape, []).append(dict({"_id": product_id}, **{f"_{field}": item[field] for field in shape}))
+
+        updated = 0
+        try:
+            for shape, params in shapes.items():
+                statement = update(Product.__table__).where(Product.__table__.c.id == bindparam("_id"))
+                values = {}
+                if "price" in shape:
+                    values["price"] = bindparam("_price")
+                if "stock" in shape:
+                    values["stock"] = bindparam("_stock")
+                if "stock_delta" in shape:
+                    # La condición evita stock negativo aunque otro proceso lo haya cambiado tras la lectura
+                    values["stock"] = Product.__table__.c.stock + bindparam("_stock_delta")
+                    statement = statement.where(Product.__table__.c.stock + bindparam("_stock_delta") >= 0)
+                result = db.session.execute(statement.values(values), params)
+                if result.rowcount != len(params):
+                    db.session.rollback()
+                    abort(409, message="Stock changed during the update, please retry")
+                updated += result.rowcount
+            db.session.commit()
+        except OperationalError:
+            db.session.rollback()
+            abort(503, message="Inventory update is busy, please retry")
+
+        return {
+            "message": f"{updated} products updated, {len(missing)} missing, {len(rejected)} rejected",
+            "updated": updated,
+            "missing": len(missing),
+            "missing_ids": missing,
+            "rejected": rejected,
+        }, 200
+
+    def validate_item(self, item):
+        fields_present = [field for field in ("price", "stock", "stock_delta") if field in item]
+        if not fields_present:
+            return "Nothing to update: send price, stock or stock_delta"
+        if "stock" in item and "stock_delta" in item:
+            return "Send either stock or stock_delta, not both"
+        if "price" in item:
+            price = item["price"]
+            if isinstance(price, bool) or not isinstance(price, (int, float)):
+                return "Price must be a valid number"
+            if price <= 0:
+                return "Price must be greater than 0"
+        if "stock" in item:
+            if isinstance(item["stock"], bool) or not isinstance(item["stock"], int):
+                return "Stock must be a valid integer"
+            if item["stock"] < 0:
+                return "Stock cannot be negative"
+        if "stock_delta" in item and (isinstance(item["stock_delta"], bool) or not isinstance(item["stock_delta"], int)):
+            return "Stock delta must be a valid integer"
+        return None
+
+
+class ProductFacets(Resource):
+    @jwt_required()
+    @response_cache.cached("products", depends_on=("categories", "brands"))
+    def get(self):
+        args = product_filter_args.parse_args()
+        # Cada faceta ignora su propio filtro para mostrar las alternativas disponibles;
+        # el conteo se agrupa solo sobre el índice de product y luego se une con los nombres.
+        category_counts = (
+            filter_products(db.session.query(Product.category_id, func.count().label("count")), args, exclude=("category_id",))
+            .group_by(Product.category_id)
+            .subquery()
+        )
+        brand_counts = (
+            filter_products(db.session.query(Product.brand_id, func.count().label("count")), args, exclude=("brand_id",))
+            .group_by(Product.brand_id)
+            .subquery()
+        )
+        categories = (
+            db.session.query(category_counts.c.category_id, Category.name, category_counts.c.count)
+            .outerjoin(Category, Category.id == category_counts.c.category_id)
+            .order_by(category_counts.c.count.desc(), category_counts.c.category_id)
+            .all()
+        )
+        brands = (
+            db.session.query(brand_counts.c.brand_id, Brand.username, brand_counts.c.count)
+            .outerjoin(Brand, Brand.id == brand_counts.c.brand_id)
+            .order_by(brand_counts.c.count.desc(), brand_counts.c.brand_id)
+            .all()
+        )
+        return {
+            "categories": [{"id": category_id, "name": name, "count": count} for category_id, name, count in categories],
+            "brands": [{"id": brand_id, "username": username, "count": count} for brand_id, username, count in brands],
+        }, 200
+
+
+search_fields = dict(product_fields, score=fields.Float)
+serialize_search_hits = compile_fields(search_fields)
+
+
+class ProductSearch(Resource):
+    @jwt_required()
+    @response_cache.cached("products", depends_on=("categories", "brands"))
+    def get(self):
+        expression = match_expression(request.args.get("q"))
+        if not expression:
+            return {"error": "Search query 'q' cannot be empty"}, 400
+
+        # Resultados ordenados por relevancia (bm25) y paginados por (rank, id)
+        query = search_products(products_with_related(), expression)
+        rows, next_cursor = paginate(query, [product_fts.c.rank, Product.id], key=lambda row: [row.rank, row[0].id])
+
+        hits = []
+        for product, product_rank in rows:
+            product.score = -product_rank
+            hits.append(with_related_names(product))
+        return page_response(serialize_search_hits(hits), next_cursor)
+
 class WishlistController(Resource):
     # Parser para validar entrada de datos
     wishlist_args = reqparse.RequestParser()
@@ -401,7 +727,7 @@ class WishlistController(Resource):
 
     @jwt_required()
     def post(self):
-        user_id = get_jwt_identity()
+        user_id = current_user_id()
         
         args = self.wishlist_args.parse_args()
         product_id = args['product_id']
@@ -429,7 +755,7 @@ class WishlistController(Resource):
 
     @jwt_required()
     def get(self):
-        user_id = get_jwt_identity()
+        user_id = current_user_id()
 
         try:
             # Consultar la lista de deseos del usuario
@@ -455,7 +781,7 @@ class WishlistController(Resource):
 
     @jwt_required()
     def delete(self, wishlist_id):
-        user_id = get_jwt_identity()
+        user_id = current_user_id()
 
         # Buscar el producto en la lista de deseos
         wishlist_item = Wishlist.query.filter_by(id=wishlist_id, user_id=user_id).first()
@@ -472,6 +798,16 @@ class WishlistController(Resource):
             abort(500, message=f"An error occurred: {str(e)}")
 
 
+def cart_summary(user_id):
+    # Totales calculados en SQL: número de líneas, unidades y total a pagar
+    lines, units, total = (
+        db.session.query(func.count(Cart.id), func.coalesce(func.sum(Cart.quantity), 0), func.coalesce(func.sum(Cart.total), 0))
+        .filter(Cart.user_id == user_id)
+        .one()
+    )
+    return {"line_count": lines, "item_count": int(units), "grand_total": round(float(total), 2)}
+
+
 class CartController(Resource):
     # Parser para validar los datos de entrada
     cart_args = reqparse.RequestParser()
@@ -484,10 +820,17 @@ class CartController(Resource):
         if quantity <= 0:
             abort(400, message="Quantity must be greater than 0.")
 
+    # Límite de líneas por lote para acotar el tamaño de la transacción
+    max_batch_lines = 100
+
     @jwt_required()
-    
+    @idempotent("carts")
     def post(self):
-        user_id = get_jwt_identity()
+        user_id = current_user_id()
+        data = request.get_json(silent=True)
+        if isinstance(data, dict) and "items" in data:
+            return self.post_batch(user_id, data["items"])
+
         args = self.cart_args.parse_args()
         product_id = args['product_id']
         quantity = args['quantity']
@@ -522,10 +865,74 @@ class CartController(Resource):
         return {"message": "Product added to cart"}, 200
         
 
+    def post_batch(self, user_id, items):
+        if not isinstance(items, list) or not items:
+            abort(400, message="items must be a non-empty list.")
+        if len(items) > self.max_batch_lines:
+            abort(400, message=f"A batch can contain at most {self.max_batch_lines} items.")
+
+        # Validar la forma de cada línea antes de tocar la base de datos
+        lines = []
+        for item in items:
+            product_id = item.get("product_id") if isinstance(item, dict) else None
+            quantity = item.get("quantity") if isinstance(item, dict) else None
+            # bool es subclase de int: true no cuenta como 1
+            if not isinstance(product_id, int) or isinstance(product_id, bool) or product_id <= 0:
+                lines.append((product_id, quantity, "Product ID must be greater than 0."))
+            elif not isinstance(quantity, int) or isinstance(quantity, bool) or quantity <= 0:
+                lines.append((product_id, quantity, "Quantity must be greater than 0."))
+            else:
+                lines.append((product_id, quantity, None))
+
+        # Productos y líneas de carrito existentes en dos consultas IN (...)
+        product_ids = {product_id for product_id, _, error in lines if error is None}
+        products = {product.id: product for product in Product.query.filter(Product.id.in_(product_ids))} if product_ids else {}
+        cart_items = {
+            item.product_id: item
+            for item in Cart.query.filter(Cart.user_id == user_id, Cart.product_id.in_(products))
+        } if products else {}
+
+        results = []
+        for product_id, quantity, error in lines:
+            product = products.get(product_id) if error is None else None
+            if error is None and not product:
+                error = "Product not found"
+            cart_item = cart_items.get(product_id)
+            current = cart_item.quantity if cart_item else 0
+            if error is None and current + quantity > product.stock:
+                error = f"Quantity exceeds available stock. Only {product.stock} items are available."
+            if error:
+                results.append({"product_id": product_id, "status": "error", "message": error})
+                continue
+
+            # Upsert: si ya está en el carrito se suma la cantidad, como en put()
+            if cart_item:
+                cart_item.quantity += quantity
+                cart_item.total = cart_item.quantity * cart_item.price
+                status = "updated"
+            else:
+                cart_item = Cart(user_id=user_id, product_id=product_id, quantity=quantity,
+                                 price=product.price, total=product.price * quantity)
+                db.session.add(cart_item)
+                cart_items[product_id] = cart_item
+                status = "added"
+            results.append({"product_id": product_id, "status": status, "quantity": cart_item.quantity})
+
+        db.session.commit()
+        applied = sum(1 for result in results if result["status"] != "error")
+        return {"message": f"{applied} of {len(results)} items applied to cart", "results": results}, 200
+
     @jwt_required()
     def get(self):
-        user_id = get_jwt_identity()
-        cart_items = Cart.query.filter_by(user_id=user_id).all()
+        user_id = current_user_id()
+        # Un solo SELECT con JOIN a product y solo las columnas que se devuelven
+        cart_items = (
+            db.session.query(Cart.id, Product.name, Product.img, Cart.quantity, Cart.price, Cart.total)
+            .join(Product, Cart.product_id == Product.id)
+            .filter(Cart.user_id == user_id)
+            .order_by(Cart.id)
+            .all()
+        )
         
         if not cart_items:
             return {"message": "Your cart is empty"}, 200
@@ -533,20 +940,20 @@ class CartController(Resource):
         formatted_cart_items = [
         {
             'id': item.id,
-            'product_name': item.product.name,
-            'product_img': item.product.img,
+            'product_name': item.name,
+            'product_img': item.img,
             'quantity': item.quantity,
             'price': float(item.price),  # Convierte a float
             'total': float(item.total)   # Convierte a float
         }
         for item in cart_items
     ]
-        return {"data": formatted_cart_items}, 200
+        return {"data": formatted_cart_items, "summary": cart_summary(user_id)}, 200
 
 
     @jwt_required()
     def put(self, id):
-        user_id = get_jwt_identity()
+        user_id = current_user_id()
 
         if id <= 0:
             abort(400, message="ID must be greater than 0.")
@@ -588,7 +995,7 @@ class CartController(Resource):
 
     @jwt_required()
     def delete(self, id):
-        user_id = get_jwt_identity()
+        user_id = current_user_id()
 
         # Buscar el item del carrito
         cart_item = Cart.query.filter_by(id=id, user_id=user_id).first()
@@ -600,54 +1007,98 @@ class CartController(Resource):
 
         return {"message": "Product removed from cart successfully"}, 200
     
+class CartSummary(Resource):
+    @jwt_required()
+    def get(self):
+        return cart_summary(current_user_id()), 200
+
+
+order_line_fields = {
+    'product_id': fields.Integer,
+    'product_name': fields.String(attribute='product.name'),
+    'quantity': fields.Integer,
+    'price': fields.Float,
+}
+
+order_fields = {
+    'order_id': fields.Integer(attribute='id'),
+    'total_amount': fields.Float,
+    'created_at': fields.DateTime(dt_format='iso8601'),
+    'updated_at': fields.DateTime(dt_format='iso8601'),
+    'items': fields.List(fields.Nested(order_line_fields), attribute='order_products'),
+}
+
+serialize_orders = compile_fields(order_fields)
+
+
+def orders_with_lines():
+    # Líneas y nombre de producto en una segunda consulta (IN sobre las órdenes de la página),
+    # sin importar cuántas órdenes o líneas haya
+    return Order.query.options(
+        selectinload(Order.order_products).joinedload(OrderProduct.product).load_only(Product.name)
+    )
+
+
 class OrderController(Resource):
+    @response_cache.invalidates("products")  # El checkout descuenta stock
     @jwt_required()
+    @idempotent("orders")
     def post(self):
-        user_id = get_jwt_identity()
+        user_id = current_user_id()
 
         # Verificar si el usuario tiene productos en el carrito
         cart_items = Cart.query.filter_by(user_id=user_id).all()
         if not cart_items:
             abort(400, message="Your cart is empty")
 
-        # Calcular el total del carrito
-        total_amount = sum(item.total for item in cart_items)
-
-        # Crear una nueva orden
-        new_order = Order(user_id=user_id, total_amount=total_amount)
-        db.session.add(new_order)
-        db.session.commit()
-
-        # Vaciar el carrito después de crear la orden
-        for item in cart_items:
-            db.session.delete(item)
-        db.session.commit()
+        if checkout_workers.enabled():
+            # Modo asíncrono: el checkout lo hace un worker; el cliente consulta el trabajo.
+            # Sin stock suficiente se responde 409 ya, sin encolar
+            try:
+                check_stock(cart_items)
+            except OutOfStock as e:
+                abort(409, message=str(e), product_id=e.product_id)
+            job = enqueue_checkout(user_id, cart_items)
+            checkout_workers.notify()
+            return ({"message": "Checkout queued", "job_id": job.id, "status": job.status}, 202,
+                    {"Location": f"/orders/jobs/{job.id}"})
+
+        # Crear la orden, descontar stock y vaciar el carrito en una sola transacción
+        try:
+            new_order = place_order(user_id, cart_items)
+        except OutOfStock as e:
+            abort(409, message=str(e), product_id=e.product_id)
+        except CartChanged as e:
+            abort(409, message=str(e))
+        except OperationalError:
+            # Base de datos bloqueada por otros checkouts: el cliente puede reintentar
+            abort(503, message="Checkout is busy, please retry")
 
-        return {"message": "Order created successfully", "order_id": new_order.id, "total_amount": float(total_amount)}, 201
+        return {"message": "Order created successfully", "order_id": new_order.id, "total_amount": float(new_order.total_amount)}, 201
 
     @jwt_required()
-    def get(self):
-        user_id = get_jwt_identity()
-        orders = Order.query.filter_by(user_id=user_id).all()
-
-        if not orders:
+    # Las líneas no cambian después del checkout: basta con el estado de las órdenes del usuario
+    @conditional(lambda: table_state(Order, where=lambda model: model.user_id == current_user_id()))
+    def get(self, order_id=None):
+        user_id = current_user_id()
+        if order_id:
+            order = orders_with_lines().filter(Order.id == order_id, Order.user_id == user_id).first()
+            if not order:
+                abort(404, message="Order not found")
+            return serialize_orders(order), 200
+
+        # Más recientes primero; (created_at, id) desempata órdenes del mismo segundo
+        query = orders_with_lines().filter(Order.user_id == user_id)
+        orders, next_cursor = paginate(query, [Order.created_at, Order.id], descending=True)
+        if not orders and not request.args.get("after"):
             return {"message": "No orders found"}, 200
 
-        # Formatear las fechas para que sean serializables a JSON
-        formatted_orders = [
-            {
-                'order_id': order.id,
-                'total_amount': float(order.total_amount),
-                'created_at': order.created_at.isoformat() if order.created_at else None,
-                'updated_at': order.updated_at.isoformat() if order.updated_at else None
-            }
-            for order in orders
-        ]
-
-        return {"data": formatted_orders}, 200
+        headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+        return {"data": serialize_orders(orders), "next_cursor": next_cursor}, 200, headers
+
     @jwt_required()
     def delete(self, order_id):
-        user_id = get_jwt_identity()
+        user_id = current_user_id()
 
         # Buscar la orden por ID
         order = Order.query.filter_by(id=order_id, user_id=user_id).first()
@@ -655,12 +1106,33 @@ class OrderController(Resource):
         if not order:
             abort(404, message="Order not found")
 
-        # Eliminar la orden
+        # Eliminar la orden y descontar sus líneas de las rollups en la misma transacción
+        # Columnas sueltas: cargar order.order_products haría que el ORM intente desvincular las líneas
+        lines = db.session.query(OrderProduct.product_id, OrderProduct.quantity, OrderProduct.price).filter_by(order_id=order.id)
+        record_sales(lines, order.created_at.date(), sign=-1)
         db.session.delete(order)
         db.session.commit()
 
         return {"message": "Order deleted successfully", "order_id": order.id}, 200
 
+checkout_job_fields = {
+    'job_id': fields.Integer(attribute='id'),
+    'status': fields.String,
+    'attempts': fields.Integer,
+    'order_id': fields.Integer(default=None),  # null hasta que el checkout termina
+    'error': fields.String,
+    'created_at': fields.DateTime(dt_format='iso8601'),
+    'updated_at': fields.DateTime(dt_format='iso8601'),
+}
+
+class CheckoutJobResource(Resource):
+    @jwt_required()
+    def get(self, job_id):
+        job = CheckoutJob.query.filter_by(id=job_id, user_id=current_user_id()).first()
+        if not job:
+            abort(404, message="Checkout job not found")
+        return marshal(job, checkout_job_fields), 200
+
 category_args = reqparse.RequestParser()
 category_args.add_argument("name", type=str, required=True, help="Name is required and should not exceed 100 characters")
 category_args.add_argument("description", type=str, required=True, help="Description is required and should not exceed 255 characters")
@@ -670,19 +1142,22 @@ category_fields = {
     "name": fields.String,
     "description": fields.String
 }   
+serialize_categories = compile_fields(category_fields)
 class Categories(Resource):    
-     @marshal_with(category_fields)
      @jwt_required()
+     @conditional(lambda: table_state(Category))
+     @response_cache.cached("categories")
      def get(self, category_id=None):
         if category_id:  # Si category_id es proporcionado
             category = Category.query.filter_by(id=category_id).first()  # Busca por ID
             if not category:  # Si no se encuentra la categoría
                 abort(404, message="Category not found")
-            return category  # Devuelve la categoría específica
-        else:  # Si no se proporciona category_id, devuelve todas las categorías
-            categories = Category.query.all()
-            return categories  # Devuelve todas las categorías
+            return serialize_categories(category)  # Devuelve la categoría específica
+        else:  # Si no se proporciona category_id, devuelve las categorías paginadas
+            categories, next_cursor = paginate(Category.query, [Category.id])
+            return page_response(serialize_categories(categories), next_cursor)
         
+     @response_cache.invalidates("categories")
      @jwt_required()
      def post(self):
         args = category_args.parse_args()
@@ -704,6 +1179,7 @@ class Categories(Resource):
         db.session.commit()
         return {"message": "Category created successfully", "id": new_category.id}, 201
      
+     @response_cache.invalidates("categories")
      @jwt_required()
      def patch(self, category_id):
          args = category_args.parse_args()
@@ -730,6 +1206,7 @@ class Categories(Resource):
          return {"message": f"Categoría {category_id} actualizada"}
 
      
+     @response_cache.invalidates("categories")
      @jwt_required()
      def delete(self, category_id):
         category = Category.query.filter_by(id=category_id).first()
@@ -756,8 +1233,10 @@ brand_fields = {
     'created_at': fields.DateTime,
     'updated_at': fields.DateTime
 }
+serialize_brands = compile_fields(brand_fields)
 
 class Brands(Resource):
+    @response_cache.invalidates("brands")
     @marshal_with(brand_fields)
     @jwt_required()
     def post(self):
@@ -796,15 +1275,16 @@ class Brands(Resource):
         # Retornar el objeto brand recién creado
         return brand, 201
 
-    @marshal_with(brand_fields)
     @jwt_required()
+    @response_cache.cached("brands")
     def get(self):
-        # Obtener todas las marcas
-        brands = Brand.query.all()
-        return brands
+        # Obtener las marcas paginadas por id
+        brands, next_cursor = paginate(Brand.query, [Brand.id])
+        return page_response(serialize_brands(brands), next_cursor)
 
 class BrandResource(Resource):
     @jwt_required()
+    @response_cache.cached("brands")
     @marshal_with(brand_fields)
     def get(self, brand_id):
         # Obtener una marca específica por ID
@@ -813,6 +1293,7 @@ class BrandResource(Resource):
             abort(404, message="Brand not found")
         return brand
 
+    @response_cache.invalidates("brands")
     @marshal_with(brand_fields)
     @jwt_required()
     def patch(self, brand_id):
@@ -849,6 +1330,7 @@ class BrandResource(Resource):
         db.session.commit()
         return brand
     
+    @response_cache.invalidates("brands")
     @jwt_required()
     def delete(self, brand_id):
         # Buscar la marca por ID
@@ -0,0 +1,99 @@
+import csv
+import io
+from datetime import timezone
+
+from flask import Response, request, stream_with_context
+from flask_restful import Resource, abort, fields, inputs
+from sqlalchemy import String, select, type_coerce
+
+from api.extensions import db
+from api.middleware.auth import role_required
+from api.models import Order, Product, User
+from api.serializers import compile_fields, dumps
+
+# Filas por lote: tamaño de cada fetch a la base y de cada bloque escrito en la respuesta
+EXPORT_CHUNK_SIZE = 1000
+
+timestamp_fields = {"created_at": fields.DateTime(dt_format="iso8601"), "updated_at": fields.DateTime(dt_format="iso8601")}
+
+# Columnas exportadas por entidad; los usuarios salen sin contraseñas ni tokens
+export_fields = {
+    "products": (Product, dict({
+        "id": fields.Integer, "name": fields.String, "price": fields.Float, "description": fields.String,
+        "stock": fields.Integer, "img": fields.String, "category_id": fields.Integer, "brand_id": fields.Integer,
+    }, **timestamp_fields)),
+    "orders": (Order, dict({
+        "id": fields.Integer, "user_id": fields.Integer, "total_amount": fields.Float,
+    }, **timestamp_fields)),
+    "users": (User, dict({
+        "id": fields.Integer, "name": fields.String, "lstF": fields.String, "lstM": fields.String,
+        "address": fields.String, "email": fields.String, "phone": fields.String, "payment": fields.String,
+        "role": fields.Integer,
+    }, **timestamp_fields)),
+}
+
+
+def export_rows(model, columns, updated_since=None):
+    # SELECT de columnas (sin entidades ORM) leído por lotes: la memoria no crece con la tabla
+    statement = select(*[getattr(model, column) for column in columns]).order_by(model.id)
+    if updated_since is not None:
+        # Comparación como texto contra el segundo de la marca ('YYYY-MM-DD HH:MM:SS'): entran las
+        # filas de CURRENT_TIMESTAMP (sin microsegundos) de ese mismo segundo y se sigue usando
+        # el índice sobre updated_at. Un datetime enlazado llevaría '.000000' y las dejaría fuera
+        watermark = updated_since.strftime("%Y-%m-%d %H:%M:%S")
+        statement = statement.where(type_coerce(model.updated_at, String) >= watermark)
+    result = db.session.execute(statement.execution_options(yield_per=EXPORT_CHUNK_SIZE))
+    yield from result.partitions()
+
+
+def ndjson_chunks(partitions, serialize):
+    for rows in partitions:
+        yield b"".join(dumps(serialize(row)) + b"\n" for row in rows)
+
+
+def csv_chunks(partitions, serialize, columns):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, lineterminator="\n")
+    writer.writeheader()
+    for rows in partitions:
+        writer.writerows(serialize(row) for row in rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+class ExportResource(Resource):
+    @role_required(1)
+    def get(self, entity):
+        if entity not in export_fields:
+            abort(404, message=f"Unknown export '{entity}'. Options: {', '.join(export_fields)}")
+        export_format = request.args.get("format", "ndjson")
+        if export_format not in ("ndjson", "csv"):
+            abort(400, message="format must be 'ndjson' or 'csv'")
+
+        updated_since = request.args.get("updated_since")
+        if updated_since:
+            try:
+                updated_since = inputs.datetime_from_iso8601(updated_since)
+            except ValueError:
+                abort(400, message="updated_since must be an ISO 8601 datetime")
+            # updated_at se guarda en UTC sin zona horaria
+            if updated_since.tzinfo is not None:
+                updated_since = updated_since.astimezone(timezone.utc).replace(tzinfo=None)
+
+        model, field_map = export_fields[entity]
+        columns = list(field_map)
+        serialize = compile_fields(field_map)
+        partitions = export_rows(model, columns, updated_since or None)
+
+        if export_format == "csv":
+            body, mimetype = csv_chunks(partitions, serialize, columns), "text/csv"
+        else:
+            body, mimetype = ndjson_chunks(partitions, serialize), "application/x-ndjson"
+        return Response(
+            stream_with_context(body),
+            mimetype=mimetype,
+            headers={"Content-Disposition": f"attachment; filename={entity}.{export_format}"},
+        )
@@ -1,3 +1,15 @@
 from flask_sqlalchemy import SQLAlchemy
+from api.hashing import PasswordHasher
+from api.cache import ResponseCache
+from api.sqlite_pragmas import SQLitePragmas
+from api.middleware.query_stats import QueryStats
+from api.metrics import Metrics
+from api.checkout_worker import CheckoutWorkers
 
-db= SQLAlchemy()
\ No newline at end of file
+db= SQLAlchemy()
+hasher = PasswordHasher()
+response_cache = ResponseCache()
+sqlite_pragmas = SQLitePragmas(db)
+query_stats = QueryStats(db)
+metrics = Metrics(db)
+checkout_workers = CheckoutWorkers()
\ No newline at end of file
@@ -0,0 +1,117 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from flask import current_app
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class HashPoolSaturated(Exception):
+    pass
+
+
+def _timed_call(fn, *args):
+    # Corre en el proceso del pool; devuelve cuándo empezó para medir la espera en cola
+    return time.time(), fn(*args)
+
+
+class PasswordHasher:
+    """Ejecuta pbkdf2 en un pool de procesos acotado para no bloquear los hilos de la API.
+
+    ``AUTH_HASH_WORKERS`` procesos atienden como máximo ``AUTH_HASH_WORKERS + AUTH_HASH_QUEUE_SIZE``
+    operaciones a la vez; si no hay lugar en ``AUTH_HASH_QUEUE_TIMEOUT`` segundos se lanza
+    ``HashPoolSaturated``. Con ``AUTH_HASH_WORKERS = 0`` (o sin ``init_app``) se calcula en línea.
+    Si un proceso del pool muere el executor queda roto: se reemplaza por uno nuevo y la
+    operación se reintenta una vez antes de lanzar ``HashPoolSaturated``.
+    """
+
+    def __init__(self, app=None):
+        self.workers = 0
+        self.queue_timeout = 0
+        self._executor = None
+        self._slots = None
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "rejected": 0, "wait_seconds_total": 0.0, "wait_seconds_max": 0.0, "run_seconds_total": 0.0}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("AUTH_HASH_WORKERS", min(4, os.cpu_count() or 1))
+        app.config.setdefault("AUTH_HASH_QUEUE_SIZE", 32)
+        app.config.setdefault("AUTH_HASH_QUEUE_TIMEOUT", 0.5)
+        app.config.setdefault("AUTH_HASH_START_METHOD", "spawn")
+        self.workers = app.config["AUTH_HASH_WORKERS"]
+        self.queue_timeout = app.config["AUTH_HASH_QUEUE_TIMEOUT"]
+        self.start_method = app.config["AUTH_HASH_START_METHOD"]
+        self._slots = threading.BoundedSemaphore(self.workers + app.config["AUTH_HASH_QUEUE_SIZE"])
+        app.extensions["password_hasher"] = self
+
+    def generate_password_hash(self, password):
+        return self._run(generate_password_hash, password, "pbkdf2:sha256")
+
+    def check_password_hash(self, pwhash, password):
+        return self._run(check_password_hash, pwhash, password)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+    def _run(self, fn, *args):
+        submitted = time.time()
+        if not self.workers or current_app.extensions.get("password_hasher") is not self:
+            result = fn(*args)
+            self._record(0.0, time.time() - submitted)
+            return result
+
+        # Contrapresión: si el pool y su cola están llenos se rechaza en lugar de encolar sin límite
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            with self._lock:
+                self._stats["rejected"] += 1
+            raise HashPoolSaturated("Password hashing pool is saturated")
+        try:
+            started, result = self._submit(fn, *args)
+        finally:
+            self._slots.release()
+        self._record(max(started - submitted, 0.0), time.time() - started)
+        return result
+
+    def _submit(self, fn, *args):
+        for _ in range(2):
+            executor = self._pool()
+            try:
+                return executor.submit(_timed_call, fn, *args).result()
+            except BrokenProcessPool:
+                self._discard(executor)
+        raise HashPoolSaturated("Password hashing pool is broken")
+
+    def _discard(self, executor):
+        # Solo el primer hilo que lo detecta lo reemplaza; los demás ya ven el executor nuevo
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False)
+
+    def _pool(self):
+        # Se crea al primer uso, ya dentro del worker (compatible con servidores pre-fork)
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers, mp_context=multiprocessing.get_context(self.start_method)
+                    )
+        return self._executor
+
+    def _record(self, wait, run):
+        with self._lock:
+            self._stats["calls"] += 1
+            self._stats["wait_seconds_total"] += wait
+            self._stats["wait_seconds_max"] = max(self._stats["wait_seconds_max"], wait)
+            self._stats["run_seconds_total"] += run
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
@@ -0,0 +1,131 @@
+import hashlib
+import json
+import time
+from datetime import timedelta
+from functools import wraps
+
+from flask import current_app, request
+from flask_restful import abort
+from flask_restful.utils import unpack
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+from werkzeug.exceptions import HTTPException
+
+from api.extensions import db
+from api.middleware.auth import current_user_id
+from api.models import IdempotencyKey, utcnow
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+
+_last_purge = 0.0
+
+
+def _request_hash():
+    digest = hashlib.sha256(f"{request.method} {request.path}\n".encode())
+    digest.update(request.get_data())
+    return digest.hexdigest()
+
+
+def purge_expired(now=None):
+    """Borra las llaves vencidas (usa el índice sobre expires_at)."""
+    result = db.session.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at < (now or utcnow())))
+    db.session.commit()
+    return result.rowcount
+
+
+def _maybe_purge(now):
+    global _last_purge
+    interval = current_app.config.get("IDEMPOTENCY_PURGE_INTERVAL", 300)
+    if time.monotonic() - _last_purge >= interval:
+        _last_purge = time.monotonic()
+        purge_expired(now)
+
+
+def _reserve(key, user_id, scope, request_hash, now):
+    """Registra la llave como "en curso"; devuelve ``None`` si es nueva o la fila existente."""
+    ttl = current_app.config.get("IDEMPOTENCY_TTL", 24 * 3600)
+    # Una reserva sin respuesta tras este tiempo se considera abandonada (proceso caído)
+    abandoned = now - timedelta(seconds=current_app.config.get("IDEMPOTENCY_LOCK_TIMEOUT", 60))
+    for _ in range(2):
+        db.session.add(IdempotencyKey(key=key, user_id=user_id, scope=scope, request_hash=request_hash,
+                                      created_at=now, expires_at=now + timedelta(seconds=ttl)))
+        try:
+            db.session.commit()
+            return None
+        except IntegrityError:
+            db.session.rollback()
+        existing = IdempotencyKey.query.filter_by(user_id=user_id, scope=scope, key=key).first()
+        if existing is None:
+            continue  # La otra petición falló y liberó la llave entre el INSERT y el SELECT
+        if existing.expires_at <= now or (existing.status is None and existing.created_at <= abandoned):
+            db.session.delete(existing)
+            db.session.commit()
+            continue
+        return existing
+    abort(409, message="A request with this Idempotency-Key is already in progress")
+
+
+def _release(key, user_id, scope):
+    db.session.rollback()
+    db.session.execute(delete(IdempotencyKey).where(
+        IdempotencyKey.user_id == user_id, IdempotencyKey.scope == scope, IdempotencyKey.key == key))
+    db.session.commit()
+
+
+def _store(key, user_id, scope, data, code):
+    db.session.execute(update(IdempotencyKey).where(
+        IdempotencyKey.user_id == user_id, IdempotencyKey.scope == scope, IdempotencyKey.key == key,
+    ).values(status=code, body=json.dumps(data, default=str)))
+    db.session.commit()
+
+
+def idempotent(scope):
+    """Hace idempotente el POST decorado cuando el cliente envía ``Idempotency-Key``.
+
+    La primera petición reserva la llave (por usuario y ``scope``) y guarda su respuesta; los
+    reintentos con la misma llave reciben esa respuesta con ``Idempotent-Replayed: true`` sin
+    ejecutar el handler. Si la original sigue en curso se responde 409, y si la llave se reutiliza
+    con otro cuerpo, 422. Los errores 5xx liberan la llave para poder reintentar. Las llaves
+    vencen a los ``IDEMPOTENCY_TTL`` segundos y una reserva sin respuesta se libera tras
+    ``IDEMPOTENCY_LOCK_TIMEOUT``. Ponerlo debajo de ``@jwt_required()``.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = request.headers.get(HEADER)
+            if not key:
+                return fn(*args, **kwargs)
+            if len(key) > MAX_KEY_LENGTH:
+                abort(400, message=f"{HEADER} must be at most {MAX_KEY_LENGTH} characters")
+
+            user_id, request_hash, now = str(current_user_id()), _request_hash(), utcnow()
+            _maybe_purge(now)
+            existing = _reserve(key, user_id, scope, request_hash, now)
+            if existing is not None:
+                if existing.request_hash != request_hash:
+                    abort(422, message=f"{HEADER} was already used with a different request")
+                if existing.status is None:
+                    abort(409, message="A request with this Idempotency-Key is already in progress")
+                return json.loads(existing.body), existing.status, {"Idempotent-Replayed": "true"}
+
+            try:
+                data, code, headers = unpack(fn(*args, **kwargs))
+            except HTTPException as e:
+                if e.code < 500 and getattr(e, "data", None) is not None:
+                    db.session.rollback()
+                    _store(key, user_id, scope, e.data, e.code)
+                else:
+                    _release(key, user_id, scope)
+                raise
+            except Exception:
+                _release(key, user_id, scope)
+                raise
+
+            if code < 500:
+                _store(key, user_id, scope, data, code)
+            else:
+                _release(key, user_id, scope)
+            return data, code, headers
+        return wrapper
+    return decorator
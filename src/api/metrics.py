@@ -0,0 +1,278 @@
+import glob
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from flask import Response, current_app, g, request
+
+# Límites (segundos) de los buckets del histograma de latencia
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HELP = {
+    "http_requests_total": ("counter", "Requests handled, by resource, method and status."),
+    "http_request_duration_seconds": ("histogram", "Request latency, by resource, method and status."),
+    "http_requests_in_flight": ("gauge", "Requests currently being handled."),
+    "db_pool_size": ("gauge", "Configured size of the connection pool."),
+    "db_pool_checked_out": ("gauge", "Connections currently checked out of the pool."),
+    "db_pool_overflow": ("gauge", "Connections open beyond the pool size."),
+    "auth_hash_calls_total": ("counter", "Password hashing operations."),
+    "auth_hash_rejected_total": ("counter", "Hashing operations rejected because the pool was saturated."),
+    "auth_hash_wait_seconds_total": ("counter", "Time hashing operations spent queued for a worker."),
+    "auth_hash_run_seconds_total": ("counter", "Time spent computing password hashes."),
+    "jwt_verify_cache_hits_total": ("counter", "Tokens served from the verified-token cache."),
+    "jwt_verify_cache_misses_total": ("counter", "Tokens that needed full signature verification."),
+    "jwt_verify_cache_evictions_total": ("counter", "Tokens evicted from the verified-token cache."),
+    "jwt_verify_cache_size": ("gauge", "Tokens currently in the verified-token cache."),
+}
+
+
+class MetricsRegistry:
+    """Contadores, gauges e histogramas de un proceso, indexados por ``(nombre, etiquetas)``."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def inc(self, name, labels, amount=1):
+        key = self.key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def add(self, name, labels, amount):
+        key = self.key(name, labels)
+        with self._lock:
+            self.gauges[key] = self.gauges.get(key, 0) + amount
+
+    def observe(self, name, labels, value):
+        key = self.key(name, labels)
+        with self._lock:
+            # Conteos por bucket (no acumulados) + suma + cantidad
+            histogram = self.histograms.setdefault(key, [0] * (len(self.buckets) + 1) + [0.0, 0])
+            histogram[bisect_left(self.buckets, value)] += 1
+            histogram[-2] += value
+            histogram[-1] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "buckets": list(self.buckets),
+                "counters": [[name, list(labels), value] for (name, labels), value in self.counters.items()],
+                "gauges": [[name, list(labels), value] for (name, labels), value in self.gauges.items()],
+                "histograms": [[name, list(labels), list(value)] for (name, labels), value in self.histograms.items()],
+            }
+
+
+def merge(snapshots):
+    """Suma los snapshots de varios procesos (contadores, gauges y buckets)."""
+    merged = {"buckets": None, "counters": {}, "gauges": {}, "histograms": {}}
+    for snapshot in snapshots:
+        merged["buckets"] = merged["buckets"] or snapshot["buckets"]
+        for kind in ("counters", "gauges"):
+            for name, labels, value in snapshot[kind]:
+                key = (name, tuple(tuple(label) for label in labels))
+                merged[kind][key] = merged[kind].get(key, 0) + value
+        for name, labels, value in snapshot["histograms"]:
+            key = (name, tuple(tuple(label) for label in labels))
+            current = merged["histograms"].get(key)
+            merged["histograms"][key] = value if current is None else [a + b for a, b in zip(current, value)]
+    return merged
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(merged):
+    """Formato de exposición de texto de Prometheus (0.0.4)."""
+    series = {}
+    for kind in ("counters", "gauges", "histograms"):
+        for (name, labels), value in merged[kind].items():
+            series.setdefault(name, []).append((labels, value))
+
+    lines = []
+    for name in sorted(series):
+        kind, description = HELP.get(name, ("untyped", name))
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in sorted(series[name]):
+            if kind != "histogram":
+                lines.append(f"{name}{_labels(labels)} {_number(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip(list(merged["buckets"]) + ["+Inf"], value[:-2]):
+                cumulative += count
+                le = bound if bound == "+Inf" else _number(float(bound))
+                lines.append(f"{name}_bucket{_labels(labels, [('le', le)])} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {_number(value[-2])}")
+            lines.append(f"{name}_count{_labels(labels)} {value[-1]}")
+    return "\n".join(lines) + "\n"
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class Metrics:
+    """Métricas HTTP, del pool de conexiones y del hashing de contraseñas en ``METRICS_PATH``.
+
+    Las peticiones se etiquetan con la clase del recurso de Flask-RESTful (``ProductResource``, ...),
+    el método y el status. Con varios procesos (gunicorn, uWSGI pre-fork) configurar ``METRICS_DIR``:
+    cada proceso vuelca su snapshot a ``<METRICS_DIR>/<pid>.json`` como mucho cada
+    ``METRICS_FLUSH_INTERVAL`` segundos y ``/metrics`` suma los de todos. Los contadores de procesos
+    que ya terminaron se conservan; sus gauges se descartan.
+    """
+
+    def __init__(self, db=None, app=None):
+        self.db = db
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("METRICS_PATH", "/metrics")
+        app.config.setdefault("METRICS_DIR", None)
+        app.config.setdefault("METRICS_FLUSH_INTERVAL", 1.0)
+        app.config.setdefault("METRICS_BUCKETS", DEFAULT_BUCKETS)
+        app.extensions["metrics"] = {"registry": None, "pid": None, "last_flush": 0.0, "lock": threading.Lock()}
+        if app.config["METRICS_DIR"]:
+            os.makedirs(app.config["METRICS_DIR"], exist_ok=True)
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        if app.config["METRICS_PATH"]:
+            app.add_url_rule(app.config["METRICS_PATH"], "metrics", self.metrics_view)
+
+    @staticmethod
+    def state():
+        return current_app.extensions["metrics"]
+
+    def registry(self):
+        state = self.state()
+        # Tras un fork el hijo empieza de cero: lo heredado del master no es suyo
+        if state["pid"] != os.getpid():
+            with state["lock"]:
+                if state["pid"] != os.getpid():
+                    state["registry"] = MetricsRegistry(current_app.config["METRICS_BUCKETS"])
+                    state["pid"] = os.getpid()
+                    state["last_flush"] = 0.0
+        return state["registry"]
+
+    @staticmethod
+    def resource_name():
+        view = current_app.view_functions.get(request.endpoint) if request.endpoint else None
+        view_class = getattr(view, "view_class", None)
+        return view_class.__name__ if view_class else (request.endpoint or "none")
+
+    def _before_request(self):
+        g.metrics_labels = {"resource": self.resource_name(), "method": request.method}
+        g.metrics_started = time.perf_counter()
+        self.registry().add("http_requests_in_flight", g.metrics_labels, 1)
+
+    def _after_request(self, response):
+        labels = g.get("metrics_labels")
+        if labels is not None:
+            registry = self.registry()
+            labels = dict(labels, status=str(response.status_code))
+            registry.inc("http_requests_total", labels)
+            registry.observe("http_request_duration_seconds", labels, time.perf_counter() - g.metrics_started)
+            self.maybe_flush()
+        return response
+
+    def _teardown_request(self, exception=None):
+        labels = g.pop("metrics_labels", None)
+        if labels is not None:
+            self.registry().add("http_requests_in_flight", labels, -1)
+
+    def process_snapshot(self):
+        """Snapshot del proceso actual más las lecturas puntuales de pool, hashing y caché de tokens."""
+        snapshot = self.registry().snapshot()
+        snapshot["pid"] = os.getpid()
+        for bind, engine in self.db.engines.items():
+            pool, labels = engine.pool, [["bind", bind or "default"]]
+            if hasattr(pool, "checkedout"):
+                snapshot["gauges"] += [
+                    ["db_pool_size", labels, pool.size()],
+                    ["db_pool_checked_out", labels, pool.checkedout()],
+                    ["db_pool_overflow", labels, max(pool.overflow(), 0)],
+                ]
+        hasher = current_app.extensions.get("password_hasher")
+        if hasher is not None:
+            stats = hasher.stats()
+            snapshot["counters"] += [
+                ["auth_hash_calls_total", [], stats["calls"]],
+                ["auth_hash_rejected_total", [], stats["rejected"]],
+                ["auth_hash_wait_seconds_total", [], stats["wait_seconds_total"]],
+                ["auth_hash_run_seconds_total", [], stats["run_seconds_total"]],
+            ]
+        # Caché de tokens verificados (CachingJWTManager): aciertos frente a verificaciones completas
+        token_cache = getattr(current_app.extensions.get("flask-jwt-extended"), "token_cache", None)
+        if token_cache is not None:
+            stats = token_cache.stats()
+            snapshot["counters"] += [
+                ["jwt_verify_cache_hits_total", [], stats["hits"]],
+                ["jwt_verify_cache_misses_total", [], stats["misses"]],
+                ["jwt_verify_cache_evictions_total", [], stats["evictions"]],
+            ]
+            snapshot["gauges"] += [["jwt_verify_cache_size", [], stats["size"]]]
+        return snapshot
+
+    def maybe_flush(self, force=False):
+        directory, state = current_app.config["METRICS_DIR"], self.state()
+        now = time.monotonic()
+        if not directory or (not force and now - state["last_flush"] < current_app.config["METRICS_FLUSH_INTERVAL"]):
+            return
+        state["last_flush"] = now
+        path = os.path.join(directory, f"{os.getpid()}.json")
+        # Escritura atómica: quien lea nunca ve un archivo a medias
+        with open(f"{path}.tmp", "w") as handle:
+            json.dump(self.process_snapshot(), handle)
+        os.replace(f"{path}.tmp", path)
+
+    def collect(self):
+        own = self.process_snapshot()
+        directory = current_app.config["METRICS_DIR"]
+        if not directory:
+            return merge([own])
+
+        snapshots = [own]
+        for path in glob.glob(os.path.join(directory, "*.json")):
+            try:
+                with open(path) as handle:
+                    snapshot = json.load(handle)
+            except (OSError, ValueError):
+                continue
+            if snapshot.get("pid") == own["pid"]:
+                continue
+            if not _pid_alive(snapshot["pid"]):
+                snapshot["gauges"] = []
+            snapshots.append(snapshot)
+        return merge(snapshots)
+
+    def metrics_view(self):
+        return Response(render(self.collect()), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,4 +1,6 @@
-from flask_jwt_extended import get_jwt, verify_jwt_in_request
+from flask import g
+from flask_jwt_extended import get_jwt, get_jwt_identity, verify_jwt_in_request
+from flask_restful import abort
 from functools import wraps
 
 def role_required(*required_roles):
@@ -14,3 +16,19 @@ def role_required(*required_roles):
     return decorator
 
 
+def current_user_id():
+    """Id entero del usuario del token verificado, sin consultar la base.
+
+    Usa la claim ``id`` que pone el login (la identity es el email); si falta, la identity debe
+    ser el id. Se resuelve una vez por token y petición.
+    """
+    claims = get_jwt()
+    cached = g.get("_current_user_id")
+    if cached is not None and cached[0] is claims:
+        return cached[1]
+    try:
+        user_id = int(claims.get("id", get_jwt_identity()))
+    except (TypeError, ValueError):
+        abort(401, message="El token no identifica a un usuario")
+    g._current_user_id = (claims, user_id)
+    return user_id
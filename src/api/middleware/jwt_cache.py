@@ -0,0 +1,88 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from flask_jwt_extended import JWTManager
+
+
+class VerifiedTokenCache:
+    """LRU acotado de tokens ya verificados, indexado por el sha256 del token.
+
+    Cada entrada vence en el ``exp`` del propio token, así que un token expirado nunca se
+    sirve desde la caché y vuelve a pasar por la verificación completa (que lo rechaza).
+    """
+
+    def __init__(self, maxsize=4096, clock=time.time):
+        self.maxsize = maxsize
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(encoded_token):
+        return hashlib.sha256(encoded_token.encode()).digest()
+
+    def get(self, encoded_token):
+        key = self.key(encoded_token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                claims, expires_at = entry
+                if expires_at is None or self.clock() < expires_at:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return dict(claims)
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, encoded_token, claims):
+        key = self.key(encoded_token)
+        with self._lock:
+            self._entries[key] = (dict(claims), claims.get("exp"))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"size": len(self._entries), "maxsize": self.maxsize, "hits": self.hits,
+                    "misses": self.misses, "evictions": self.evictions}
+
+
+class CachingJWTManager(JWTManager):
+    """JWTManager que evita verificar la firma y parsear los claims de un token ya visto.
+
+    Lo usan tanto ``@jwt_required()`` como ``role_required``, que pasan por
+    ``verify_jwt_in_request``. El tamaño se configura con ``JWT_VERIFY_CACHE_SIZE``.
+    Al rotar ``JWT_SECRET_KEY`` hay que llamar a ``token_cache.clear()``.
+    """
+
+    def __init__(self, app=None, add_context_processor=False):
+        self.token_cache = VerifiedTokenCache()
+        super().__init__(app, add_context_processor)
+
+    def init_app(self, app, add_context_processor=False):
+        super().init_app(app, add_context_processor)
+        app.config.setdefault("JWT_VERIFY_CACHE_SIZE", 4096)
+        self.token_cache.maxsize = app.config["JWT_VERIFY_CACHE_SIZE"]
+
+    def _decode_jwt_from_config(self, encoded_token, csrf_value=None, allow_expired=False):
+        # Los tokens en cookies (con CSRF) y las lecturas que aceptan expirados no se cachean
+        if csrf_value is not None or allow_expired:
+            return super()._decode_jwt_from_config(encoded_token, csrf_value, allow_expired)
+
+        claims = self.token_cache.get(encoded_token)
+        if claims is None:
+            claims = super()._decode_jwt_from_config(encoded_token, csrf_value, allow_expired)
+            self.token_cache.set(encoded_token, claims)
+        return claims
@@ -0,0 +1,74 @@
+import logging
+import time
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+
+def request_query_stats():
+    """``(consultas, segundos en la base)`` acumulados por la petición actual."""
+    return g.get("db_query_count", 0), g.get("db_query_seconds", 0.0)
+
+
+class QueryStats:
+    """Cuenta las consultas SQL y el tiempo en la base de cada petición.
+
+    Con ``QUERY_STATS_HEADERS`` (por defecto, solo en modo debug) las respuestas llevan
+    ``X-DB-Query-Count`` y ``X-DB-Time-ms``. Toda sentencia que tarde más de
+    ``QUERY_SLOW_THRESHOLD_MS`` se registra como warning junto con el endpoint que la ejecutó
+    (``None`` desactiva el log). Llamar después de ``db.init_app(app)``.
+    """
+
+    def __init__(self, db=None, app=None):
+        self.db = db
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("QUERY_STATS_HEADERS", None)
+        app.config.setdefault("QUERY_SLOW_THRESHOLD_MS", 200)
+        threshold = app.config["QUERY_SLOW_THRESHOLD_MS"]
+        slow_seconds = threshold / 1000 if threshold is not None else None
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+        def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            elapsed = time.perf_counter() - conn.info["query_started"].pop()
+            endpoint = None
+            if has_request_context():
+                g.db_query_count = g.get("db_query_count", 0) + 1
+                g.db_query_seconds = g.get("db_query_seconds", 0.0) + elapsed
+                endpoint = request.endpoint
+            if slow_seconds is not None and elapsed >= slow_seconds:
+                logger.warning("Slow query (%.1f ms) in %s: %s", elapsed * 1000, endpoint, statement)
+
+        def handle_error(exception_context):
+            # Una sentencia que falla no pasa por after_cursor_execute
+            connection = exception_context.connection
+            if connection is not None and connection.info.get("query_started"):
+                connection.info["query_started"].pop()
+
+        with app.app_context():
+            for engine in self.db.engines.values():
+                event.listen(engine, "before_cursor_execute", before_cursor_execute)
+                event.listen(engine, "after_cursor_execute", after_cursor_execute)
+                event.listen(engine, "handle_error", handle_error)
+
+        @app.before_request
+        def reset_query_stats():
+            # g vive en el app context, que puede abarcar más de una petición (tests, CLI)
+            g.db_query_count, g.db_query_seconds = 0, 0.0
+
+        @app.after_request
+        def add_query_headers(response):
+            enabled = app.config["QUERY_STATS_HEADERS"]
+            if enabled or (enabled is None and app.debug):
+                count, seconds = request_query_stats()
+                response.headers["X-DB-Query-Count"] = str(count)
+                response.headers["X-DB-Time-ms"] = f"{seconds * 1000:.2f}"
+            return response
+
+        app.extensions["query_stats"] = self
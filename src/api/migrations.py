@@ -0,0 +1,72 @@
+from sqlalchemy import inspect, text
+
+from api.extensions import db
+from api.search import create_search_index
+
+
+def add_order_product_price(connection):
+    # Precio unitario al momento de la compra; las filas anteriores quedan en NULL
+    columns = {column["name"] for column in inspect(connection).get_columns("order_product")}
+    if "price" not in columns:
+        connection.execute(text("ALTER TABLE order_product ADD COLUMN price NUMERIC(10, 2)"))
+
+
+def add_order_user_created_index(connection):
+    connection.execute(text('CREATE INDEX IF NOT EXISTS ix_order_user_created ON "order" (user_id, created_at)'))
+
+
+def add_product_indexes(connection):
+    # create_all no agrega índices a una tabla product que ya existía
+    connection.execute(text("CREATE INDEX IF NOT EXISTS ix_product_category_price_stock ON product (category_id, price, stock)"))
+    connection.execute(text("CREATE INDEX IF NOT EXISTS ix_product_brand_price_stock ON product (brand_id, price, stock)"))
+    connection.execute(text("CREATE INDEX IF NOT EXISTS ix_product_price ON product (price)"))
+    connection.execute(text("CREATE INDEX IF NOT EXISTS ix_product_updated_at ON product (updated_at)"))
+
+
+def normalize_order_created_at(connection):
+    # CURRENT_TIMESTAMP guarda 'YYYY-MM-DD HH:MM:SS' y el cursor del historial se compara como
+    # 'YYYY-MM-DD HH:MM:SS.ffffff': como texto la fila del cursor quedaba siempre "antes" que él
+    connection.execute(text(
+        "UPDATE \"order\" SET created_at = created_at || '.000000' WHERE length(created_at) = 19"
+    ))
+
+
+def repair_email_user_ids(connection):
+    # Los tokens del login tienen el email como identity y hubo filas guardadas con él como user_id
+    for table in ("cart", "wishlist", "order", "checkout_job"):
+        connection.execute(text(
+            f'UPDATE "{table}" SET user_id = (SELECT id FROM user WHERE user.email = "{table}".user_id) '
+            f'WHERE typeof(user_id) = \'text\' AND user_id IN (SELECT email FROM user)'
+        ))
+    # Una clave guardada con el email y también con el id violaría uq_idempotency_key: se deja la del id
+    # (OR IGNORE saltea esas filas) y se borran las que quedaron con el email
+    connection.execute(text(
+        "UPDATE OR IGNORE idempotency_key "
+        "SET user_id = (SELECT CAST(id AS TEXT) FROM user WHERE user.email = idempotency_key.user_id) "
+        "WHERE user_id IN (SELECT email FROM user)"
+    ))
+    connection.execute(text("DELETE FROM idempotency_key WHERE user_id IN (SELECT email FROM user)"))
+
+
+# Migraciones idempotentes, en orden; se ejecutan después de db.create_all()
+MIGRATIONS = [
+    add_order_product_price,
+    add_order_user_created_index,
+    repair_email_user_ids,
+    normalize_order_created_at,
+    add_product_indexes,
+]
+
+
+def run_migrations(connection):
+    for migration in MIGRATIONS:
+        migration(connection)
+
+
+def init_db():
+    """Crea las tablas que falten, aplica las migraciones y el índice de búsqueda (requiere app context)."""
+    db.create_all()
+    with db.engine.begin() as connection:
+        run_migrations(connection)
+        # Índice de búsqueda para bases creadas antes de existir product_fts
+        create_search_index(connection)
@@ -1,5 +1,13 @@
+from datetime import datetime, timezone
+
 from .extensions import db
 
+
+def utcnow():
+    # UTC sin zona, igual que CURRENT_TIMESTAMP pero guardado con microsegundos
+    # ('YYYY-MM-DD HH:MM:SS.ffffff'), el mismo formato con el que se enlazan los cursores
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -58,6 +66,15 @@ class Product(db.Model):
     created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
     updated_at = db.Column(db.DateTime, default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
 
+    # Índices compuestos para los filtros del listado: los conteos por categoría/marca con
+    # rango de precio y stock se resuelven solo con el índice (covering index)
+    __table_args__ = (
+        db.Index('ix_product_category_price_stock', 'category_id', 'price', 'stock'),
+        db.Index('ix_product_brand_price_stock', 'brand_id', 'price', 'stock'),
+        db.Index('ix_product_price', 'price'),
+        db.Index('ix_product_updated_at', 'updated_at'),  # max(updated_at) para los ETag
+    )
+
     def __repr__(self):
         return f'<Product {self.name}>'
     
@@ -65,12 +82,19 @@ class Order(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)  # Relación con User
     total_amount = db.Column(db.Numeric(10, 2), nullable=False)
-    created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+    # Llave de paginación del historial: se genera en Python para que todas las filas compartan
+    # formato con el cursor (ver normalize_order_created_at en api/migrations.py)
+    created_at = db.Column(db.DateTime, default=utcnow)
     updated_at = db.Column(db.DateTime, default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
 
     # Relación inversa a User
     user = db.relationship('User', backref='orders', passive_deletes=True)
 
+    # Historial por usuario ordenado por fecha (GET /orders)
+    __table_args__ = (
+        db.Index('ix_order_user_created', 'user_id', 'created_at'),
+    )
+
     def __repr__(self):
         return f'<Order {self.id}>'
     
@@ -97,6 +121,7 @@ class OrderProduct(db.Model):
     order_id = db.Column(db.Integer, db.ForeignKey('order.id', ondelete='CASCADE'), nullable=False)
     product_id = db.Column(db.Integer, db.ForeignKey('product.id', ondelete='CASCADE'), nullable=False)
     quantity = db.Column(db.Integer, nullable=False)
+    price = db.Column(db.Numeric(10, 2), nullable=True)  # Precio unitario al momento de la compra
     created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
     updated_at = db.Column(db.DateTime, default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
 
@@ -119,4 +144,64 @@ class Wishlist(db.Model):
     product = db.relationship('Product', backref=db.backref('wishlists', passive_deletes=True))
 
     def __repr__(self):
-        return f'<Wishlist {self.id}>'
\ No newline at end of file
+        return f'<Wishlist {self.id}>'
+class IdempotencyKey(db.Model):
+    __tablename__ = 'idempotency_key'
+    id = db.Column(db.Integer, primary_key=True)
+    key = db.Column(db.String(255), nullable=False)  # Valor de la cabecera Idempotency-Key
+    user_id = db.Column(db.String(255), nullable=False)  # Identidad del JWT que lo usó
+    scope = db.Column(db.String(50), nullable=False)  # Operación: "orders", "carts"...
+    request_hash = db.Column(db.String(64), nullable=False)  # sha256 del método, ruta y cuerpo
+    status = db.Column(db.Integer, nullable=True)  # NULL mientras la petición original está en curso
+    body = db.Column(db.Text, nullable=True)  # Respuesta JSON a repetir
+    created_at = db.Column(db.DateTime, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'scope', 'key', name='uq_idempotency_key'),
+        db.Index('ix_idempotency_key_expires_at', 'expires_at'),
+    )
+
+    def __repr__(self):
+        return f'<IdempotencyKey {self.key}>'
+
+class CheckoutJob(db.Model):
+    __tablename__ = 'checkout_job'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    cart_ids = db.Column(db.Text, nullable=False)  # JSON: líneas del carrito validadas al encolar
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, succeeded, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    available_at = db.Column(db.DateTime, nullable=False)  # No antes de esta hora (reintentos con espera)
+    locked_by = db.Column(db.String(100), nullable=True)
+    locked_at = db.Column(db.DateTime, nullable=True)
+    order_id = db.Column(db.Integer, db.ForeignKey('order.id', ondelete='SET NULL'), nullable=True)
+    error = db.Column(db.String(255), nullable=True)
+    created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+    updated_at = db.Column(db.DateTime, default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
+
+    # Los workers buscan el siguiente trabajo disponible por (status, available_at)
+    __table_args__ = (
+        db.Index('ix_checkout_job_status_available', 'status', 'available_at'),
+    )
+
+    def __repr__(self):
+        return f'<CheckoutJob {self.id} {self.status}>'
+
+class SalesRollup(db.Model):
+    __tablename__ = 'sales_rollup'
+    id = db.Column(db.Integer, primary_key=True)
+    dimension = db.Column(db.String(20), nullable=False)  # product, category o brand
+    key_id = db.Column(db.Integer, nullable=False)  # id del producto, la categoría o la marca
+    day = db.Column(db.Date, nullable=False)  # Día (UTC) de la orden
+    units = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+
+    # La restricción única es el destino del upsert; los reportes filtran por (dimension, day)
+    __table_args__ = (
+        db.UniqueConstraint('dimension', 'key_id', 'day', name='uq_sales_rollup'),
+        db.Index('ix_sales_rollup_dimension_day', 'dimension', 'day'),
+    )
+
+    def __repr__(self):
+        return f'<SalesRollup {self.dimension}:{self.key_id} {self.day}>'
@@ -0,0 +1,101 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from decimal import Decimal
+
+from flask import request
+from flask_restful import abort
+from sqlalchemy import and_, or_
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(values):
+    # Cursor opaco: lista JSON con los valores de la llave de orden, en base64
+    raw = json.dumps([_to_json(value) for value in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, columns):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError
+        return [_from_json(value, column) for value, column in zip(values, columns)]
+    except (ValueError, TypeError, binascii.Error, UnicodeDecodeError):
+        abort(400, message="Invalid cursor")
+
+
+def _to_json(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def _from_json(value, column):
+    if value is None:
+        return None
+    python_type = column.type.python_type
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    return python_type(value)
+
+
+def page_args(default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    """Lee ``limit`` y ``after`` de la query string; el límite se recorta al máximo del servidor."""
+    limit = request.args.get("limit", default)
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        abort(400, message="limit must be an integer")
+    if limit <= 0:
+        abort(400, message="limit must be greater than 0")
+    return min(limit, maximum), request.args.get("after") or None
+
+
+def keyset_filter(columns, values, descending=False):
+    # Equivale a (c1, c2, ...) > (v1, v2, ...) pero usable por el índice en SQLite y Postgres
+    clauses = []
+    for i, column in enumerate(columns):
+        step = column < values[i] if descending else column > values[i]
+        clauses.append(and_(*[columns[j] == values[j] for j in range(i)], step))
+    return or_(*clauses)
+
+
+def paginate(query, columns, descending=False, key=None, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    """Pagina ``query`` por llave (keyset) ordenando por ``columns``.
+
+    Devuelve ``(items, next_cursor)``; ``next_cursor`` es ``None`` en la última página.
+    ``key`` extrae de una fila los valores de ``columns``; por defecto se leen como atributos.
+    """
+    limit, after = page_args(default, maximum)
+    if after:
+        query = query.filter(keyset_filter(columns, decode_cursor(after, columns), descending))
+    query = query.order_by(*[column.desc() if descending else column.asc() for column in columns])
+    rows = query.limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        values = key(last) if key else [getattr(last, column.key) for column in columns]
+        next_cursor = encode_cursor(values)
+    return rows, next_cursor
+
+
+def wants_envelope():
+    # Los clientes que piden paginación explícita reciben {"data": [...], "next_cursor": ...};
+    # el resto sigue recibiendo la lista, con el cursor en la cabecera X-Next-Cursor.
+    return "limit" in request.args or "after" in request.args
+
+
+def page_response(data, next_cursor, status=200):
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+    if wants_envelope():
+        return {"data": data, "next_cursor": next_cursor}, status, headers
+    return data, status, headers
@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta, timezone
+
+from flask import request
+from flask_restful import Resource, abort, inputs
+from sqlalchemy import func, select
+
+from api.extensions import db
+from api.middleware.auth import role_required
+from api.models import SalesRollup
+from api.rollups import DIMENSIONS
+
+DEFAULT_DAYS = 30
+MAX_DAYS = 366
+DEFAULT_LIMIT, MAX_LIMIT = 50, 1000
+
+
+def _date_arg(name, default):
+    value = request.args.get(name)
+    if not value:
+        return default
+    try:
+        return inputs.date(value).date()
+    except ValueError:
+        abort(400, message=f"{name} must be a date (YYYY-MM-DD)")
+
+
+class SalesReport(Resource):
+    """Unidades e ingresos por producto, categoría o marca; solo lee ``sales_rollup``."""
+
+    @role_required(1)
+    def get(self):
+        dimension = request.args.get("dimension", "product")
+        if dimension not in DIMENSIONS:
+            abort(400, message=f"dimension must be one of: {', '.join(DIMENSIONS)}")
+        group = request.args.get("group", "total")
+        if group not in ("total", "day"):
+            abort(400, message="group must be 'total' or 'day'")
+        try:
+            limit = int(request.args.get("limit", DEFAULT_LIMIT))
+        except ValueError:
+            abort(400, message="limit must be an integer")
+        # LIMIT negativo en SQLite es "sin límite": se rechaza igual que en pagination.page_args
+        if limit <= 0:
+            abort(400, message="limit must be greater than 0")
+        limit = min(limit, MAX_LIMIT)
+
+        today = datetime.now(timezone.utc).date()
+        end = _date_arg("to", today)
+        start = _date_arg("from", end - timedelta(days=DEFAULT_DAYS - 1))
+        if start > end:
+            abort(400, message="from must not be after to")
+        if (end - start).days >= MAX_DAYS:
+            abort(400, message=f"The range must be at most {MAX_DAYS} days")
+
+        filters = [SalesRollup.dimension == dimension, SalesRollup.day >= start, SalesRollup.day <= end]
+        if request.args.get("id"):
+            try:
+                filters.append(SalesRollup.key_id == int(request.args["id"]))
+            except ValueError:
+                abort(400, message="id must be an integer")
+
+        units, revenue = func.sum(SalesRollup.units), func.sum(SalesRollup.revenue)
+        if group == "day":
+            statement = (select(SalesRollup.day, SalesRollup.key_id, units, revenue).where(*filters)
+                         .group_by(SalesRollup.day, SalesRollup.key_id)
+                         .order_by(SalesRollup.day, revenue.desc()).limit(limit))
+            data = [{"day": day.isoformat(), "id": key_id, "units": int(total_units), "revenue": round(float(total), 2)}
+                    for day, key_id, total_units, total in db.session.execute(statement)]
+        else:
+            # Los más vendidos primero
+            statement = (select(SalesRollup.key_id, units, revenue).where(*filters)
+                         .group_by(SalesRollup.key_id).order_by(revenue.desc(), SalesRollup.key_id).limit(limit))
+            data = [{"id": key_id, "units": int(total_units), "revenue": round(float(total), 2)}
+                    for key_id, total_units, total in db.session.execute(statement)]
+
+        return {"dimension": dimension, "group": group, "from": start.isoformat(), "to": end.isoformat(),
+                "data": data}, 200
@@ -0,0 +1,89 @@
+from collections import defaultdict
+from datetime import date
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.sqlite import insert
+
+from api.extensions import db
+from api.models import Order, OrderProduct, Product, SalesRollup
+
+DIMENSIONS = ("product", "category", "brand")
+BACKFILL_CHUNK_SIZE = 10000
+
+
+def _accumulate(totals, day, product_id, category_id, brand_id, units, revenue):
+    for dimension, key_id in zip(DIMENSIONS, (product_id, category_id, brand_id)):
+        if key_id is not None:
+            entry = totals[(dimension, key_id, day)]
+            entry[0] += units
+            entry[1] += revenue
+
+
+def _upsert(totals):
+    if not totals:
+        return
+    statement = insert(SalesRollup.__table__)
+    statement = statement.on_conflict_do_update(
+        index_elements=["dimension", "key_id", "day"],
+        set_={"units": SalesRollup.units + statement.excluded.units,
+              "revenue": SalesRollup.revenue + statement.excluded.revenue},
+    )
+    db.session.execute(statement, [
+        {"dimension": dimension, "key_id": key_id, "day": day, "units": units, "revenue": round(revenue, 2)}
+        for (dimension, key_id, day), (units, revenue) in totals.items()
+    ])
+
+
+def record_sales(lines, day, sign=1):
+    """Suma (``sign=1``) o resta (``sign=-1``) ``lines`` a las rollups de ``day``.
+
+    ``lines`` son tuplas ``(product_id, quantity, price)``; sin precio (líneas anteriores a la
+    columna ``price``) se usa el del producto, igual que en ``rebuild_rollups``. No hace commit: se llama dentro de la
+    transacción del checkout, así que las rollups nunca quedan adelantadas ni atrasadas.
+    """
+    lines = list(lines)
+    if not lines:
+        return
+    products = {row.id: row for row in db.session.execute(
+        select(Product.id, Product.category_id, Product.brand_id, Product.price)
+        .where(Product.id.in_({product_id for product_id, _, _ in lines}))
+    )}
+    totals = defaultdict(lambda: [0, 0.0])
+    for product_id, quantity, price in lines:
+        product = products.get(product_id)
+        category_id, brand_id = (product.category_id, product.brand_id) if product else (None, None)
+        if price is None and product:
+            price = product.price
+        _accumulate(totals, day, product_id, category_id, brand_id, sign * quantity, sign * quantity * float(price or 0))
+    _upsert(totals)
+
+
+def rebuild_rollups(chunk_size=BACKFILL_CHUNK_SIZE):
+    """Reconstruye las rollups desde ``order``/``order_product`` por rangos de ``chunk_size`` órdenes.
+
+    El borrado y la lectura del último id van en la misma transacción de escritura: los checkouts
+    posteriores ya suman sus propias líneas y quedan fuera del rango recorrido. Las líneas
+    anteriores a la columna ``price`` se valoran al precio actual del producto.
+    Devuelve ``(último id de orden recorrido, filas de rollup)``.
+    """
+    db.session.execute(delete(SalesRollup))
+    last_id = db.session.scalar(select(func.max(Order.id))) or 0
+    db.session.commit()
+
+    day = func.date(Order.created_at)
+    for start in range(0, last_id, chunk_size):
+        rows = db.session.execute(
+            select(day, OrderProduct.product_id, Product.category_id, Product.brand_id,
+                   func.sum(OrderProduct.quantity),
+                   func.sum(OrderProduct.quantity * func.coalesce(OrderProduct.price, Product.price)))
+            .join(Order, Order.id == OrderProduct.order_id)
+            .join(Product, Product.id == OrderProduct.product_id)
+            .where(Order.id > start, Order.id <= min(start + chunk_size, last_id))
+            .group_by(day, OrderProduct.product_id)
+        )
+        totals = defaultdict(lambda: [0, 0.0])
+        for row_day, product_id, category_id, brand_id, units, revenue in rows:
+            _accumulate(totals, date.fromisoformat(row_day), product_id, category_id, brand_id, units, float(revenue or 0))
+        _upsert(totals)
+        db.session.commit()
+    return last_id, db.session.scalar(select(func.count()).select_from(SalesRollup))
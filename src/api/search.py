@@ -0,0 +1,63 @@
+import re
+
+from sqlalchemy import DDL, Float, Integer, column, event, table, text
+
+from api.models import Product
+
+# Índice FTS5 de contenido externo: guarda solo el índice invertido, los textos viven en product
+SEARCH_TABLE = "product_fts"
+
+product_fts = table(SEARCH_TABLE, column("rowid", Integer), column("rank", Float), column(SEARCH_TABLE))
+
+CREATE_STATEMENTS = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(
+        name, description, content='product', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_ai AFTER INSERT ON product BEGIN
+        INSERT INTO {SEARCH_TABLE}(rowid, name, description) VALUES (new.id, new.name, new.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_ad AFTER DELETE ON product BEGIN
+        INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+    END""",
+    # Solo se reindexa cuando cambia el texto; las actualizaciones de stock/precio no tocan el índice
+    f"""CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_au AFTER UPDATE OF name, description ON product BEGIN
+        INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO {SEARCH_TABLE}(rowid, name, description) VALUES (new.id, new.name, new.description);
+    END""",
+]
+
+for statement in CREATE_STATEMENTS:
+    event.listen(Product.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+event.listen(Product.__table__, "before_drop", DDL(f"DROP TABLE IF EXISTS {SEARCH_TABLE}").execute_if(dialect="sqlite"))
+
+
+def create_search_index(connection):
+    """Crea el índice y sus triggers en una base existente y lo llena con los productos actuales."""
+    if connection.dialect.name != "sqlite":
+        return
+    for statement in CREATE_STATEMENTS:
+        connection.execute(text(statement))
+    connection.execute(text(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('rebuild')"))
+
+
+def match_expression(query):
+    # Cada palabra se cita para que la entrada del usuario no se interprete como sintaxis FTS5;
+    # la última admite prefijo para búsquedas mientras se escribe.
+    terms = re.findall(r"\w+", query or "")
+    if not terms:
+        return None
+    quoted = ['"%s"' % term for term in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def search_products(query, expression):
+    """Filtra ``query`` (sobre Product) por ``expression`` y añade la columna ``rank`` (bm25, menor es mejor)."""
+    return (
+        query.add_columns(product_fts.c.rank.label("rank"))
+        .join(product_fts, product_fts.c.rowid == Product.id)
+        .filter(product_fts.c[SEARCH_TABLE].op("MATCH")(expression))
+    )
@@ -1,41 +1,118 @@
-from flask import Flask
-from api.extensions import db
-from flask_jwt_extended import JWTManager
-from api.auth_resource import AuthResource
-from api.middleware.auth import role_required
-from api.controllers import UserResource, BrandResource, Categories, ProductResource, WishlistController, CartController, Brands,OrderController, UserListResource
-from flask_sqlalchemy import SQLAlchemy
-from flask_restful import Api, Resource, reqparse, abort, fields, marshal_with
-
-app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///database.db'
-# db = SQLAlchemy(app)
-
-app.config["JWT_SECRET_KEY"] = "tu_clave_secreta_super_segura"  # Cambia esto por una clave segura
-jwt = JWTManager(app)
-
-db.init_app(app)
-api = Api(app)
-
-with app.app_context():
-    db.create_all()
-    
-api.add_resource(UserResource, "/api/users/","/api/users/<int:user_id>")
-api.add_resource(UserListResource, '/users')
-api.add_resource(Brands, "/api/brands/")
-api.add_resource(BrandResource, "/api/brands/<int:brand_id>")
-api.add_resource(Categories, "/api/categories/", "/api/categories/<int:category_id>")
-api.add_resource(ProductResource, "/api/products/", "/api/products/<int:product_id>")
-api.add_resource(AuthResource, "/auth/<string:action>", "/auth/role") 
-api.add_resource(WishlistController, '/wishlist', '/wishlist/<int:wishlist_id>')
-api.add_resource(CartController, '/carts', '/carts/<int:id>')
-api.add_resource(OrderController, '/orders','/orders/<int:order_id>')
-
-
-
-@app.route("/")
+import importlib
+
+import click
+from flask import Flask, current_app
+from flask.cli import with_appcontext
+from flask_restful import Api
+from api.extensions import checkout_workers, db, hasher, metrics, query_stats, response_cache, sqlite_pragmas
+from api.serializers import output_json
+from api.middleware.jwt_cache import CachingJWTManager
+
+DEFAULT_CONFIG = {
+    "SQLALCHEMY_DATABASE_URI": "sqlite:///database.db",
+    "JWT_SECRET_KEY": "tu_clave_secreta_super_segura",  # Cambia esto por una clave segura
+}
+
+# Recursos registrados por defecto: "módulo:Clase" -> URLs. El módulo se importa al registrar,
+# así que una app con API_RESOURCES reducido no carga los controladores que no usa
+RESOURCES = {
+    "api.controllers:UserResource": ("/api/users/", "/api/users/<int:user_id>"),
+    "api.controllers:UserListResource": ("/users",),
+    "api.controllers:Brands": ("/api/brands/",),
+    "api.controllers:BrandResource": ("/api/brands/<int:brand_id>",),
+    "api.controllers:Categories": ("/api/categories/", "/api/categories/<int:category_id>"),
+    "api.controllers:ProductResource": ("/api/products/", "/api/products/<int:product_id>"),
+    "api.controllers:ProductImport": ("/api/products/import",),
+    "api.controllers:ProductBulkUpdate": ("/api/products/bulk",),
+    "api.controllers:ProductSearch": ("/api/products/search",),
+    "api.controllers:ProductFacets": ("/api/products/facets",),
+    "api.auth_resource:AuthResource": ("/auth/<string:action>", "/auth/role"),
+    "api.controllers:WishlistController": ("/wishlist", "/wishlist/<int:wishlist_id>"),
+    "api.controllers:CartController": ("/carts", "/carts/<int:id>"),
+    "api.controllers:CartSummary": ("/carts/summary",),
+    "api.controllers:OrderController": ("/orders", "/orders/<int:order_id>"),
+    "api.controllers:CheckoutJobResource": ("/orders/jobs/<int:job_id>",),
+    "api.export_resource:ExportResource": ("/api/export/<string:entity>",),
+    "api.reports_resource:SalesReport": ("/api/reports/sales",),
+}
+
+
+def load_resource(path):
+    module_name, _, name = path.partition(":")
+    return getattr(importlib.import_module(module_name), name)
+
+
+def create_app(config=None):
+    """Construye la app; ``config`` se aplica sobre ``DEFAULT_CONFIG``.
+
+    ``API_RESOURCES`` (por defecto ``RESOURCES``) decide qué recursos se registran. El esquema
+    no se crea aquí: usar ``flask --app app init-db`` o ``python create_db.py``.
+    """
+    app = Flask(__name__)
+    app.config.update(DEFAULT_CONFIG)
+    app.config.update(config or {})
+    app.config.setdefault("API_RESOURCES", RESOURCES)
+
+    CachingJWTManager(app)  # Tokens verificados en caché hasta su exp (JWT_VERIFY_CACHE_SIZE)
+    db.init_app(app)
+    sqlite_pragmas.init_app(app)  # WAL, busy_timeout, synchronous=NORMAL... en cada conexión (SQLITE_PRAGMAS)
+    query_stats.init_app(app)  # Consultas y tiempo en la base por petición (QUERY_STATS_HEADERS, QUERY_SLOW_THRESHOLD_MS)
+    hasher.init_app(app)  # pbkdf2 en un pool de procesos (AUTH_HASH_WORKERS, AUTH_HASH_QUEUE_SIZE)
+    response_cache.init_app(app)  # Caché de lecturas del catálogo (RESPONSE_CACHE_TTL, RESPONSE_CACHE_MAXSIZE)
+    metrics.init_app(app)  # /metrics en formato Prometheus; con varios procesos definir METRICS_DIR
+    checkout_workers.init_app(app)  # Checkout en cola con CHECKOUT_ASYNC (CHECKOUT_WORKERS, CHECKOUT_MAX_ATTEMPTS)
+
+    api = Api(app)
+    api.representation('application/json')(output_json)  # JSON con orjson si está instalado
+    for path, urls in app.config["API_RESOURCES"].items():
+        api.add_resource(load_resource(path), *urls)
+
+    app.add_url_rule("/", "hello_world", hello_world)
+    app.cli.add_command(init_db_command)
+    app.cli.add_command(checkout_worker_command)
+    app.cli.add_command(rebuild_rollups_command)
+    return app
+
+
 def hello_world():
     return "<p>Hello, World!</p>"
 
+
+@click.command("init-db")
+@with_appcontext
+def init_db_command():
+    """Crea las tablas, aplica las migraciones y construye el índice de búsqueda."""
+    from api.migrations import init_db
+
+    init_db()
+    click.echo("Database created successfully!")
+
+
+@click.command("rebuild-rollups")
+@click.option("--chunk-size", default=10000, show_default=True, help="Órdenes por transacción")
+@with_appcontext
+def rebuild_rollups_command(chunk_size):
+    """Reconstruye las rollups de ventas desde las órdenes existentes."""
+    from api.rollups import rebuild_rollups
+
+    last_order_id, rows = rebuild_rollups(chunk_size)
+    click.echo(f"Rebuilt {rows} rollup rows from orders up to id {last_order_id}")
+
+
+@click.command("checkout-worker")
+@click.option("--threads", default=1, show_default=True, help="Hilos que atienden la cola")
+@with_appcontext
+def checkout_worker_command(threads):
+    """Atiende la cola de checkouts en este proceso (usar con CHECKOUT_WORKERS = 0 en la API)."""
+    # La invalidación de "products" tras cada checkout tiene que llegar a la caché de la API
+    if current_app.config["RESPONSE_CACHE_BACKEND"] is None:
+        raise click.ClickException(
+            "checkout-worker needs a RESPONSE_CACHE_BACKEND shared with the API processes; with the "
+            "in-process cache the API would keep serving pre-checkout stock. Use CHECKOUT_WORKERS instead."
+        )
+    click.echo(f"Processing checkout jobs with {threads} thread(s), Ctrl+C to stop")
+    checkout_workers.serve(current_app._get_current_object(), threads)
+
+
 if __name__ == "__main__":
-    app.run(debug=True)
\ No newline at end of file
+    create_app().run(debug=True)
@@ -0,0 +1,43 @@
+"""Microbenchmarks por endpoint contra una base generada con ``benchmarks.seed``.
+
+Uso (desde src/):  python -m benchmarks.bench_endpoints --database /tmp/bench.db --output results/endpoints.json
+"""
+import argparse
+import random
+import time
+
+from benchmarks.seed import load_manifest
+from benchmarks.workload import OPERATIONS, Workload, make_app, metadata, summarize, timed, write_results
+
+
+def run(database, operations=None, requests=None, warmup=10, cache=True, seed=1):
+    manifest = load_manifest(database)
+    app = make_app(database, cache)
+    workload = Workload(app, manifest, random.Random(seed))
+    results = {}
+    for name in operations or OPERATIONS:
+        operation = getattr(workload, name)
+        for _ in range(min(warmup, OPERATIONS[name])):
+            operation()
+        latencies, errors = [], 0
+        started = time.perf_counter()
+        for _ in range(requests or OPERATIONS[name]):
+            elapsed, status = timed(operation)
+            latencies.append(elapsed)
+            errors += status >= 400
+        results[name] = summarize(latencies, errors, time.perf_counter() - started)
+    return {"meta": metadata(database, benchmark="endpoints", cache=cache, seed=seed), "results": results}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database", required=True)
+    parser.add_argument("--operations", nargs="*", choices=list(OPERATIONS), help="Por defecto, todas")
+    parser.add_argument("--requests", type=int, help="Peticiones por operación (por defecto, OPERATIONS)")
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--no-cache", dest="cache", action="store_false", help="Desactiva la caché de respuestas")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Archivo JSON de resultados")
+    options = parser.parse_args()
+    write_results(options.output, run(options.database, options.operations, options.requests, options.warmup,
+                                      options.cache, options.seed))
@@ -0,0 +1,75 @@
+"""Escenario de tráfico mixto: varios hilos eligiendo operaciones con pesos de una tienda real.
+
+Uso (desde src/):  python -m benchmarks.bench_mixed --database /tmp/bench.db --threads 8 --seconds 30
+"""
+import argparse
+import random
+import threading
+import time
+
+from benchmarks.seed import load_manifest
+from benchmarks.workload import Workload, make_app, metadata, summarize, timed, write_results
+
+# Mayoría de lecturas de catálogo, algo de carrito y pocos checkouts/logins
+WEIGHTS = {
+    "products_list": 20,
+    "products_filtered": 15,
+    "product_detail": 25,
+    "products_search": 10,
+    "categories": 5,
+    "cart_get": 8,
+    "cart_add": 6,
+    "wishlist_get": 4,
+    "orders_get": 4,
+    "checkout": 2,
+    "auth_login": 1,
+}
+
+
+def run(database, threads=8, seconds=30.0, cache=True, seed=1):
+    manifest = load_manifest(database)
+    app = make_app(database, cache)
+    names, weights = list(WEIGHTS), list(WEIGHTS.values())
+    latencies = {name: [] for name in names}
+    errors = {name: 0 for name in names}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def worker(index):
+        # Cada hilo con su cliente y su semilla: el orden de operaciones es reproducible por hilo
+        rng = random.Random(seed * 1000 + index)
+        workload = Workload(app, manifest, rng)
+        while time.perf_counter() < deadline:
+            name = rng.choices(names, weights)[0]
+            elapsed, status = timed(getattr(workload, name))
+            with lock:
+                latencies[name].append(elapsed)
+                errors[name] += status >= 400
+
+    started = time.perf_counter()
+    pool = [threading.Thread(target=worker, args=(index,)) for index in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    everything = [value for values in latencies.values() for value in values]
+    return {
+        "meta": metadata(database, benchmark="mixed", threads=threads, seconds=seconds, cache=cache, seed=seed,
+                         weights=WEIGHTS),
+        "total": summarize(everything, sum(errors.values()), elapsed),
+        "results": {name: summarize(latencies[name], errors[name], elapsed) for name in names if latencies[name]},
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database", required=True)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=30.0)
+    parser.add_argument("--no-cache", dest="cache", action="store_false", help="Desactiva la caché de respuestas")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Archivo JSON de resultados")
+    options = parser.parse_args()
+    write_results(options.output, run(options.database, options.threads, options.seconds, options.cache, options.seed))
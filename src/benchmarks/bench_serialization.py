@@ -0,0 +1,68 @@
+"""Compara marshal + json de flask_restful contra los serializadores precompilados.
+
+Uso (desde src/):  python -m benchmarks.bench_serialization --rows 10000 --repeat 5
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from flask import Flask
+from flask_restful import marshal
+from flask_restful.representations.json import output_json as restful_output_json
+
+from api.controllers import product_fields
+from api.models import Product
+from api.serializers import compile_fields, orjson, output_json
+
+
+def make_products(rows):
+    base = datetime(2024, 1, 1)
+    products = []
+    for i in range(rows):
+        product = Product(
+            id=i + 1, name=f"Product {i}", price=Decimal("9.99") + i % 500, description="Synthetic product row",
+            stock=i % 40, img=f"http://example.com/{i}.jpg",
+            created_at=base + timedelta(minutes=i), updated_at=base + timedelta(minutes=i, seconds=30),
+        )
+        product.category_name = f"Category {i % 25}"
+        product.brand_username = f"Brand {i % 60}"
+        products.append(product)
+    return products
+
+
+def best_of(repeat, fn):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+def run(rows=10000, repeat=5):
+    app = Flask(__name__)
+    products = make_products(rows)
+    serialize = compile_fields(product_fields)
+
+    with app.test_request_context():
+        baseline, slow = best_of(repeat, lambda: restful_output_json(marshal(products, product_fields), 200).get_data())
+        compiled, fast = best_of(repeat, lambda: output_json(serialize(products), 200).get_data())
+
+    assert json.loads(slow) == json.loads(fast), "Los dos caminos deben producir el mismo documento"
+    return {
+        "rows": rows,
+        "encoder": "orjson" if orjson is not None else "json",
+        "marshal_seconds": round(baseline, 4),
+        "compiled_seconds": round(compiled, 4),
+        "speedup": round(baseline / compiled, 1),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    options = parser.parse_args()
+    print(json.dumps(run(options.rows, options.repeat), indent=2))
@@ -0,0 +1,110 @@
+"""Concurrencia lectura/escritura en SQLite con los pragmas por defecto contra DEFAULT_PRAGMAS.
+
+Uso (desde src/):  python -m benchmarks.bench_sqlite_pragmas --readers 4 --seconds 3
+"""
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from api.sqlite_pragmas import DEFAULT_PRAGMAS, apply_pragmas
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def make_engine(path, pragmas):
+    # timeout=0: sin pragmas el único reintento ante un lock es el busy_timeout que cada modo configure
+    engine = create_engine(f"sqlite:///{path}", connect_args={"timeout": 0, "check_same_thread": False})
+    if pragmas:
+        apply_pragmas(engine, pragmas)
+    return engine
+
+
+def seed(engine, rows):
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE product (id INTEGER PRIMARY KEY, name TEXT, stock INTEGER)"))
+        connection.execute(text("INSERT INTO product (name, stock) VALUES (:name, :stock)"),
+                           [{"name": f"Product {i}", "stock": 100} for i in range(rows)])
+
+
+def scenario(pragmas, readers, seconds, rows):
+    with tempfile.TemporaryDirectory(prefix="bench_sqlite_") as directory:
+        return measure(make_engine(os.path.join(directory, "bench.db"), pragmas), readers, seconds, rows)
+
+
+def measure(engine, readers, seconds, rows):
+    seed(engine, rows)
+    stop = threading.Event()
+    stats = {"reads": 0, "writes": 0, "read_errors": 0, "write_errors": 0}
+    write_latencies = []
+    lock = threading.Lock()
+
+    def reader():
+        while not stop.is_set():
+            try:
+                with engine.connect() as connection:
+                    connection.execute(text("SELECT count(*), sum(stock) FROM product")).one()
+                key = "reads"
+            except OperationalError:
+                key = "read_errors"
+            with lock:
+                stats[key] += 1
+
+    def writer():
+        i = 0
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                with engine.begin() as connection:
+                    connection.execute(text("UPDATE product SET stock = stock - 1 WHERE id = :id"), {"id": i % rows + 1})
+                key = "writes"
+            except OperationalError:
+                key = "write_errors"
+            with lock:
+                stats[key] += 1
+                write_latencies.append(time.perf_counter() - started)
+            i += 1
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)] + [threading.Thread(target=writer)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+
+    return dict(
+        stats,
+        reads_per_second=round(stats["reads"] / seconds),
+        writes_per_second=round(stats["writes"] / seconds),
+        write_p99_ms=round(percentile(write_latencies, 0.99) * 1000, 2) if write_latencies else None,
+    )
+
+
+def run(readers=4, seconds=3.0, rows=20000):
+    return {
+        "readers": readers,
+        "seconds": seconds,
+        "default": scenario(None, readers, seconds, rows),
+        "tuned": scenario(DEFAULT_PRAGMAS, readers, seconds, rows),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--rows", type=int, default=20000)
+    options = parser.parse_args()
+    print(json.dumps(run(options.readers, options.seconds, options.rows), indent=2))
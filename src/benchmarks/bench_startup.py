@@ -0,0 +1,68 @@
+"""Tiempo de arranque: import, create_app, primera petición y el create_all que ya no se hace al importar.
+
+Cada medición corre en un proceso nuevo para incluir el costo real de los imports.
+Uso (desde src/):  python -m benchmarks.bench_startup --repeat 5
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+CHILD = r"""
+import json, sys, time
+started = time.perf_counter()
+import app as module
+imported = time.perf_counter()
+config = {"SQLALCHEMY_DATABASE_URI": "sqlite:///" + sys.argv[1], "AUTH_HASH_WORKERS": 0}
+if sys.argv[2] == "minimal":
+    config["API_RESOURCES"] = {"api.controllers:Categories": ("/api/categories/",)}
+app = module.create_app(config)
+created = time.perf_counter()
+app.test_client().get("/")
+first_request = time.perf_counter()
+with app.app_context():
+    from api.extensions import db
+    db.create_all()
+schema = time.perf_counter()
+print(json.dumps({
+    "import_seconds": imported - started,
+    "create_app_seconds": created - imported,
+    "first_request_seconds": first_request - created,
+    "create_all_seconds": schema - first_request,
+}))
+"""
+
+
+def measure(database, mode):
+    src = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run([sys.executable, "-c", CHILD, database, mode], cwd=src,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def best(samples):
+    return {key: round(min(sample[key] for sample in samples), 4) for key in samples[0]}
+
+
+def run(repeat=5):
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="bench_startup_") as directory:
+        database = os.path.join(directory, "startup.db")
+        measure(database, "full")  # Crea el esquema una vez, como haría init-db
+        for mode in ("full", "minimal"):
+            timings = best([measure(database, mode) for _ in range(repeat)])
+            # Antes, cada import de app.py pagaba también el create_all
+            timings["boot_seconds"] = round(timings["import_seconds"] + timings["create_app_seconds"]
+                                            + timings["first_request_seconds"], 4)
+            timings["previous_boot_seconds"] = round(timings["boot_seconds"] + timings["create_all_seconds"], 4)
+            results[mode] = timings
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    options = parser.parse_args()
+    print(json.dumps(run(options.repeat), indent=2))
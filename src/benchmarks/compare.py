@@ -0,0 +1,38 @@
+"""Compara dos archivos de resultados (p. ej. de dos commits) y marca las regresiones.
+
+Uso (desde src/):  python -m benchmarks.compare results/before.json results/after.json --threshold 10
+"""
+import argparse
+import json
+import sys
+
+
+def compare(before, after, metric="p95_ms", threshold=10.0):
+    """Devuelve ``[(operación, antes, después, cambio %, regresión)]`` para las operaciones en ambos."""
+    rows = []
+    for name, result in after["results"].items():
+        old, new = before["results"].get(name, {}).get(metric), result.get(metric)
+        if old is None or new is None:
+            continue
+        change = (new - old) / old * 100 if old else 0.0
+        rows.append((name, old, new, round(change, 1), change > threshold))
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--metric", default="p95_ms")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Porcentaje de empeoramiento tolerado")
+    options = parser.parse_args()
+    with open(options.before) as handle:
+        before = json.load(handle)
+    with open(options.after) as handle:
+        after = json.load(handle)
+
+    rows = compare(before, after, options.metric, options.threshold)
+    print(f"{'operation':<20} {'before':>10} {'after':>10} {'change':>8}")
+    for name, old, new, change, regressed in rows:
+        print(f"{name:<20} {old:>10.3f} {new:>10.3f} {change:>+7.1f}%{'  REGRESSION' if regressed else ''}")
+    sys.exit(1 if any(row[-1] for row in rows) else 0)
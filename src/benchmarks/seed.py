@@ -0,0 +1,171 @@
+"""Genera una base SQLite sintética y reproducible (misma semilla -> mismos datos) para los benchmarks.
+
+Uso (desde src/):  python -m benchmarks.seed --database /tmp/bench.db --products 1000000 --users 100000
+Junto a la base se escribe ``<database>.seed.json`` con los tamaños, que leen los benchmarks.
+"""
+import argparse
+import json
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+from werkzeug.security import generate_password_hash
+
+from api.models import Brand, Cart, Category, Order, OrderProduct, Product, User, Wishlist
+
+# Contraseña de todos los usuarios sintéticos: se hashea una sola vez (pbkdf2 es lo caro)
+BENCH_PASSWORD = "benchmark-password"
+CHUNK_SIZE = 10000
+BASE_TIME = datetime(2024, 1, 1)
+
+ADJECTIVES = ("Compact", "Wireless", "Ergonomic", "Portable", "Smart", "Classic", "Premium", "Rugged",
+              "Silent", "Vintage", "Organic", "Digital", "Foldable", "Waterproof", "Solar", "Modular")
+NOUNS = ("Laptop", "Keyboard", "Headphones", "Camera", "Backpack", "Lamp", "Speaker", "Watch",
+         "Blender", "Chair", "Monitor", "Jacket", "Router", "Kettle", "Drone", "Tablet", "Bottle", "Tent")
+USES = ("home", "office", "travel", "gaming", "outdoor", "kitchen", "studio", "school")
+PAYMENTS = ("credit_card", "paypal", "bank_transfer")
+
+
+def timestamp(rng):
+    return BASE_TIME + timedelta(seconds=rng.randrange(365 * 24 * 3600))
+
+
+def insert_chunks(connection, model, rows, chunk_size=CHUNK_SIZE):
+    chunk, count = [], 0
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            connection.execute(insert(model.__table__), chunk)
+            count += len(chunk)
+            chunk = []
+    if chunk:
+        connection.execute(insert(model.__table__), chunk)
+        count += len(chunk)
+    return count
+
+
+def seed(engine, products=1000000, users=100000, categories=50, brands=200, carts=200000,
+         wishlists=300000, orders=200000, seed=42, chunk_size=CHUNK_SIZE):
+    """Inserta los datos con INSERT por lotes (executemany); devuelve el manifiesto con los tamaños."""
+    rng = random.Random(seed)
+    password = generate_password_hash(BENCH_PASSWORD)
+    prices = [round(rng.uniform(5, 2000), 2) for _ in range(products)]
+
+    def category_rows():
+        for i in range(1, categories + 1):
+            created = timestamp(rng)
+            yield {"id": i, "name": f"Category {i}", "description": f"Synthetic category {i}",
+                   "created_at": created, "updated_at": created}
+
+    def brand_rows():
+        for i in range(1, brands + 1):
+            created = timestamp(rng)
+            yield {"id": i, "username": f"Brand {i}", "address": f"{i} Brand Street",
+                   "phone": f"+1555{i:07d}", "created_at": created, "updated_at": created}
+
+    def product_rows():
+        for i in range(1, products + 1):
+            created = timestamp(rng)
+            noun = rng.choice(NOUNS)
+            yield {"id": i, "name": f"{rng.choice(ADJECTIVES)} {noun} {i}",
+                   "description": f"{rng.choice(ADJECTIVES)} {noun.lower()} for {rng.choice(USES)}",
+                   "price": prices[i - 1], "stock": rng.randint(0, 500), "img": f"https://example.com/p/{i}.jpg",
+                   "category_id": rng.randint(1, categories), "brand_id": rng.randint(1, brands),
+                   "created_at": created, "updated_at": created}
+
+    def user_rows():
+        for i in range(1, users + 1):
+            created = timestamp(rng)
+            yield {"id": i, "name": f"User {i}", "lstF": "Bench", "lstM": "Mark", "address": f"{i} Main St",
+                   "email": f"user{i}@example.com", "password": password, "c_pass": password,
+                   "phone": f"+1444{i:07d}", "payment": rng.choice(PAYMENTS), "role": 1 if i == 1 else 0,
+                   "created_at": created, "updated_at": created}
+
+    def cart_rows():
+        for _ in range(carts):
+            product_id, quantity = rng.randint(1, products), rng.randint(1, 3)
+            created = timestamp(rng)
+            yield {"user_id": rng.randint(1, users), "product_id": product_id, "quantity": quantity,
+                   "price": prices[product_id - 1], "total": round(prices[product_id - 1] * quantity, 2),
+                   "created_at": created, "updated_at": created}
+
+    def wishlist_rows():
+        for _ in range(wishlists):
+            created = timestamp(rng)
+            yield {"user_id": rng.randint(1, users), "product_id": rng.randint(1, products),
+                   "created_at": created, "updated_at": created}
+
+    # Las líneas se generan junto con su orden para que total_amount cuadre
+    order_lines = []
+
+    def order_rows():
+        for order_id in range(1, orders + 1):
+            created = timestamp(rng)
+            total = 0
+            for _ in range(rng.randint(1, 4)):
+                product_id, quantity = rng.randint(1, products), rng.randint(1, 3)
+                total += prices[product_id - 1] * quantity
+                order_lines.append({"order_id": order_id, "product_id": product_id, "quantity": quantity,
+                                    "price": prices[product_id - 1], "created_at": created, "updated_at": created})
+            yield {"id": order_id, "user_id": rng.randint(1, users), "total_amount": round(total, 2),
+                   "created_at": created, "updated_at": created}
+
+    counts, timings = {}, {}
+    tables = [("categories", Category, category_rows), ("brands", Brand, brand_rows),
+              ("products", Product, product_rows), ("users", User, user_rows), ("carts", Cart, cart_rows),
+              ("wishlists", Wishlist, wishlist_rows), ("orders", Order, order_rows),
+              ("order_products", OrderProduct, lambda: iter(order_lines))]
+    for name, model, rows in tables:
+        started = time.perf_counter()
+        # Una transacción por tabla: con WAL y synchronous=NORMAL el costo está en los índices, no en el fsync
+        with engine.begin() as connection:
+            counts[name] = insert_chunks(connection, model, rows(), chunk_size)
+        timings[name] = round(time.perf_counter() - started, 2)
+
+    return {"seed": seed, "password": BENCH_PASSWORD, "counts": counts, "seconds": timings}
+
+
+def manifest_path(database):
+    return f"{database}.seed.json"
+
+
+def load_manifest(database):
+    with open(manifest_path(database)) as handle:
+        return json.load(handle)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database", required=True, help="Ruta del archivo SQLite a crear")
+    parser.add_argument("--products", type=int, default=1000000)
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--categories", type=int, default=50)
+    parser.add_argument("--brands", type=int, default=200)
+    parser.add_argument("--carts", type=int, default=200000)
+    parser.add_argument("--wishlists", type=int, default=300000)
+    parser.add_argument("--orders", type=int, default=200000)
+    parser.add_argument("--seed", type=int, default=42)
+    options = parser.parse_args()
+
+    from app import create_app
+    from api.extensions import db
+    from api.migrations import init_db
+
+    database = os.path.abspath(options.database)
+    if os.path.exists(database):
+        parser.error(f"{database} already exists; the generator only fills new databases")
+    app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{database}", "AUTH_HASH_WORKERS": 0,
+                      "QUERY_SLOW_THRESHOLD_MS": None})
+    with app.app_context():
+        init_db()
+        manifest = seed(db.engine, options.products, options.users, options.categories, options.brands,
+                        options.carts, options.wishlists, options.orders, options.seed)
+    with open(manifest_path(database), "w") as handle:
+        json.dump(manifest, handle, indent=2)
+    print(json.dumps(manifest, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""Operaciones HTTP comunes a los microbenchmarks y al escenario mixto, sobre una base de ``benchmarks.seed``."""
+import json
+import os
+import platform
+import sqlite3
+import subprocess
+import time
+from datetime import datetime, timezone
+
+from flask_jwt_extended import create_access_token
+
+from benchmarks.seed import ADJECTIVES, NOUNS, load_manifest
+
+SEARCH_TERMS = [word.lower() for word in ADJECTIVES + NOUNS]
+
+
+def make_app(database, cache=True):
+    from app import create_app
+
+    config = {"SQLALCHEMY_DATABASE_URI": f"sqlite:///{os.path.abspath(database)}"}
+    if not cache:
+        # Con tamaño 0 cada entrada se desaloja al guardarse: todas las lecturas van a la base
+        config["RESPONSE_CACHE_MAXSIZE"] = 0
+    return create_app(config)
+
+
+class Workload:
+    """Genera peticiones realistas con un ``random.Random`` propio (reproducible por semilla)."""
+
+    def __init__(self, app, manifest, rng):
+        self.app = app
+        self.client = app.test_client()
+        self.counts = manifest["counts"]
+        self.password = manifest["password"]
+        self.rng = rng
+        self._tokens = {}
+
+    def headers(self, user_id):
+        token = self._tokens.get(user_id)
+        if token is None:
+            with self.app.app_context():
+                token = create_access_token(identity=f"user{user_id}@example.com", additional_claims={"id": user_id, "role": 0})
+            self._tokens[user_id] = token
+        return {"Authorization": f"Bearer {token}"}
+
+    def user(self):
+        return self.rng.randint(1, self.counts["users"])
+
+    def product(self):
+        return self.rng.randint(1, self.counts["products"])
+
+    def products_list(self):
+        return self.client.get("/api/products/?limit=50", headers=self.headers(self.user()))
+
+    def products_filtered(self):
+        category = self.rng.randint(1, self.counts["categories"])
+        low = self.rng.choice((5, 50, 200, 500))
+        url = f"/api/products/?category_id={category}&min_price={low}&max_price={low * 4}&in_stock=true&sort=price&limit=50"
+        return self.client.get(url, headers=self.headers(self.user()))
+
+    def product_detail(self):
+        return self.client.get(f"/api/products/{self.product()}", headers=self.headers(self.user()))
+
+    def products_search(self):
+        query = " ".join(self.rng.sample(SEARCH_TERMS, 2))
+        return self.client.get(f"/api/products/search?q={query}&limit=20", headers=self.headers(self.user()))
+
+    def categories(self):
+        return self.client.get("/api/categories/", headers=self.headers(self.user()))
+
+    def cart_get(self):
+        return self.client.get("/carts", headers=self.headers(self.user()))
+
+    def cart_add(self):
+        return self.client.post("/carts", json={"product_id": self.product(), "quantity": 1},
+                                headers=self.headers(self.user()))
+
+    def wishlist_get(self):
+        return self.client.get("/wishlist", headers=self.headers(self.user()))
+
+    def orders_get(self):
+        return self.client.get("/orders", headers=self.headers(self.user()))
+
+    def checkout(self):
+        user_id = self.user()
+        self.client.post("/carts", json={"product_id": self.product(), "quantity": 1}, headers=self.headers(user_id))
+        return self.client.post("/orders", headers=self.headers(user_id))
+
+    def auth_login(self):
+        return self.client.post("/auth/login", json={"email": f"user{self.user()}@example.com", "password": self.password})
+
+
+# Nombre -> peticiones por defecto del microbenchmark (el login es pbkdf2: pocas bastan)
+OPERATIONS = {
+    "products_list": 300,
+    "products_filtered": 300,
+    "product_detail": 500,
+    "products_search": 300,
+    "categories": 300,
+    "cart_get": 300,
+    "cart_add": 300,
+    "wishlist_get": 300,
+    "orders_get": 300,
+    "checkout": 200,
+    "auth_login": 20,
+}
+
+
+def timed(operation):
+    started = time.perf_counter()
+    response = operation()
+    return time.perf_counter() - started, response.status_code
+
+
+def summarize(latencies, errors, elapsed=None):
+    ordered = sorted(latencies)
+
+    def percentile(fraction):
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] * 1000, 3) if ordered else None
+
+    summary = {
+        "requests": len(ordered),
+        "errors": errors,
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3) if ordered else None,
+        "p50_ms": percentile(0.50),
+        "p95_ms": percentile(0.95),
+        "p99_ms": percentile(0.99),
+        "max_ms": round(ordered[-1] * 1000, 3) if ordered else None,
+    }
+    if elapsed:
+        summary["rps"] = round(len(ordered) / elapsed, 1)
+    return summary
+
+
+def metadata(database, **options):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return dict({
+        "commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "machine": platform.machine(),
+        "dataset": load_manifest(database)["counts"],
+    }, **options)
+
+
+def write_results(path, results):
+    if path:
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with open(path, "w") as handle:
+            json.dump(results, handle, indent=2)
+    print(json.dumps(results, indent=2))
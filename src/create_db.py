@@ -1,5 +1,8 @@
-from app import app, db
+from app import create_app
+from api.migrations import init_db
+
+app = create_app()
 
 with app.app_context():
-    db.create_all()
-    print("Database created successfully!")
\ No newline at end of file
+    init_db()
+    print("Database created successfully!")
@@ -0,0 +1,125 @@
+import pytest
+from flask_jwt_extended import create_access_token
+from sqlalchemy import inspect, text
+
+from api.migrations import init_db
+from api.models import db, Category, User, Product, Cart, Order
+from app import RESOURCES, create_app
+
+
+@pytest.fixture
+def app():
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+        'JWT_SECRET_KEY': 'your_secret_key',
+        'TESTING': True,
+        'AUTH_HASH_WORKERS': 0,
+    })
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def test_create_app_registers_default_resources(app):
+    """La fábrica registra todas las rutas de RESOURCES."""
+    rules = {rule.rule for rule in app.url_map.iter_rules()}
+
+    assert all(url in rules for urls in RESOURCES.values() for url in urls)
+    assert "/" in rules
+
+
+def test_create_app_serves_requests(app):
+    db.session.add(Category(name="Books", description="All about books"))
+    db.session.commit()
+    access_token = create_access_token(identity="test_user")
+
+    response = app.test_client().get('/api/categories/', headers={'Authorization': f'Bearer {access_token}'})
+
+    assert response.status_code == 200
+    assert response.get_json()[0]["name"] == "Books"
+
+
+def test_api_resources_is_configurable():
+    """Con API_RESOURCES solo se registran (e importan) los recursos pedidos."""
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+        'API_RESOURCES': {"api.controllers:Categories": ("/categories",)},
+    })
+    rules = {rule.rule for rule in app.url_map.iter_rules()}
+
+    assert "/categories" in rules
+    assert "/api/products/" not in rules
+
+
+def test_create_app_does_not_touch_the_database(tmp_path):
+    """Construir la app no crea el esquema; eso lo hace init-db."""
+    path = tmp_path / "app.db"
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{path}"})
+    assert not path.exists()
+
+    result = app.test_cli_runner().invoke(args=["init-db"])
+
+    assert result.exit_code == 0, result.output
+    assert "Database created successfully!" in result.output
+    with app.app_context():
+        tables = set(inspect(db.engine).get_table_names())
+        db.engine.dispose()
+    assert {"user", "product", "order", "product_fts"} <= tables
+
+
+def test_init_db_repairs_rows_keyed_by_email(app):
+    """Las filas guardadas con el email del token como user_id pasan al id entero."""
+    user = User(name="Test User", lstF="Doe", lstM="Smith", address="123 Main St", email="test@example.com",
+                password="hashed", c_pass="hashed", phone="555-1234", payment="credit_card")
+    db.session.add(user)
+    db.session.add(Product(name="Test Product", price=10.0, description="Sample", stock=5, category_id=1,
+                           brand_id=1, img="http://example.com/p.jpg"))
+    db.session.commit()
+    db.session.execute(text("INSERT INTO cart (user_id, product_id, quantity, price, total) "
+                            "VALUES ('test@example.com', 1, 1, 10, 10)"))
+    db.session.execute(text('INSERT INTO "order" (user_id, total_amount) VALUES (\'test@example.com\', 10)'))
+    db.session.execute(text("INSERT INTO cart (user_id, product_id, quantity, price, total) "
+                            "VALUES ('ghost@example.com', 1, 1, 10, 10)"))
+    # La misma clave guardada con el email y con el id (peticiones entre el deploy y el init-db)
+    for user_id, key in (("test@example.com", "k1"), (str(user.id), "k1"), ("test@example.com", "k2")):
+        db.session.execute(text(
+            "INSERT INTO idempotency_key (key, user_id, scope, request_hash, created_at, expires_at) "
+            "VALUES (:key, :user_id, 'orders', 'h', '2024-01-01 00:00:00', '2099-01-01 00:00:00')"
+        ), {"key": key, "user_id": user_id})
+    db.session.commit()
+
+    init_db()
+    init_db()  # Idempotente
+
+    assert Cart.query.filter_by(user_id=user.id).count() == 1
+    assert Order.query.filter_by(user_id=user.id).count() == 1
+    keys = db.session.execute(text("SELECT user_id, key FROM idempotency_key ORDER BY key")).all()
+    assert keys == [(str(user.id), "k1"), (str(user.id), "k2")]
+    # Sin usuario con ese email no hay a qué id llevarla
+    assert db.session.execute(text("SELECT count(*) FROM cart WHERE typeof(user_id) = 'text'")).scalar() == 1
+
+
+def test_init_db_adds_indexes_to_existing_tables(app):
+    """Una base creada antes de los índices de product los recibe con init-db."""
+    names = ("ix_product_category_price_stock", "ix_product_brand_price_stock", "ix_product_price",
+             "ix_product_updated_at", "ix_order_user_created")
+    for name in names:
+        db.session.execute(text(f"DROP INDEX {name}"))
+    db.session.commit()
+
+    init_db()
+
+    indexes = {index["name"] for table in ("product", "order") for index in inspect(db.engine).get_indexes(table)}
+    assert set(names) <= indexes
+
+
+def test_checkout_worker_requires_shared_response_cache():
+    """Con la caché en memoria el worker aparte no podría invalidar la de la API."""
+    app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:'})
+
+    result = app.test_cli_runner().invoke(args=["checkout-worker"])
+
+    assert result.exit_code != 0
+    assert "RESPONSE_CACHE_BACKEND" in result.output
@@ -0,0 +1,92 @@
+import pytest
+from api.models import db, User
+from api.extensions import hasher as password_hasher
+from app import create_app
+
+
+@pytest.fixture
+def hasher():
+    yield password_hasher
+    password_hasher.shutdown()
+
+
+@pytest.fixture
+def app(hasher):
+    # El pool de hashing con un solo proceso y sin cola
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+        'JWT_SECRET_KEY': 'your_secret_key',
+        'AUTH_HASH_WORKERS': 1,
+        'AUTH_HASH_QUEUE_SIZE': 0,
+        'AUTH_HASH_QUEUE_TIMEOUT': 0.05,
+        'API_RESOURCES': {"api.auth_resource:AuthResource": ("/auth/<string:action>", "/auth/role")},
+    })
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def register_payload(**overrides):
+    payload = {
+        "name": "Test User", "lstF": "Doe", "lstM": "Smith", "address": "123 Main St",
+        "email": "test@example.com", "password": "password123", "c_pass": "password123",
+        "phone": "5551234", "payment": "credit_card", "role": 0,
+    }
+    payload.update(overrides)
+    return payload
+
+
+def test_register_and_login_through_pool(client, hasher):
+    before = hasher.stats()
+    response = client.post('/auth/register', json=register_payload())
+    assert response.status_code == 201
+    assert User.query.one().password.startswith("pbkdf2:sha256")
+
+    response = client.post('/auth/login', json={"email": "test@example.com", "password": "password123"})
+    assert response.status_code == 200
+    assert "access_token" in response.get_json()
+
+    response = client.post('/auth/login', json={"email": "test@example.com", "password": "wrong-password"})
+    assert response.status_code == 401
+
+    stats = hasher.stats()
+    assert stats["calls"] - before["calls"] == 3
+    assert stats["rejected"] == before["rejected"]
+    assert stats["run_seconds_total"] > before["run_seconds_total"]
+
+
+def test_login_returns_503_when_pool_is_saturated(client, hasher):
+    client.post('/auth/register', json=register_payload())
+
+    rejected = hasher.stats()["rejected"]
+    # Ocupar el único lugar del pool para simular una ráfaga de logins
+    hasher._slots.acquire()
+    try:
+        response = client.post('/auth/login', json={"email": "test@example.com", "password": "password123"})
+    finally:
+        hasher._slots.release()
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert hasher.stats()["rejected"] == rejected + 1
+
+
+def test_login_recovers_after_a_pool_process_dies(client, hasher):
+    """Un proceso del pool que muere no deja los logins en 500: se crea un pool nuevo."""
+    client.post('/auth/register', json=register_payload())
+    broken = hasher._executor
+    for process in list(broken._processes.values()):
+        process.kill()
+        process.join()
+
+    response = client.post('/auth/login', json={"email": "test@example.com", "password": "password123"})
+
+    assert response.status_code == 200
+    assert hasher._executor is not broken
@@ -1,28 +1,21 @@
 import pytest
-from flask import Flask
-from flask_restful import Api
-from flask_jwt_extended import JWTManager, create_access_token
+from flask_jwt_extended import create_access_token
+from app import create_app
 from api.models import db, Brand
-from api.controllers import BrandResource, Brands
 
 
 @pytest.fixture
 def app():
-    app = Flask(__name__)
-    
-    # Configurar base de datos y JWT
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-    app.config['JWT_SECRET_KEY'] = 'your_secret_key'
-    
-    jwt = JWTManager(app)
-
-    api = Api(app)
-    api.add_resource(Brands, '/api/brands')
-    api.add_resource(BrandResource, '/api/brands/<int:brand_id>')
-    
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+        'JWT_SECRET_KEY': 'your_secret_key',
+        'AUTH_HASH_WORKERS': 0,
+        'API_RESOURCES': {
+            "api.controllers:Brands": ("/api/brands",),
+            "api.controllers:BrandResource": ("/api/brands/<int:brand_id>",),
+        },
+    })
     with app.app_context():
-        db.init_app(app)
         db.create_all()
         yield app
         db.session.remove()
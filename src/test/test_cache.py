@@ -0,0 +1,129 @@
+import pytest
+from flask import Flask
+from flask_jwt_extended import create_access_token
+from api.models import db, Product, Category, Brand
+from api.cache import MemoryCache, ResponseCache
+from api.extensions import response_cache
+from app import create_app
+
+
+@pytest.fixture
+def app():
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+        'JWT_SECRET_KEY': 'your_secret_key',
+        'AUTH_HASH_WORKERS': 0,
+        'API_RESOURCES': {
+            "api.controllers:ProductResource": ("/products", "/products/<int:product_id>"),
+            "api.controllers:Categories": ("/categories", "/categories/<int:category_id>"),
+            "api.controllers:Brands": ("/brands",),
+            "api.controllers:BrandResource": ("/brands/<int:brand_id>",),
+        },
+    })
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def headers():
+    return {'Authorization': f'Bearer {create_access_token(identity="test_user")}'}
+
+
+@pytest.fixture
+def setup_data(app):
+    category = Category(name="Electronics", description="Gadgets and devices")
+    brand = Brand(username="BrandA", address="123 Brand St", phone="1234567890")
+    db.session.add_all([category, brand])
+    db.session.commit()
+    db.session.add(Product(name="Laptop", price=1200, description="A laptop", stock=5,
+                           category_id=category.id, brand_id=brand.id, img="http://example.com/laptop.jpg"))
+    db.session.commit()
+    return {"category": category, "brand": brand}
+
+
+def product_payload(setup_data, name):
+    return {"name": name, "price": 10, "description": "New product", "stock": 1,
+            "category_id": setup_data['category'].id, "brand_id": setup_data['brand'].id,
+            "img": "http://example.com/new.jpg"}
+
+
+def test_repeated_reads_are_served_from_cache(client, setup_data, headers):
+    first = client.get('/products', headers=headers)
+    second = client.get('/products', headers=headers)
+
+    assert first.headers['X-Cache'] == "MISS"
+    assert second.headers['X-Cache'] == "HIT"
+    assert first.get_json() == second.get_json()
+
+    # La query string forma parte de la llave, sin importar el orden
+    assert client.get('/products?sort=price&limit=5', headers=headers).headers['X-Cache'] == "MISS"
+    assert client.get('/products?limit=5&sort=price', headers=headers).headers['X-Cache'] == "HIT"
+
+
+def test_product_write_invalidates_product_reads(client, setup_data, headers):
+    client.get('/products', headers=headers)
+    client.get('/categories', headers=headers)
+
+    assert client.post('/products', json=product_payload(setup_data, "Tablet"), headers=headers).status_code == 201
+
+    response = client.get('/products', headers=headers)
+    assert response.headers['X-Cache'] == "MISS"
+    assert [item['name'] for item in response.get_json()] == ["Laptop", "Tablet"]
+    # Las categorías no dependen de los productos
+    assert client.get('/categories', headers=headers).headers['X-Cache'] == "HIT"
+
+
+def test_failed_write_keeps_cache(client, setup_data, headers):
+    client.get('/products', headers=headers)
+
+    response = client.post('/products', json=product_payload(setup_data, "Laptop"), headers=headers)
+
+    assert response.status_code == 400
+    assert client.get('/products', headers=headers).headers['X-Cache'] == "HIT"
+
+
+def test_category_and_brand_writes_invalidate_product_reads(client, setup_data, headers):
+    category = setup_data['category']
+    brand = setup_data['brand']
+    client.get('/products', headers=headers)
+
+    client.patch(f'/categories/{category.id}', json={"name": "Gadgets", "description": "Renamed"}, headers=headers)
+    response = client.get('/products', headers=headers)
+    assert response.headers['X-Cache'] == "MISS"
+    assert response.get_json()[0]['category_name'] == "Gadgets"
+
+    client.patch(f'/brands/{brand.id}', json={"username": "BrandZ", "address": "1 St", "phone": "1"}, headers=headers)
+    response = client.get('/products', headers=headers)
+    assert response.headers['X-Cache'] == "MISS"
+    assert response.get_json()[0]['brand_username'] == "BrandZ"
+    assert client.get(f'/brands/{brand.id}', headers=headers).get_json()['username'] == "BrandZ"
+
+
+def test_cache_disabled_without_init_app():
+    app = Flask(__name__)
+
+    with app.test_request_context('/categories'):
+        assert ResponseCache.backend() is None
+
+
+def test_memory_cache_ttl_and_lru():
+    now = [0.0]
+    cache = MemoryCache(maxsize=2, clock=lambda: now[0])
+    cache.set("a", 1, ttl=10)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None  # desalojada por LRU
+    assert cache.get("a") == 1
+    now[0] = 10.0
+    assert cache.get("a") is None  # vencida por TTL
+    assert cache.get("c") == 3
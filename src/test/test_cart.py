@@ -1,27 +1,23 @@
 import pytest
 from api.models import db, User, Product, Cart
 from api.controllers import CartController
-from flask import Flask
-from flask_restful import Api
-from flask_jwt_extended import JWTManager, create_access_token
+from sqlalchemy import event, text
+from flask_jwt_extended import create_access_token
+from app import create_app
 
 
 @pytest.fixture
 def app():
-    app = Flask(__name__)
-    
-    # Configurar base de datos y JWT
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-    app.config['JWT_SECRET_KEY'] = 'your_secret_key'
-    
-    jwt = JWTManager(app)
-
-    api = Api(app)
-    api.add_resource(CartController, '/carts', '/carts/<int:id>')
-    
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+        'JWT_SECRET_KEY': 'your_secret_key',
+        'AUTH_HASH_WORKERS': 0,
+        'API_RESOURCES': {
+            "api.controllers:CartController": ("/carts", "/carts/<int:id>"),
+            "api.controllers:CartSummary": ("/carts/summary",),
+        },
+    })
     with app.app_context():
-        db.init_app(app)
         db.create_all()
         yield app
         db.session.remove()
@@ -232,3 +228,134 @@ def test_add_product_with_zero_stock(client, setup_data):
     
     assert response.status_code == 400
     assert "Quantity exceeds available stock" in response.get_data(as_text=True)
+
+
+def test_get_cart_uses_constant_queries_and_sql_summary(client, setup_data):
+    user = setup_data['user']
+    products = [
+        Product(name=f"Line {i}", price=10.0 + i, description="Cart line", stock=100,
+                category_id=1, brand_id=1, img=f"http://example.com/{i}.jpg")
+        for i in range(25)
+    ]
+    db.session.add_all(products)
+    db.session.flush()
+    db.session.add_all([
+        Cart(user_id=user.id, product_id=product.id, quantity=2, price=product.price, total=product.price * 2)
+        for product in products
+    ])
+    db.session.commit()
+    access_token = create_access_token(identity=str(user.id))
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(db.engine, "before_cursor_execute", listener)
+    try:
+        response = client.get('/carts', headers={'Authorization': f'Bearer {access_token}'})
+    finally:
+        event.remove(db.engine, "before_cursor_execute", listener)
+
+    data = response.get_json()
+    assert response.status_code == 200
+    assert len(data['data']) == 25
+    assert data['data'][0]['product_name'] == "Line 0"
+    assert len(statements) == 2  # líneas + resumen
+    assert data['summary'] == {"line_count": 25, "item_count": 50, "grand_total": sum(2 * (10.0 + i) for i in range(25))}
+
+    summary = client.get('/carts/summary', headers={'Authorization': f'Bearer {access_token}'}).get_json()
+    assert summary == data['summary']
+
+
+def test_cart_summary_empty(client, setup_data):
+    access_token = create_access_token(identity=str(setup_data['user'].id))
+
+    response = client.get('/carts/summary', headers={'Authorization': f'Bearer {access_token}'})
+
+    assert response.get_json() == {"line_count": 0, "item_count": 0, "grand_total": 0.0}
+
+
+def test_batch_add_upserts_and_reports_per_line(client, setup_data):
+    user = setup_data['user']
+    product = setup_data['product']
+    other = Product(name="Other Product", price=5.0, description="Second product", stock=3,
+                    category_id=1, brand_id=1, img="http://example.com/other.jpg")
+    db.session.add(other)
+    db.session.add(Cart(user_id=user.id, product_id=product.id, quantity=1, price=product.price, total=product.price))
+    db.session.commit()
+    access_token = create_access_token(identity=str(user.id))
+
+    response = client.post('/carts', json={"items": [
+        {"product_id": product.id, "quantity": 2},
+        {"product_id": other.id, "quantity": 2},
+        {"product_id": other.id, "quantity": 2},
+        {"product_id": 9999, "quantity": 1},
+        {"product_id": other.id, "quantity": 0},
+        {"product_id": other.id, "quantity": True},
+        {"product_id": True, "quantity": 1},
+    ]}, headers={'Authorization': f'Bearer {access_token}'})
+
+    assert response.status_code == 200
+    results = response.get_json()['results']
+    assert [result['status'] for result in results] == ["updated", "added", "error", "error", "error", "error", "error"]
+    assert "Only 3 items are available" in results[2]['message']
+    assert results[3]['message'] == "Product not found"
+    assert results[4]['message'] == results[5]['message'] == "Quantity must be greater than 0."
+    assert results[6]['message'] == "Product ID must be greater than 0."
+
+    lines = {item.product_id: item for item in Cart.query.filter_by(user_id=user.id)}
+    assert lines[product.id].quantity == 3
+    assert lines[product.id].total == product.price * 3
+    assert lines[other.id].quantity == 2
+
+
+def test_batch_add_rejects_oversized_batch(client, setup_data):
+    access_token = create_access_token(identity=str(setup_data['user'].id))
+    items = [{"product_id": setup_data['product'].id, "quantity": 1}] * (CartController.max_batch_lines + 1)
+
+    response = client.post('/carts', json={"items": items}, headers={'Authorization': f'Bearer {access_token}'})
+
+    assert response.status_code == 400
+    assert Cart.query.count() == 0
+
+
+def test_add_to_cart_with_idempotency_key(client, setup_data):
+    """El reintento de un lote con la misma llave no vuelve a sumar cantidades."""
+    user = setup_data['user']
+    product = setup_data['product']
+    access_token = create_access_token(identity=str(user.id))
+    headers = {'Authorization': f'Bearer {access_token}', 'Idempotency-Key': 'add-1'}
+    body = {"items": [{"product_id": product.id, "quantity": 2}]}
+
+    first = client.post('/carts', json=body, headers=headers)
+    retry = client.post('/carts', json=body, headers=headers)
+
+    assert first.status_code == retry.status_code == 200
+    assert retry.get_json() == first.get_json()
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert Cart.query.filter_by(user_id=user.id).one().quantity == 2
+
+    # La misma llave con otro cuerpo es un error del cliente
+    other = client.post('/carts', json={"items": [{"product_id": product.id, "quantity": 5}]}, headers=headers)
+    assert other.status_code == 422
+    assert Cart.query.filter_by(user_id=user.id).one().quantity == 2
+
+
+def test_login_token_uses_integer_id_claim(client, setup_data):
+    """El token del login tiene el email como identity: las filas se guardan con el id entero."""
+    user = setup_data['user']
+    product = setup_data['product']
+    access_token = create_access_token(identity=user.email, additional_claims={"id": user.id, "role": user.role})
+    headers = {'Authorization': f'Bearer {access_token}'}
+
+    assert client.post('/carts', json={'product_id': product.id, 'quantity': 1}, headers=headers).status_code == 200
+    assert client.get('/carts', headers=headers).get_json()['data'][0]['product_name'] == product.name
+
+    stored = db.session.execute(text("SELECT user_id, typeof(user_id) FROM cart")).one()
+    assert tuple(stored) == (user.id, 'integer')
+
+
+def test_token_without_user_id_is_rejected(client, setup_data):
+    access_token = create_access_token(identity="test@example.com")
+
+    response = client.get('/carts', headers={'Authorization': f'Bearer {access_token}'})
+
+    assert response.status_code == 401
@@ -1,29 +1,19 @@
 import pytest
-from flask import Flask
-from flask_restful import Api
-from flask_jwt_extended import JWTManager, create_access_token
+from flask_jwt_extended import create_access_token
+from app import create_app
 from api.models import db, Category
-from api.controllers import Categories
 
 
 # Configuración del entorno de prueba
 @pytest.fixture
 def app():
-    app = Flask(__name__)
-    
-    # Configuración de la base de datos y JWT
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-    app.config['JWT_SECRET_KEY'] = 'your_secret_key'
-    
-    jwt = JWTManager(app)
-
-    # Inicializar la API y recursos
-    api = Api(app)
-    api.add_resource(Categories, '/categories', '/categories/<int:category_id>')
-    
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+        'JWT_SECRET_KEY': 'your_secret_key',
+        'AUTH_HASH_WORKERS': 0,
+        'API_RESOURCES': {"api.controllers:Categories": ("/categories", "/categories/<int:category_id>")},
+    })
     with app.app_context():
-        db.init_app(app)
         db.create_all()
         yield app
         db.session.remove()
@@ -139,3 +129,22 @@ def test_create_category_invalid_data(client):
     assert response.status_code == 400
     assert "Description cannot be empty" in response.get_data(as_text=True)
 
+
+
+def test_get_categories_page_size_is_capped(client, app):
+    from api.pagination import MAX_PAGE_SIZE
+
+    db.session.add_all([Category(name=f"Cat {i}", description="Paged") for i in range(MAX_PAGE_SIZE + 5)])
+    db.session.commit()
+    headers = {'Authorization': f'Bearer {create_access_token(identity="test_user")}'}
+
+    response = client.get(f'/categories?limit={MAX_PAGE_SIZE * 10}', headers=headers)
+    data = response.get_json()
+
+    assert response.status_code == 200
+    assert len(data['data']) == MAX_PAGE_SIZE
+    assert data['next_cursor'] == response.headers['X-Next-Cursor']
+
+    rest = client.get(f"/categories?after={data['next_cursor']}", headers=headers).get_json()
+    assert len(rest["data"]) == 5
+    assert rest["next_cursor"] is None
@@ -0,0 +1,302 @@
+import time
+import pytest
+from datetime import timedelta
+from sqlalchemy.exc import OperationalError
+from api import checkout
+from api.checkout import claim_job, process_next
+from api.extensions import checkout_workers
+from api.models import db, User, Product, Cart, Order, CheckoutJob, utcnow
+from flask_jwt_extended import create_access_token
+from app import create_app
+
+
+def _make_app(uri, workers=0, **config):
+    return create_app({
+        'SQLALCHEMY_DATABASE_URI': uri,
+        'JWT_SECRET_KEY': 'your_secret_key',
+        'AUTH_HASH_WORKERS': 0,
+        'CHECKOUT_ASYNC': True,
+        'CHECKOUT_WORKERS': workers,
+        'CHECKOUT_POLL_INTERVAL': 0.05,
+        'CHECKOUT_RETRY_DELAY': 1.0,
+        'CHECKOUT_MAX_ATTEMPTS': 3,
+        'API_RESOURCES': {
+            "api.controllers:OrderController": ("/orders", "/orders/<int:order_id>"),
+            "api.controllers:CheckoutJobResource": ("/orders/jobs/<int:job_id>",),
+        },
+        **config,
+    })
+
+
+def _seed(stock=50, users=1):
+    product = Product(name="Test Product", price=100.0, description="A sample product for testing.", stock=stock,
+                      category_id=1, brand_id=1, img="http://example.com/product.jpg")
+    db.session.add(product)
+    people = [User(name=f"Buyer {i}", lstF="Doe", lstM="Smith", address="123 Main St", email=f"buyer{i}@example.com",
+                   password="password123", c_pass="password123", phone="555-1234", payment="credit_card")
+              for i in range(users)]
+    db.session.add_all(people)
+    db.session.flush()
+    db.session.add_all([Cart(user_id=user.id, product_id=product.id, quantity=2, price=100.0, total=200.0)
+                        for user in people])
+    db.session.commit()
+    return product, [create_access_token(identity=str(user.id)) for user in people]
+
+
+@pytest.fixture
+def app():
+    app = _make_app('sqlite:///:memory:')
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def test_async_checkout_is_queued_then_processed(client):
+    product, (token,) = _seed()
+    headers = {'Authorization': f'Bearer {token}'}
+
+    response = client.post('/orders', headers=headers)
+
+    assert response.status_code == 202
+    job_id = response.get_json()['job_id']
+    assert response.headers['Location'] == f'/orders/jobs/{job_id}'
+    assert client.get(f'/orders/jobs/{job_id}', headers=headers).get_json()['status'] == 'queued'
+    assert Order.query.count() == 0
+
+    assert process_next('test-worker') is True
+    assert process_next('test-worker') is False  # Cola vacía
+
+    job = client.get(f'/orders/jobs/{job_id}', headers=headers).get_json()
+    assert job['status'] == 'succeeded'
+    assert job['attempts'] == 1
+    order = db.session.get(Order, job['order_id'])
+    assert float(order.total_amount) == 200.0
+    assert db.session.get(Product, product.id).stock == 48
+    assert Cart.query.count() == 0
+
+
+def test_async_checkout_empty_cart_is_rejected_before_queueing(client):
+    _, (token,) = _seed()
+    Cart.query.delete()
+    db.session.commit()
+
+    response = client.post('/orders', headers={'Authorization': f'Bearer {token}'})
+
+    assert response.status_code == 400
+    assert CheckoutJob.query.count() == 0
+
+
+def test_async_checkout_without_stock_is_rejected_before_queueing(client):
+    product, (token,) = _seed(stock=1)
+
+    response = client.post('/orders', headers={'Authorization': f'Bearer {token}'})
+
+    assert response.status_code == 409
+    assert response.get_json()['product_id'] == product.id
+    assert CheckoutJob.query.count() == 0
+
+
+def test_async_checkout_out_of_stock_fails_without_retry(client):
+    product, (token,) = _seed(stock=2)
+    headers = {'Authorization': f'Bearer {token}'}
+    job_id = client.post('/orders', headers=headers).get_json()['job_id']
+    # Otro checkout se llevó una unidad mientras el trabajo esperaba en la cola
+    product.stock = 1
+    db.session.commit()
+
+    process_next('test-worker')
+
+    job = client.get(f'/orders/jobs/{job_id}', headers=headers).get_json()
+    assert job['status'] == 'failed'
+    assert job['error'] == f"Insufficient stock for product {product.id}"
+    assert job['order_id'] is None
+    assert db.session.get(Product, product.id).stock == 1
+    assert Cart.query.count() == 1
+
+
+def test_second_job_for_the_same_cart_fails_without_a_second_order(client):
+    product, (token,) = _seed()
+    headers = {'Authorization': f'Bearer {token}'}
+    first, second = (client.post('/orders', headers=headers).get_json()['job_id'] for _ in range(2))
+
+    process_next('test-worker')
+    process_next('test-worker')
+
+    assert client.get(f'/orders/jobs/{first}', headers=headers).get_json()['status'] == 'succeeded'
+    job = client.get(f'/orders/jobs/{second}', headers=headers).get_json()
+    assert job['status'] == 'failed'
+    assert Order.query.count() == 1
+    assert db.session.get(Product, product.id).stock == 48
+
+
+def test_locked_database_is_retried_with_backoff(client, monkeypatch):
+    _, (token,) = _seed()
+    place_order, calls = checkout.place_order, []
+
+    def flaky_place_order(*args, **kwargs):
+        calls.append(1)
+        if len(calls) == 1:
+            raise OperationalError("UPDATE product", {}, Exception("database is locked"))
+        return place_order(*args, **kwargs)
+
+    monkeypatch.setattr(checkout, "place_order", flaky_place_order)
+    job_id = client.post('/orders', headers={'Authorization': f'Bearer {token}'}).get_json()['job_id']
+
+    process_next('test-worker')
+    job = db.session.get(CheckoutJob, job_id)
+    assert (job.status, job.attempts, job.error) == ('queued', 1, 'database is locked')
+    # Todavía en espera: ningún worker lo toma antes de available_at
+    assert claim_job('test-worker') is None
+
+    checkout.run_job(claim_job('test-worker', now=utcnow() + timedelta(seconds=2)), 'test-worker')
+    job = db.session.get(CheckoutJob, job_id)
+    assert (job.status, job.attempts) == ('succeeded', 2)
+    assert Order.query.count() == 1
+
+
+def test_job_fails_after_max_attempts(client, monkeypatch):
+    _, (token,) = _seed()
+
+    def locked(*args, **kwargs):
+        raise OperationalError("UPDATE product", {}, Exception("database is locked"))
+
+    monkeypatch.setattr(checkout, "place_order", locked)
+    job_id = client.post('/orders', headers={'Authorization': f'Bearer {token}'}).get_json()['job_id']
+
+    later = utcnow()
+    for _ in range(3):
+        later += timedelta(minutes=1)
+        checkout.run_job(claim_job('test-worker', now=later), 'test-worker')
+
+    job = db.session.get(CheckoutJob, job_id)
+    assert job.status == 'failed'
+    assert job.error.startswith("Checkout failed after 3 attempts")
+    assert claim_job('test-worker', now=later + timedelta(hours=1)) is None
+
+
+def test_claimed_job_is_not_taken_twice_until_lease_expires(client):
+    _, (token,) = _seed()
+    client.post('/orders', headers={'Authorization': f'Bearer {token}'})
+
+    job = claim_job('worker-a')
+    assert job.locked_by == 'worker-a'
+    assert claim_job('worker-b') is None
+
+    # El worker murió sin terminar: tras CHECKOUT_LEASE_TIMEOUT otro lo retoma
+    reclaimed = claim_job('worker-b', now=utcnow() + timedelta(seconds=61))
+    assert reclaimed.id == job.id
+    assert (reclaimed.locked_by, reclaimed.attempts) == ('worker-b', 2)
+
+
+def test_worker_that_lost_its_lease_does_not_settle_the_job(client):
+    """Si el lease venció y otro worker retomó el trabajo, el primero no crea otra orden ni pisa el resultado."""
+    _, (token,) = _seed()
+    client.post('/orders', headers={'Authorization': f'Bearer {token}'})
+    stale = claim_job('worker-a')
+    reclaimed = claim_job('worker-b', now=utcnow() + timedelta(seconds=61))
+
+    # worker-a termina tarde: su orden se deshace
+    checkout.run_job(stale, 'worker-a')
+    job = db.session.get(CheckoutJob, reclaimed.id)
+    assert (job.status, job.locked_by) == ('running', 'worker-b')
+    assert Order.query.count() == 0
+    assert Cart.query.count() == 1
+
+    checkout.run_job(reclaimed, 'worker-b')
+    assert db.session.get(CheckoutJob, reclaimed.id).status == 'succeeded'
+
+    # Un intento tardío de worker-a con el carrito ya vacío no lo marca como fallido
+    checkout.run_job(stale, 'worker-a')
+    job = db.session.get(CheckoutJob, reclaimed.id)
+    assert (job.status, job.error) == ('succeeded', None)
+    assert Order.query.count() == 1
+
+
+def test_checkout_job_of_another_user_is_not_found(client):
+    _, (owner, other) = _seed(users=2)
+    job_id = client.post('/orders', headers={'Authorization': f'Bearer {owner}'}).get_json()['job_id']
+
+    response = client.get(f'/orders/jobs/{job_id}', headers={'Authorization': f'Bearer {other}'})
+
+    assert response.status_code == 404
+
+
+def test_sync_checkout_when_async_is_disabled(app, client):
+    app.config['CHECKOUT_ASYNC'] = False
+    _, (token,) = _seed()
+
+    response = client.post('/orders', headers={'Authorization': f'Bearer {token}'})
+
+    assert response.status_code == 201
+    assert CheckoutJob.query.count() == 0
+
+
+def _wait_for_jobs(client, jobs, timeout=10):
+    deadline = time.monotonic() + timeout
+    statuses = []
+    while time.monotonic() < deadline:
+        statuses = [client.get(f'/orders/jobs/{job_id}', headers={'Authorization': f'Bearer {token}'})
+                    .get_json()['status'] for job_id, token in jobs]
+        if set(statuses) <= {'succeeded', 'failed'}:
+            break
+        time.sleep(0.05)
+    return statuses
+
+
+def test_pending_jobs_are_drained_after_a_restart(tmp_path):
+    """Los trabajos que quedaron en la cola se procesan con la primera petición, sin checkouts nuevos."""
+    app = _make_app(f"sqlite:///{tmp_path / 'jobs.db'}", workers=1)
+    with app.app_context():
+        db.create_all()
+        _, (token,) = _seed()
+        job_id = checkout.enqueue_checkout(1, Cart.query.all()).id
+
+    try:
+        statuses = _wait_for_jobs(app.test_client(), [(job_id, token)])
+    finally:
+        checkout_workers.stop(app)
+
+    assert statuses == ['succeeded']
+    with app.app_context():
+        assert Order.query.count() == 1
+        db.drop_all()
+        db.engine.dispose()
+
+
+def test_worker_threads_drain_the_queue(tmp_path):
+    # SQLite en archivo para que los hilos del worker compartan la base con la API
+    app = _make_app(f"sqlite:///{tmp_path / 'jobs.db'}", workers=2,
+                    SQLALCHEMY_ENGINE_OPTIONS={"connect_args": {"timeout": 30}})
+    with app.app_context():
+        db.create_all()
+        product, tokens = _seed(stock=5, users=8)
+        product_id = product.id
+
+    try:
+        client = app.test_client()
+        jobs, rejected = [], 0
+        for token in tokens:
+            response = client.post('/orders', headers={'Authorization': f'Bearer {token}'})
+            if response.status_code == 409:
+                rejected += 1  # Los workers ya habían agotado el stock al encolar
+            else:
+                jobs.append((response.get_json()['job_id'], token))
+        statuses = _wait_for_jobs(client, jobs)
+    finally:
+        checkout_workers.stop(app)
+
+    # 5 unidades y pedidos de 2: solo dos checkouts alcanzan
+    assert statuses.count('succeeded') == 2
+    assert statuses.count('failed') + rejected == 6
+    with app.app_context():
+        assert db.session.get(Product, product_id).stock == 1
+        assert Order.query.count() == 2
+        db.drop_all()
+        db.engine.dispose()
@@ -0,0 +1,156 @@
+import pytest
+from datetime import timedelta
+from flask_jwt_extended import create_access_token
+from api.models import db, User, Product, Category, Brand, Order
+from app import create_app
+
+
+@pytest.fixture
+def app():
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+        'JWT_SECRET_KEY': 'your_secret_key',
+        'AUTH_HASH_WORKERS': 0,
+        'API_RESOURCES': {
+            "api.controllers:ProductResource": ("/products", "/products/<int:product_id>"),
+            "api.controllers:Categories": ("/categories", "/categories/<int:category_id>"),
+            "api.controllers:OrderController": ("/orders", "/orders/<int:order_id>"),
+        },
+    })
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def headers():
+    return {'Authorization': f'Bearer {create_access_token(identity="test_user")}'}
+
+
+@pytest.fixture
+def setup_data(app):
+    category = Category(name="Electronics", description="Gadgets and devices")
+    brand = Brand(username="BrandA", address="123 Brand St", phone="1234567890")
+    db.session.add_all([category, brand])
+    db.session.commit()
+    db.session.add(Product(name="Laptop", price=1200, description="A laptop", stock=5,
+                           category_id=category.id, brand_id=brand.id, img="http://example.com/laptop.jpg"))
+    db.session.commit()
+    return {"category": category, "brand": brand}
+
+
+def test_products_if_none_match_returns_304(client, setup_data, headers):
+    response = client.get('/products', headers=headers)
+    etag = response.headers['ETag']
+    assert response.status_code == 200
+    assert etag.startswith('"') and not etag.startswith('W/')
+
+    response = client.get('/products', headers=dict(headers, **{'If-None-Match': etag}))
+    assert response.status_code == 304
+    assert response.data == b""
+    assert response.headers['ETag'] == etag
+
+    # Otra query string es otra representación
+    assert client.get('/products?sort=price', headers=dict(headers, **{'If-None-Match': etag})).status_code == 200
+
+
+def test_products_etag_changes_after_write(client, setup_data, headers):
+    etag = client.get('/products', headers=headers).headers['ETag']
+
+    db.session.add(Product(name="Tablet", price=300, description="A tablet", stock=1,
+                           category_id=setup_data['category'].id, brand_id=setup_data['brand'].id,
+                           img="http://example.com/tablet.jpg"))
+    db.session.commit()
+
+    response = client.get('/products', headers=dict(headers, **{'If-None-Match': etag}))
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert len(response.get_json()) == 2
+
+
+def test_categories_last_modified_is_not_a_validator(client, setup_data, headers):
+    """Last-Modified se informa, pero If-Modified-Since no alcanza para un 304: un borrado no
+    mueve max(updated_at). El ETag sí incluye el conteo."""
+    response = client.get('/categories', headers=headers)
+    last_modified, etag = response.headers['Last-Modified'], response.headers['ETag']
+
+    assert client.get('/categories', headers=dict(headers, **{'If-Modified-Since': last_modified})).status_code == 200
+
+    extra = Category(name="Books", description="All about books")
+    db.session.add(extra)
+    db.session.commit()
+    etag = client.get('/categories', headers=headers).headers['ETag']
+    db.session.delete(extra)
+    db.session.commit()
+
+    response = client.get('/categories', headers=dict(headers, **{'If-None-Match': etag}))
+    assert response.status_code == 200
+    assert [category['name'] for category in response.get_json()] == ["Electronics"]
+
+
+def test_cached_body_follows_writes_from_other_processes(tmp_path):
+    """Dos apps (dos procesos) sobre la misma base: la escritura de una no deja a la otra
+    sirviendo el cuerpo viejo de su caché con el ETag nuevo."""
+    config = {'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'shared.db'}", 'JWT_SECRET_KEY': 'your_secret_key',
+              'AUTH_HASH_WORKERS': 0}
+    reader, writer = create_app(config), create_app(config)
+    with writer.app_context():
+        db.create_all()
+        category = Category(name="Electronics", description="Gadgets and devices")
+        brand = Brand(username="BrandA", address="123 Brand St", phone="1234567890")
+        db.session.add_all([category, brand])
+        db.session.flush()
+        db.session.add(Product(name="Laptop", price=1200, description="A laptop", stock=5, category_id=category.id,
+                               brand_id=brand.id, img="http://example.com/laptop.jpg"))
+        db.session.commit()
+        headers = {'Authorization': f'Bearer {create_access_token(identity="test_user")}'}
+
+    client = reader.test_client()
+    first = client.get('/api/products/', headers=headers)
+    assert first.headers['X-Cache'] == 'MISS'
+    assert client.get('/api/products/', headers=headers).headers['X-Cache'] == 'HIT'
+
+    # El otro proceso cambia el stock sin pasar por la caché de este (un segundo después, como
+    # mínimo: updated_at tiene resolución de segundos)
+    with writer.app_context():
+        product = db.session.get(Product, 1)
+        product.stock, product.updated_at = 3, product.updated_at + timedelta(seconds=1)
+        db.session.commit()
+
+    second = client.get('/api/products/', headers=dict(headers, **{'If-None-Match': first.headers['ETag']}))
+    assert second.status_code == 200
+    assert second.headers['ETag'] != first.headers['ETag']
+    assert second.get_json()[0]['stock'] == 3
+    assert client.get('/api/products/', headers=dict(headers, **{'If-None-Match': second.headers['ETag']})).status_code == 304
+
+    for app in (reader, writer):
+        with app.app_context():
+            db.engine.dispose()
+
+
+def test_orders_etag_is_per_user(client, setup_data):
+    users = [
+        User(name=f"User {i}", lstF="Doe", lstM="Smith", address="123 Main St", email=f"user{i}@example.com",
+             password="password123", c_pass="password123", phone="555-1234", payment="credit_card")
+        for i in range(2)
+    ]
+    db.session.add_all(users)
+    db.session.commit()
+    tokens = [create_access_token(identity=str(user.id)) for user in users]
+
+    first = client.get('/orders', headers={'Authorization': f'Bearer {tokens[0]}'})
+    etag = first.headers['ETag']
+    assert client.get('/orders', headers={'Authorization': f'Bearer {tokens[0]}', 'If-None-Match': etag}).status_code == 304
+
+    db.session.add(Order(user_id=users[1].id, total_amount=10))
+    db.session.commit()
+    # Una orden de otro usuario no cambia la versión propia
+    assert client.get('/orders', headers={'Authorization': f'Bearer {tokens[0]}', 'If-None-Match': etag}).status_code == 304
+    assert client.get('/orders', headers={'Authorization': f'Bearer {tokens[1]}', 'If-None-Match': etag}).status_code == 200
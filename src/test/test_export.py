@@ -0,0 +1,140 @@
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from flask_jwt_extended import create_access_token
+from sqlalchemy import text
+from api.models import db, User, Product, Order
+from api import export_resource
+from app import create_app
+
+
+@pytest.fixture
+def app():
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+        'JWT_SECRET_KEY': 'your_secret_key',
+        'AUTH_HASH_WORKERS': 0,
+        'API_RESOURCES': {"api.export_resource:ExportResource": ("/export/<string:entity>",)},
+    })
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def admin_headers():
+    token = create_access_token(identity="1", additional_claims={"role": 1})
+    return {'Authorization': f'Bearer {token}'}
+
+
+@pytest.fixture
+def setup_data(app):
+    """Crea un usuario, productos y una orden."""
+    user = User(name="Test User", lstF="Doe", lstM="Smith", address="123 Main St", email="test@example.com",
+                password="hashed", c_pass="hashed", phone="555-1234", payment="credit_card", role=1,
+                remember_token="some_token")
+    db.session.add(user)
+    db.session.add_all([
+        Product(name=f"Product {i}", price=10.0 + i, description="Export, \"quoted\"", stock=i,
+                category_id=1, brand_id=1, img="http://example.com/p.jpg")
+        for i in range(5)
+    ])
+    db.session.commit()
+    db.session.add(Order(user_id=user.id, total_amount=42.5))
+    db.session.commit()
+    return {"user": user}
+
+
+def ndjson(response):
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def test_export_products_ndjson_streams_every_row(client, setup_data, admin_headers, monkeypatch):
+    """Exporta todo el catálogo en NDJSON, en varios bloques."""
+    monkeypatch.setattr(export_resource, "EXPORT_CHUNK_SIZE", 2)
+    response = client.get('/export/products', headers=admin_headers)
+
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.mimetype == "application/x-ndjson"
+    assert "products.ndjson" in response.headers["Content-Disposition"]
+    rows = ndjson(response)
+    assert [row["name"] for row in rows] == [f"Product {i}" for i in range(5)]
+    assert rows[0]["price"] == 10.0
+    assert rows[0]["description"] == 'Export, "quoted"'
+
+
+def test_export_products_csv(client, setup_data, admin_headers, monkeypatch):
+    """El CSV lleva encabezado una sola vez aunque se escriba por bloques."""
+    monkeypatch.setattr(export_resource, "EXPORT_CHUNK_SIZE", 2)
+    response = client.get('/export/products?format=csv', headers=admin_headers)
+
+    assert response.status_code == 200
+    assert response.mimetype == "text/csv"
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert len(rows) == 5
+    assert rows[4]["name"] == "Product 4"
+    assert rows[4]["stock"] == "4"
+    assert rows[0]["description"] == 'Export, "quoted"'
+
+
+def test_export_users_excludes_secrets(client, setup_data, admin_headers):
+    """Las contraseñas y tokens nunca salen en la exportación."""
+    rows = ndjson(client.get('/export/users', headers=admin_headers))
+
+    assert rows[0]["email"] == "test@example.com"
+    assert not {"password", "c_pass", "remember_token"} & set(rows[0])
+
+
+def test_export_orders(client, setup_data, admin_headers):
+    rows = ndjson(client.get('/export/orders', headers=admin_headers))
+
+    assert rows == [dict(rows[0], id=1, user_id=setup_data["user"].id, total_amount=42.5)]
+
+
+def test_export_updated_since(client, setup_data, admin_headers):
+    """updated_since devuelve solo los registros modificados desde esa fecha."""
+    old = datetime(2020, 1, 1)
+    db.session.query(Product).filter(Product.id != 3).update({Product.updated_at: old})
+    db.session.commit()
+
+    since = (old + timedelta(days=1)).isoformat()
+    rows = ndjson(client.get(f'/export/products?updated_since={since}', headers=admin_headers))
+    assert [row["id"] for row in rows] == [3]
+
+    rows = ndjson(client.get('/export/products?updated_since=2020-01-02T00:00:00%2B05:00', headers=admin_headers))
+    assert [row["id"] for row in rows] == [3]
+
+
+def test_export_updated_since_includes_the_watermark_second(client, setup_data, admin_headers):
+    """Filas con updated_at de CURRENT_TIMESTAMP en el segundo exacto de la marca."""
+    db.session.execute(text("UPDATE product SET updated_at = '2025-01-01 10:00:00' WHERE id = 1"))
+    db.session.execute(text("UPDATE product SET updated_at = '2025-01-01 09:59:59' WHERE id != 1"))
+    db.session.commit()
+
+    for since in ('2025-01-01T10:00:00', '2025-01-01T10:00:00.250000'):
+        rows = ndjson(client.get(f'/export/products?updated_since={since}', headers=admin_headers))
+        assert [row["id"] for row in rows] == [1]
+
+
+def test_export_rejects_invalid_arguments(client, setup_data, admin_headers):
+    assert client.get('/export/carts', headers=admin_headers).status_code == 404
+    assert client.get('/export/products?format=xml', headers=admin_headers).status_code == 400
+    assert client.get('/export/products?updated_since=yesterday', headers=admin_headers).status_code == 400
+
+
+def test_export_requires_admin(client, setup_data):
+    token = create_access_token(identity="2", additional_claims={"role": 0})
+    response = client.get('/export/products', headers={'Authorization': f'Bearer {token}'})
+
+    assert response.status_code == 403
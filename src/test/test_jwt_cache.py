@@ -0,0 +1,77 @@
+import pytest
+from flask_jwt_extended import create_access_token
+from api.models import db, Category
+from api.middleware.jwt_cache import VerifiedTokenCache
+from app import create_app
+
+
+@pytest.fixture
+def app():
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+        'JWT_SECRET_KEY': 'your_secret_key',
+        'JWT_VERIFY_CACHE_SIZE': 2,
+        'PROPAGATE_EXCEPTIONS': True,
+        'AUTH_HASH_WORKERS': 0,
+        'API_RESOURCES': {"api.controllers:Categories": ("/categories", "/categories/<int:category_id>")},
+    })
+    with app.app_context():
+        db.create_all()
+        db.session.add(Category(name="Books", description="All about books"))
+        db.session.commit()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def jwt(app):
+    # El CachingJWTManager que registró create_app
+    return app.extensions["flask-jwt-extended"]
+
+
+def test_repeated_token_skips_verification(client, jwt):
+    headers = {'Authorization': f'Bearer {create_access_token(identity="test_user")}'}
+
+    for _ in range(3):
+        response = client.get('/categories', headers=headers)
+        assert response.status_code == 200
+
+    assert jwt.token_cache.stats()["misses"] == 1
+    assert jwt.token_cache.stats()["hits"] == 2
+
+
+def test_tampered_token_is_still_rejected(client, jwt):
+    token = create_access_token(identity="test_user")
+    client.get('/categories', headers={'Authorization': f'Bearer {token}'})
+
+    header, payload, signature = token.split(".")
+    tampered = ".".join([header, payload, signature[:-2] + ("AA" if signature[-2:] != "AA" else "BB")])
+    response = client.get('/categories', headers={'Authorization': f'Bearer {tampered}'})
+
+    assert response.status_code == 422
+
+
+def test_cache_is_bounded(client, jwt):
+    for user in ("a", "b", "c"):
+        client.get('/categories', headers={'Authorization': f'Bearer {create_access_token(identity=user)}'})
+
+    stats = jwt.token_cache.stats()
+    assert stats["size"] == 2
+    assert stats["evictions"] == 1
+
+
+def test_entries_expire_at_token_exp():
+    now = [1000.0]
+    cache = VerifiedTokenCache(maxsize=10, clock=lambda: now[0])
+    cache.set("token", {"sub": "user", "exp": 1060})
+
+    assert cache.get("token") == {"sub": "user", "exp": 1060}
+    now[0] = 1060.0
+    assert cache.get("token") is None
+    assert cache.stats() == {"size": 0, "maxsize": 10, "hits": 1, "misses": 1, "evictions": 0}
@@ -0,0 +1,118 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+from flask_jwt_extended import create_access_token
+from api.models import db, Category
+from app import create_app
+
+
+def make_app(tmp_path, **config):
+    return create_app({
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'metrics.db'}",
+        'JWT_SECRET_KEY': 'your_secret_key',
+        'AUTH_HASH_WORKERS': 0,
+        'API_RESOURCES': {"api.controllers:Categories": ("/categories", "/categories/<int:category_id>")},
+        **config,
+    })
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = make_app(tmp_path)
+    with app.app_context():
+        db.create_all()
+        db.session.add(Category(name="Books", description="All about books"))
+        db.session.commit()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def scrape(app):
+    response = app.test_client().get('/metrics')
+    assert response.status_code == 200
+    assert response.content_type.startswith("text/plain; version=0.0.4")
+    return response.get_data(as_text=True).splitlines()
+
+
+def test_request_metrics_by_resource(app):
+    """Conteos, histograma e in-flight etiquetados por clase del recurso, método y status."""
+    access_token = create_access_token(identity="test_user")
+    client = app.test_client()
+    for _ in range(2):
+        assert client.get('/categories', headers={'Authorization': f'Bearer {access_token}'}).status_code == 200
+    assert client.get('/categories/999', headers={'Authorization': f'Bearer {access_token}'}).status_code == 404
+
+    lines = scrape(app)
+
+    assert '# TYPE http_requests_total counter' in lines
+    assert 'http_requests_total{method="GET",resource="Categories",status="200"} 2' in lines
+    assert 'http_requests_total{method="GET",resource="Categories",status="404"} 1' in lines
+    assert 'http_request_duration_seconds_bucket{method="GET",resource="Categories",status="200",le="+Inf"} 2' in lines
+    assert 'http_request_duration_seconds_count{method="GET",resource="Categories",status="200"} 2' in lines
+    assert 'http_requests_in_flight{method="GET",resource="Categories"} 0' in lines
+    # La petición a /metrics en curso cuenta como en vuelo
+    assert 'http_requests_in_flight{method="GET",resource="metrics"} 1' in lines
+
+
+def hash_calls(lines):
+    return next(int(line.split()[1]) for line in lines if line.startswith('auth_hash_calls_total '))
+
+
+def test_pool_and_hashing_metrics(app):
+    # El hasher de create_app es del proceso: su contador viene acumulado de otras apps
+    before = hash_calls(scrape(app))
+    app.extensions["password_hasher"].generate_password_hash("secret")
+
+    lines = scrape(app)
+
+    assert 'db_pool_size{bind="default"} 5' in lines
+    assert any(line.startswith('db_pool_checked_out{bind="default"}') for line in lines)
+    assert hash_calls(lines) == before + 1
+    assert any(line.startswith('auth_hash_run_seconds_total ') for line in lines)
+
+
+def test_jwt_verify_cache_metrics(app):
+    """Aciertos y fallos de la caché de tokens verificados, para medir su efecto bajo carga."""
+    headers = {'Authorization': f'Bearer {create_access_token(identity="test_user")}'}
+    client = app.test_client()
+    for _ in range(3):
+        assert client.get('/categories', headers=headers).status_code == 200
+
+    lines = scrape(app)
+
+    assert '# TYPE jwt_verify_cache_hits_total counter' in lines
+    assert 'jwt_verify_cache_hits_total 2' in lines
+    assert 'jwt_verify_cache_misses_total 1' in lines
+    assert 'jwt_verify_cache_size 1' in lines
+
+
+def test_multiprocess_aggregation(tmp_path):
+    """Con METRICS_DIR se suman los snapshots de todos los procesos; los gauges de procesos muertos se descartan."""
+    directory = tmp_path / "metrics"
+    app = make_app(tmp_path, METRICS_DIR=str(directory), METRICS_FLUSH_INTERVAL=0)
+    dead = subprocess.run([sys.executable, "-c", "import os; print(os.getpid())"],
+                          capture_output=True, text=True, check=True)
+    labels = [["method", "GET"], ["resource", "Categories"], ["status", "200"]]
+    for pid in (os.getppid(), int(dead.stdout)):
+        (directory / f"{pid}.json").write_text(json.dumps({
+            "pid": pid,
+            "buckets": [0.1, 1.0],
+            "counters": [["http_requests_total", labels, 3]],
+            "gauges": [["http_requests_in_flight", [["method", "GET"], ["resource", "Categories"]], 1]],
+            "histograms": [["http_request_duration_seconds", labels, [1, 1, 1, 1.5, 3]]],
+        }))
+
+    with app.app_context():
+        db.create_all()
+        lines = scrape(app)
+        db.drop_all()
+
+    assert 'http_requests_total{method="GET",resource="Categories",status="200"} 6' in lines
+    assert 'http_request_duration_seconds_count{method="GET",resource="Categories",status="200"} 6' in lines
+    assert 'http_requests_in_flight{method="GET",resource="Categories"} 1' in lines
+    # El proceso actual también vuelca su snapshot para los demás
+    assert (directory / f"{os.getpid()}.json").exists()
@@ -1,27 +1,23 @@
+import hashlib
 import pytest
-from api.models import db, User, Product, Cart, Order
-from api.controllers import OrderController
-from flask import Flask
-from flask_restful import Api
-from flask_jwt_extended import JWTManager, create_access_token
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import event, text
+from api.models import db, User, Product, Cart, Order, OrderProduct, IdempotencyKey
+from api.migrations import run_migrations
+from flask_jwt_extended import create_access_token
+from app import create_app
 
 
 @pytest.fixture
 def app():
-    app = Flask(__name__)
-    
-    # Configurar base de datos y JWT
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-    app.config['JWT_SECRET_KEY'] = 'your_secret_key'
-    
-    jwt = JWTManager(app)
-
-    api = Api(app)
-    api.add_resource(OrderController, '/orders', '/orders/<int:order_id>')
-    
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+        'JWT_SECRET_KEY': 'your_secret_key',
+        'AUTH_HASH_WORKERS': 0,
+        'API_RESOURCES': {"api.controllers:OrderController": ("/orders", "/orders/<int:order_id>")},
+    })
     with app.app_context():
-        db.init_app(app)
         db.create_all()
         yield app
         db.session.remove()
@@ -199,3 +195,272 @@ def test_validate_order_total(client, setup_data):
     assert data["total_amount"] == 200.0 * cart_item.quantity
 
 
+
+
+def test_create_order_writes_lines_and_decrements_stock(client, setup_data):
+    user = setup_data['user']
+    product = setup_data['product']
+    access_token = create_access_token(identity=str(user.id))
+
+    response = client.post('/orders', headers={'Authorization': f'Bearer {access_token}'})
+    order_id = response.get_json()['order_id']
+
+    assert response.status_code == 201
+    lines = OrderProduct.query.filter_by(order_id=order_id).all()
+    assert [(line.product_id, line.quantity, float(line.price)) for line in lines] == [(product.id, 2, 100.0)]
+    assert db.session.get(Product, product.id).stock == 48
+    assert Cart.query.filter_by(user_id=user.id).count() == 0
+
+
+def test_create_order_out_of_stock_rolls_back(client, setup_data):
+    user = setup_data['user']
+    product = setup_data['product']
+    product.stock = 1
+    db.session.commit()
+    access_token = create_access_token(identity=str(user.id))
+
+    response = client.post('/orders', headers={'Authorization': f'Bearer {access_token}'})
+
+    assert response.status_code == 409
+    assert response.get_json()['product_id'] == product.id
+    assert Order.query.count() == 0
+    assert OrderProduct.query.count() == 0
+    assert db.session.get(Product, product.id).stock == 1
+    assert Cart.query.filter_by(user_id=user.id).count() == 1
+
+
+@pytest.fixture
+def file_app(tmp_path):
+    # SQLite en archivo para que varios hilos compartan la misma base
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'checkout.db'}",
+        'SQLALCHEMY_ENGINE_OPTIONS': {"connect_args": {"timeout": 30}},
+        'JWT_SECRET_KEY': 'your_secret_key',
+        'AUTH_HASH_WORKERS': 0,
+        'API_RESOURCES': {"api.controllers:OrderController": ("/orders", "/orders/<int:order_id>")},
+    })
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.drop_all()
+        db.engine.dispose()
+
+
+def test_concurrent_checkouts_never_oversell(file_app):
+    buyers, stock = 20, 5
+    with file_app.app_context():
+        product = Product(name="Limited", price=10.0, description="Limited edition", stock=stock,
+                          category_id=1, brand_id=1, img="http://example.com/limited.jpg")
+        db.session.add(product)
+        users = [
+            User(name=f"Buyer {i}", lstF="Doe", lstM="Smith", address="123 Main St", email=f"buyer{i}@example.com",
+                 password="password123", c_pass="password123", phone="555-1234", payment="credit_card")
+            for i in range(buyers)
+        ]
+        db.session.add_all(users)
+        db.session.flush()
+        db.session.add_all([Cart(user_id=user.id, product_id=product.id, quantity=1, price=10.0, total=10.0) for user in users])
+        db.session.commit()
+        tokens = [create_access_token(identity=str(user.id)) for user in users]
+        product_id = product.id
+
+    def checkout(token):
+        with file_app.test_client() as client:
+            return client.post('/orders', headers={'Authorization': f'Bearer {token}'}).status_code
+
+    with ThreadPoolExecutor(max_workers=buyers) as pool:
+        statuses = list(pool.map(checkout, tokens))
+
+    assert statuses.count(201) == stock
+    assert set(statuses) <= {201, 409}
+    with file_app.app_context():
+        assert db.session.get(Product, product_id).stock == 0
+        assert Order.query.count() == stock
+        assert OrderProduct.query.count() == stock
+        assert Cart.query.count() == buyers - stock
+
+
+def test_concurrent_checkouts_of_the_same_cart_create_one_order(file_app):
+    """Varios POST /orders del mismo usuario: solo uno convierte el carrito, el resto recibe 409."""
+    attempts = 8
+    with file_app.app_context():
+        product = Product(name="Limited", price=10.0, description="Limited edition", stock=100,
+                          category_id=1, brand_id=1, img="http://example.com/limited.jpg")
+        user = User(name="Buyer", lstF="Doe", lstM="Smith", address="123 Main St", email="buyer@example.com",
+                    password="password123", c_pass="password123", phone="555-1234", payment="credit_card")
+        db.session.add_all([product, user])
+        db.session.flush()
+        db.session.add(Cart(user_id=user.id, product_id=product.id, quantity=1, price=10.0, total=10.0))
+        db.session.commit()
+        token = create_access_token(identity=str(user.id))
+        product_id = product.id
+
+    def checkout(_):
+        with file_app.test_client() as client:
+            return client.post('/orders', headers={'Authorization': f'Bearer {token}'}).status_code
+
+    with ThreadPoolExecutor(max_workers=attempts) as pool:
+        statuses = list(pool.map(checkout, range(attempts)))
+
+    # 400 si el carrito ya estaba vacío al leerlo, 409 si se vació durante el checkout
+    assert statuses.count(201) == 1
+    assert set(statuses) <= {201, 400, 409}
+    with file_app.app_context():
+        assert db.session.get(Product, product_id).stock == 99
+        assert Order.query.count() == 1
+        assert Cart.query.count() == 0
+
+
+def _count_queries(fn):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        fn()
+    finally:
+        event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+    return len(statements)
+
+
+def _place_orders(user, product, count):
+    """Crea ``count`` órdenes con una línea cada una, separadas por un minuto."""
+    base = datetime(2024, 1, 1)
+    orders = []
+    for i in range(count):
+        order = Order(user_id=user.id, total_amount=100 * (i + 1), created_at=base + timedelta(minutes=i))
+        db.session.add(order)
+        db.session.flush()
+        db.session.add(OrderProduct(order_id=order.id, product_id=product.id, quantity=i + 1, price=100))
+        orders.append(order)
+    db.session.commit()
+    return orders
+
+
+def test_order_history_is_paginated_newest_first(client, setup_data):
+    """Historial paginado por (created_at, id) descendente, con líneas y nombre de producto."""
+    _place_orders(setup_data['user'], setup_data['product'], 5)
+    access_token = create_access_token(identity=str(setup_data['user'].id))
+    headers = {'Authorization': f'Bearer {access_token}'}
+
+    first = client.get('/orders?limit=2', headers=headers).get_json()
+    assert [order['total_amount'] for order in first['data']] == [500.0, 400.0]
+    assert first['data'][0]['items'] == [
+        {"product_id": 1, "product_name": "Test Product", "quantity": 5, "price": 100.0}
+    ]
+
+    seen = [order['order_id'] for order in first['data']]
+    cursor = first['next_cursor']
+    while cursor:
+        page = client.get(f'/orders?limit=2&after={cursor}', headers=headers).get_json()
+        seen += [order['order_id'] for order in page['data']]
+        cursor = page['next_cursor']
+    assert seen == [5, 4, 3, 2, 1]
+
+
+def test_order_history_pages_through_current_timestamp_rows(client, setup_data):
+    """Órdenes viejas con created_at de CURRENT_TIMESTAMP (sin microsegundos): tras la migración
+    el cursor avanza en lugar de devolver siempre la primera página."""
+    for i in range(5):
+        db.session.execute(text('INSERT INTO "order" (user_id, total_amount, created_at) '
+                                'VALUES (:user_id, :total, CURRENT_TIMESTAMP)'),
+                           {"user_id": setup_data['user'].id, "total": 10 * (i + 1)})
+    db.session.commit()
+    with db.engine.begin() as connection:
+        run_migrations(connection)
+    # Una orden nueva convive con las migradas en el mismo orden
+    db.session.add(Order(user_id=setup_data['user'].id, total_amount=60))
+    db.session.commit()
+    access_token = create_access_token(identity=str(setup_data['user'].id))
+    headers = {'Authorization': f'Bearer {access_token}'}
+
+    seen, cursor = [], None
+    for _ in range(5):
+        page = client.get(f'/orders?limit=2{"&after=" + cursor if cursor else ""}', headers=headers).get_json()
+        seen += [order['order_id'] for order in page['data']]
+        cursor = page['next_cursor']
+        if not cursor:
+            break
+    assert seen == [6, 5, 4, 3, 2, 1]
+
+
+def test_order_history_query_count_is_flat(client, setup_data):
+    """Órdenes, líneas y productos en un número fijo de consultas (sin N+1)."""
+    access_token = create_access_token(identity=str(setup_data['user'].id))
+    headers = {'Authorization': f'Bearer {access_token}'}
+
+    _place_orders(setup_data['user'], setup_data['product'], 2)
+    small = _count_queries(lambda: client.get('/orders', headers=headers))
+    _place_orders(setup_data['user'], setup_data['product'], 20)
+    large = _count_queries(lambda: client.get('/orders', headers=headers))
+
+    assert small == large
+
+
+def test_get_order_detail(client, setup_data):
+    orders = _place_orders(setup_data['user'], setup_data['product'], 2)
+    access_token = create_access_token(identity=str(setup_data['user'].id))
+    headers = {'Authorization': f'Bearer {access_token}'}
+
+    response = client.get(f'/orders/{orders[1].id}', headers=headers)
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['order_id'] == orders[1].id
+    assert data['items'][0]['product_name'] == "Test Product"
+    assert data['items'][0]['quantity'] == 2
+
+    # Las órdenes de otro usuario no existen para este
+    other = create_access_token(identity="2")
+    assert client.get(f'/orders/{orders[1].id}', headers={'Authorization': f'Bearer {other}'}).status_code == 404
+
+
+def test_order_history_uses_user_created_index(app, setup_data):
+    plan = db.session.execute(text(
+        'EXPLAIN QUERY PLAN SELECT id FROM "order" WHERE user_id = 1 ORDER BY created_at DESC, id DESC LIMIT 10'
+    )).all()
+
+    assert any("ix_order_user_created" in row[-1] for row in plan)
+
+
+def test_create_order_with_idempotency_key_is_replayed(client, setup_data):
+    """Un reintento con la misma Idempotency-Key devuelve la misma orden sin crear otra."""
+    access_token = create_access_token(identity=str(setup_data['user'].id))
+    headers = {'Authorization': f'Bearer {access_token}', 'Idempotency-Key': 'checkout-1'}
+
+    first = client.post('/orders', headers=headers)
+    retry = client.post('/orders', headers=headers)
+
+    assert first.status_code == retry.status_code == 201
+    assert retry.get_json() == first.get_json()
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert "Idempotent-Replayed" not in first.headers
+    assert Order.query.count() == 1
+    assert db.session.get(Product, 1).stock == 48
+
+    # Otra llave es otra operación: el carrito ya está vacío
+    other = client.post('/orders', headers=dict(headers, **{'Idempotency-Key': 'checkout-2'}))
+    assert other.status_code == 400
+
+
+def test_idempotency_key_in_progress_or_expired(client, setup_data):
+    access_token = create_access_token(identity=str(setup_data['user'].id))
+    headers = {'Authorization': f'Bearer {access_token}', 'Idempotency-Key': 'busy'}
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    pending = IdempotencyKey(key='busy', user_id=str(setup_data['user'].id), scope='orders',
+                             request_hash=hashlib.sha256(b"POST /orders\n").hexdigest(),
+                             created_at=now, expires_at=now + timedelta(hours=1))
+    db.session.add(pending)
+    db.session.commit()
+
+    # La petición original sigue en curso
+    assert client.post('/orders', headers=headers).status_code == 409
+    assert Order.query.count() == 0
+
+    # Una reserva vencida se descarta y la petición se procesa
+    pending.expires_at = now - timedelta(seconds=1)
+    db.session.commit()
+    assert client.post('/orders', headers=headers).status_code == 201
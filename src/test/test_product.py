@@ -1,28 +1,26 @@
 import pytest
-from flask import Flask
-from flask_restful import Api
-from flask_jwt_extended import JWTManager, create_access_token
+from flask_jwt_extended import create_access_token
+from app import create_app
 from api.models import db, Product, Category, Brand
-from api.controllers import ProductResource
+from api.controllers import ProductImport
 import json
+from sqlalchemy import event, func, text
 
 
 @pytest.fixture
 def app():
-    app = Flask(__name__)
-    
-    # Configurar base de datos y JWT
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-    app.config['JWT_SECRET_KEY'] = 'your_secret_key'
-    
-    jwt = JWTManager(app)
-
-    api = Api(app)
-    api.add_resource(ProductResource, '/products', '/products/<int:product_id>')
-    
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+        'JWT_SECRET_KEY': 'your_secret_key',
+        'AUTH_HASH_WORKERS': 0,
+        'API_RESOURCES': {
+            "api.controllers:ProductResource": ("/products", "/products/<int:product_id>"),
+            "api.controllers:ProductFacets": ("/products/facets",),
+            "api.controllers:ProductImport": ("/products/import",),
+            "api.controllers:ProductBulkUpdate": ("/products/bulk",),
+        },
+    })
     with app.app_context():
-        db.init_app(app)
         db.create_all()
         yield app
         db.session.remove()
@@ -209,3 +207,319 @@ def test_create_product_invalid_data(client, setup_data):
     assert response.status_code == 400
     assert "Price must be greater than 0" in response.get_data(as_text=True)
 
+
+
+def _count_queries(app, fn):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        fn()
+    finally:
+        event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+    return len(statements)
+
+
+def test_get_products_query_count_is_flat(app, client, setup_data):
+    """El listado no debe hacer una consulta por producto (N+1)."""
+    category = setup_data['category']
+    brand = setup_data['brand']
+    access_token = create_access_token(identity="test_user")
+    headers = {'Authorization': f'Bearer {access_token}'}
+
+    def add_products(start, count):
+        db.session.add_all([
+            Product(name=f"Item {i}", price=10.0 + i, description="Bulk item", stock=i,
+                    category_id=category.id, brand_id=brand.id, img="http://example.com/item.jpg")
+            for i in range(start, start + count)
+        ])
+        db.session.commit()
+
+    add_products(0, 2)
+    small = _count_queries(app, lambda: client.get('/products', headers=headers))
+
+    add_products(2, 30)
+    response = None
+
+    def fetch():
+        nonlocal response
+        response = client.get('/products', headers=headers)
+
+    large = _count_queries(app, fetch)
+
+    assert small == large
+    data = response.get_json()
+    assert len(data) == 32
+    assert all(item['category_name'] == "Electronics" for item in data)
+    assert all(item['brand_username'] == "BrandA" for item in data)
+
+
+def test_get_products_keyset_pagination(client, setup_data):
+    category = setup_data['category']
+    brand = setup_data['brand']
+    db.session.add_all([
+        Product(name=f"Item {i}", price=5.0, description="Paged item", stock=1,
+                category_id=category.id, brand_id=brand.id, img="http://example.com/item.jpg")
+        for i in range(5)
+    ])
+    db.session.commit()
+    headers = {'Authorization': f'Bearer {create_access_token(identity="test_user")}'}
+
+    response = client.get('/products?limit=2', headers=headers)
+    page = response.get_json()
+    assert response.status_code == 200
+    assert [item['name'] for item in page['data']] == ["Item 0", "Item 1"]
+    assert page['next_cursor']
+
+    seen = [item['id'] for item in page['data']]
+    while page['next_cursor']:
+        page = client.get(f"/products?limit=2&after={page['next_cursor']}", headers=headers).get_json()
+        seen.extend(item['id'] for item in page['data'])
+    assert seen == sorted(seen)
+    assert len(seen) == 5
+
+
+def test_get_products_invalid_pagination(client, setup_data):
+    headers = {'Authorization': f'Bearer {create_access_token(identity="test_user")}'}
+
+    assert client.get('/products?limit=0', headers=headers).status_code == 400
+    assert client.get('/products?after=not-a-cursor', headers=headers).status_code == 400
+
+
+@pytest.fixture
+def catalog(setup_data):
+    category = setup_data['category']
+    brand = setup_data['brand']
+    other_category = Category(name="Books", description="Paper")
+    other_brand = Brand(username="BrandB", address="456 Brand Ave", phone="0987654321")
+    db.session.add_all([other_category, other_brand])
+    db.session.commit()
+    rows = [
+        ("Laptop", 1200, 5, category, brand),
+        ("Phone", 800, 0, category, other_brand),
+        ("Tablet", 300, 7, category, brand),
+        ("Novel", 20, 12, other_category, other_brand),
+    ]
+    db.session.add_all([
+        Product(name=name, price=price, description=f"{name} description", stock=stock,
+                category_id=cat.id, brand_id=br.id, img="http://example.com/p.jpg")
+        for name, price, stock, cat, br in rows
+    ])
+    db.session.commit()
+    return {"category": category, "brand": brand, "other_category": other_category, "other_brand": other_brand}
+
+
+def test_get_products_filters_and_sort(client, catalog):
+    headers = {'Authorization': f'Bearer {create_access_token(identity="test_user")}'}
+    category = catalog['category']
+
+    response = client.get(f'/products?category_id={category.id}&in_stock=true&sort=-price', headers=headers)
+    assert [item['name'] for item in response.get_json()] == ["Laptop", "Tablet"]
+
+    response = client.get('/products?min_price=100&max_price=900&sort=price', headers=headers)
+    assert [item['name'] for item in response.get_json()] == ["Tablet", "Phone"]
+
+    response = client.get(f"/products?brand_id={catalog['other_brand'].id}", headers=headers)
+    assert [item['name'] for item in response.get_json()] == ["Phone", "Novel"]
+
+    assert client.get('/products?sort=stock', headers=headers).status_code == 400
+
+
+def test_get_products_sorted_by_price_paginates(client, catalog):
+    headers = {'Authorization': f'Bearer {create_access_token(identity="test_user")}'}
+
+    names = []
+    page = client.get('/products?sort=-price&limit=1', headers=headers).get_json()
+    names.extend(item['name'] for item in page['data'])
+    while page['next_cursor']:
+        page = client.get(f"/products?sort=-price&limit=1&after={page['next_cursor']}", headers=headers).get_json()
+        names.extend(item['name'] for item in page['data'])
+
+    assert names == ["Laptop", "Phone", "Tablet", "Novel"]
+
+
+def test_product_facets(client, catalog):
+    headers = {'Authorization': f'Bearer {create_access_token(identity="test_user")}'}
+
+    response = client.get(f"/products/facets?in_stock=true&category_id={catalog['category'].id}", headers=headers)
+    data = response.get_json()
+
+    assert response.status_code == 200
+    # La faceta de categorías ignora su propio filtro
+    assert data['categories'] == [
+        {"id": catalog['category'].id, "name": "Electronics", "count": 2},
+        {"id": catalog['other_category'].id, "name": "Books", "count": 1},
+    ]
+    assert data['brands'] == [{"id": catalog['brand'].id, "username": "BrandA", "count": 2}]
+
+
+def test_facet_counts_use_covering_index(app, catalog):
+    query = (
+        db.session.query(Product.category_id, func.count())
+        .filter(Product.price >= 100, Product.stock > 0)
+        .group_by(Product.category_id)
+    )
+    sql = str(query.statement.compile(db.engine, compile_kwargs={"literal_binds": True}))
+    plan = " ".join(row[-1] for row in db.session.execute(text(f"EXPLAIN QUERY PLAN {sql}")))
+
+    assert "COVERING INDEX ix_product_category_price_stock" in plan
+
+
+def test_import_products_json_lines(app, client, setup_data, monkeypatch):
+    """Importa JSON lines por bloques y reporta las filas rechazadas con su línea."""
+    category = setup_data['category']
+    brand = setup_data['brand']
+    db.session.add(Product(name="Existing", price=1.0, description="Already here", stock=1,
+                           category_id=category.id, brand_id=brand.id, img="http://example.com/e.jpg"))
+    db.session.commit()
+    monkeypatch.setattr(ProductImport, "chunk_size", 2)
+    access_token = create_access_token(identity="test_user")
+
+    def line(name, **overrides):
+        return json.dumps(dict({"name": name, "price": 10.5, "description": "Imported", "stock": 3,
+                                "category_id": category.id, "brand_id": brand.id,
+                                "img": "https://example.com/i.jpg"}, **overrides))
+
+    body = "\n".join([
+        line("Phone"),
+        line("Tablet", price=0),
+        "not json",
+        line("Existing"),
+        line("Phone"),
+        line("Watch", category_id=999),
+        line("Camera", img="ftp://example.com/c.jpg"),
+        line("Speaker", stock="7"),
+        line("Lamp", img=""),
+        json.dumps({"name": "Mug", "price": 4, "description": "No image", "stock": 1,
+                    "category_id": category.id, "brand_id": brand.id}),
+        line(["Listed"]),
+        line(True),
+        line("Rug", description={"en": "Rug"}),
+        line("Vase", img=["https://example.com/v.jpg"]),
+        line("Desk", category_id=True),
+        line("Shelf", brand_id=[brand.id]),
+        line("Chair"),
+    ])
+    response = client.post('/products/import', data=body, content_type='application/x-ndjson',
+                           headers={'Authorization': f'Bearer {access_token}'})
+
+    assert response.status_code == 201
+    report = response.get_json()
+    assert report["created"] == 3
+    assert report["errors"] == [
+        {"line": 2, "message": "Price must be greater than 0"},
+        {"line": 3, "message": "Invalid JSON"},
+        {"line": 4, "message": "Product already exists"},
+        {"line": 5, "message": "Product already exists"},
+        {"line": 6, "message": "Category not found"},
+        {"line": 7, "message": "Image URL must start with 'http://' or 'https://'"},
+        {"line": 9, "message": "Image URL is required"},
+        {"line": 10, "message": "Image URL is required"},
+        {"line": 11, "message": "Name must be a string"},
+        {"line": 12, "message": "Name must be a string"},
+        {"line": 13, "message": "description must be a string"},
+        {"line": 14, "message": "Image URL must be a string"},
+        {"line": 15, "message": "Category ID and Brand ID must be valid integers"},
+        {"line": 16, "message": "Category ID and Brand ID must be valid integers"},
+    ]
+    speaker = Product.query.filter_by(name="Speaker").one()
+    assert speaker.stock == 7 and speaker.created_at is not None
+    assert Product.query.filter_by(name="Chair").count() == 1
+
+
+def test_import_products_csv_uses_set_based_lookups(app, client, setup_data):
+    """El número de consultas depende de los bloques, no de las filas."""
+    category = setup_data['category']
+    brand = setup_data['brand']
+    access_token = create_access_token(identity="test_user")
+    rows = [f"Item {i},{5 + i},From CSV,{i},{category.id},{brand.id},http://example.com/{i}.jpg" for i in range(50)]
+    body = "name,price,description,stock,category_id,brand_id,img\n" + "\n".join(rows) + "\n"
+    response = None
+
+    def post():
+        nonlocal response
+        response = client.post('/products/import', data=body, content_type='text/csv',
+                               headers={'Authorization': f'Bearer {access_token}'})
+
+    statements = _count_queries(app, post)
+
+    assert response.status_code == 201
+    assert response.get_json()["created"] == 50
+    assert statements <= 5
+    assert db.session.query(func.count(Product.id)).scalar() == 50
+    assert float(Product.query.filter_by(name="Item 3").one().price) == 8.0
+
+
+def test_import_products_rejects_everything(client, setup_data):
+    access_token = create_access_token(identity="test_user")
+    headers = {'Authorization': f'Bearer {access_token}'}
+
+    response = client.post('/products/import', data="name,price\n,abc\n", content_type='text/csv', headers=headers)
+    assert response.status_code == 400
+    assert response.get_json()["errors"] == [{"line": 2, "message": "Name cannot be empty"}]
+
+    assert client.post('/products/import', data="", content_type='application/x-ndjson', headers=headers).status_code == 400
+
+
+@pytest.fixture
+def stocked(setup_data):
+    """Tres productos con stock conocido."""
+    products = [
+        Product(name=f"Stocked {i}", price=10.0, description="Warehouse item", stock=5,
+                category_id=setup_data['category'].id, brand_id=setup_data['brand'].id,
+                img="http://example.com/s.jpg")
+        for i in range(3)
+    ]
+    db.session.add_all(products)
+    db.session.commit()
+    return [product.id for product in products]
+
+
+def test_bulk_update_products(app, client, stocked):
+    """Valores absolutos y ajustes relativos en una transacción, un UPDATE por forma."""
+    first, second, third = stocked
+    access_token = create_access_token(identity="test_user")
+    items = [
+        {"id": first, "stock": 20, "price": 12.5},
+        {"id": second, "stock_delta": -2},
+        {"id": third, "stock_delta": -9},
+        {"id": 999, "price": 3.0},
+        {"id": first, "price": 1.0},
+        {"id": second, "price": -1},
+        {"id": third},
+    ]
+    response = None
+
+    def patch():
+        nonlocal response
+        response = client.patch('/products/bulk', json={"items": items},
+                                headers={'Authorization': f'Bearer {access_token}'})
+
+    statements = _count_queries(app, patch)
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["updated"] == 2
+    assert data["missing"] == 1 and data["missing_ids"] == [999]
+    assert [item["id"] for item in data["rejected"]] == [first, second, third, third]
+    assert data["rejected"][-1]["message"].startswith("Stock cannot be negative")
+    assert statements <= 3
+
+    db.session.expire_all()
+    assert [(float(p.price), p.stock) for p in Product.query.order_by(Product.id)] == [(12.5, 20), (10.0, 3), (10.0, 5)]
+
+
+def test_bulk_update_products_invalid_body(client, stocked):
+    access_token = create_access_token(identity="test_user")
+    headers = {'Authorization': f'Bearer {access_token}'}
+
+    assert client.patch('/products/bulk', json={"items": []}, headers=headers).status_code == 400
+    assert client.patch('/products/bulk', json=[{"id": stocked[0], "stock": 1}], headers=headers).status_code == 400
+
+    # JSON true no es el id 1
+    response = client.patch('/products/bulk', json={"items": [{"id": True, "stock": 3}]}, headers=headers)
+    assert response.get_json()["rejected"] == [{"id": True, "message": "Product ID must be greater than 0."}]
+    assert response.get_json()["missing"] == 0
@@ -0,0 +1,70 @@
+import logging
+
+import pytest
+from flask_jwt_extended import create_access_token
+from api.models import db, Category
+from app import create_app
+
+
+def make_app(**config):
+    return create_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+        'JWT_SECRET_KEY': 'your_secret_key',
+        'AUTH_HASH_WORKERS': 0,
+        'API_RESOURCES': {"api.controllers:Categories": ("/categories", "/categories/<int:category_id>")},
+        **config,
+    })
+
+
+@pytest.fixture
+def app():
+    app = make_app(QUERY_STATS_HEADERS=True)
+    with app.app_context():
+        db.create_all()
+        db.session.add(Category(name="Books", description="All about books"))
+        db.session.commit()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def get_categories(app):
+    access_token = create_access_token(identity="test_user")
+    return app.test_client().get('/categories', headers={'Authorization': f'Bearer {access_token}'})
+
+
+def test_query_count_and_time_headers(app):
+    """Cada respuesta informa cuántas consultas hizo y cuánto tardaron."""
+    response = get_categories(app)
+
+    assert response.status_code == 200
+    # Estado para el ETag + el listado
+    assert response.headers["X-DB-Query-Count"] == "2"
+    assert float(response.headers["X-DB-Time-ms"]) >= 0
+
+    # El contador es por petición, no acumulado; el listado ya sale de la caché de respuestas
+    assert get_categories(app).headers["X-DB-Query-Count"] == "1"
+
+
+def test_headers_only_in_debug_by_default():
+    app = make_app()
+    with app.app_context():
+        db.create_all()
+        assert "X-DB-Query-Count" not in get_categories(app).headers
+
+        app.debug = True
+        # Solo el estado para el ETag: el listado ya está en la caché de respuestas
+        assert get_categories(app).headers["X-DB-Query-Count"] == "1"
+        db.drop_all()
+
+
+def test_slow_queries_are_logged_with_endpoint(caplog):
+    app = make_app(QUERY_SLOW_THRESHOLD_MS=0)
+    with app.app_context():
+        db.create_all()
+        with caplog.at_level(logging.WARNING, logger="api.middleware.query_stats"):
+            get_categories(app)
+        db.drop_all()
+
+    messages = [record.getMessage() for record in caplog.records]
+    assert any("in categories:" in message and "FROM category" in message for message in messages)
@@ -0,0 +1,150 @@
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+from flask_jwt_extended import create_access_token
+from api.models import db, User, Product, Cart, Order, OrderProduct, SalesRollup
+from api.rollups import rebuild_rollups
+from app import create_app
+
+
+@pytest.fixture
+def app():
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+        'JWT_SECRET_KEY': 'your_secret_key',
+        'AUTH_HASH_WORKERS': 0,
+        'API_RESOURCES': {
+            "api.controllers:OrderController": ("/orders", "/orders/<int:order_id>"),
+            "api.reports_resource:SalesReport": ("/reports/sales",),
+        },
+    })
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def admin_headers():
+    token = create_access_token(identity="1", additional_claims={"role": 1})
+    return {'Authorization': f'Bearer {token}'}
+
+
+@pytest.fixture
+def setup_data(app):
+    """Un usuario y tres productos: dos de la categoría 1 / marca 1 y uno de la categoría 2 / marca 2."""
+    user = User(name="Test User", lstF="Doe", lstM="Smith", address="123 Main St", email="test@example.com",
+                password="hashed", c_pass="hashed", phone="555-1234", payment="credit_card")
+    products = [
+        Product(name=f"Product {i}", price=price, description="Rollup", stock=100, category_id=category,
+                brand_id=category, img="http://example.com/p.jpg")
+        for i, (price, category) in enumerate([(10.0, 1), (25.0, 1), (4.5, 2)])
+    ]
+    db.session.add(user)
+    db.session.add_all(products)
+    db.session.commit()
+    return {"user": user, "products": products,
+            "headers": {'Authorization': f'Bearer {create_access_token(identity=str(user.id))}'}}
+
+
+def _checkout(client, setup_data, quantities):
+    user = setup_data['user']
+    for product, quantity in zip(setup_data['products'], quantities):
+        if quantity:
+            db.session.add(Cart(user_id=user.id, product_id=product.id, quantity=quantity, price=product.price,
+                                total=product.price * quantity))
+    db.session.commit()
+    response = client.post('/orders', headers=setup_data['headers'])
+    assert response.status_code == 201
+    return response.get_json()['order_id']
+
+
+def _rollups():
+    return {(row.dimension, row.key_id, row.day): (row.units, round(float(row.revenue), 2))
+            for row in SalesRollup.query.all()}
+
+
+def test_checkout_updates_rollups(client, setup_data):
+    _checkout(client, setup_data, [2, 1, 0])
+    _checkout(client, setup_data, [1, 0, 4])
+    today = datetime.now(timezone.utc).date()
+
+    assert _rollups() == {
+        ('product', 1, today): (3, 30.0),
+        ('product', 2, today): (1, 25.0),
+        ('product', 3, today): (4, 18.0),
+        ('category', 1, today): (4, 55.0),
+        ('category', 2, today): (4, 18.0),
+        ('brand', 1, today): (4, 55.0),
+        ('brand', 2, today): (4, 18.0),
+    }
+
+
+def test_deleting_an_order_subtracts_its_lines(client, setup_data):
+    _checkout(client, setup_data, [2, 0, 0])
+    order_id = _checkout(client, setup_data, [1, 0, 0])
+
+    assert client.delete(f'/orders/{order_id}', headers=setup_data['headers']).status_code == 200
+
+    today = datetime.now(timezone.utc).date()
+    assert _rollups()[('product', 1, today)] == (2, 20.0)
+    assert _rollups()[('category', 1, today)] == (2, 20.0)
+
+
+def test_rebuild_matches_incremental_rollups(client, setup_data):
+    _checkout(client, setup_data, [2, 1, 0])
+    _checkout(client, setup_data, [0, 3, 1])
+    # Orden anterior a la columna price: se valora al precio actual del producto
+    old = Order(user_id=setup_data['user'].id, total_amount=20.0, created_at=datetime(2024, 3, 1, 23, 59))
+    db.session.add(old)
+    db.session.flush()
+    db.session.add(OrderProduct(order_id=old.id, product_id=1, quantity=2, price=None))
+    db.session.commit()
+    incremental = _rollups()
+
+    assert rebuild_rollups(chunk_size=1) == (3, 10)
+
+    rebuilt = _rollups()
+    assert rebuilt.pop(('product', 1, date(2024, 3, 1))) == (2, 20.0)
+    assert rebuilt.pop(('category', 1, date(2024, 3, 1))) == (2, 20.0)
+    assert rebuilt.pop(('brand', 1, date(2024, 3, 1))) == (2, 20.0)
+    assert rebuilt == incremental
+
+
+def test_sales_report_totals_and_by_day(client, setup_data, admin_headers):
+    _checkout(client, setup_data, [2, 1, 4])
+    yesterday = datetime.now(timezone.utc).date() - timedelta(days=1)
+    db.session.add(SalesRollup(dimension='category', key_id=2, day=yesterday, units=10, revenue=45.0))
+    db.session.commit()
+
+    response = client.get('/reports/sales?dimension=category', headers=admin_headers)
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['dimension'] == 'category'
+    assert body['data'] == [{"id": 2, "units": 14, "revenue": 63.0}, {"id": 1, "units": 3, "revenue": 45.0}]
+
+    response = client.get(f'/reports/sales?dimension=category&group=day&id=2&from={yesterday.isoformat()}',
+                          headers=admin_headers)
+    assert [(row['day'], row['units']) for row in response.get_json()['data']] == [
+        (yesterday.isoformat(), 10), ((yesterday + timedelta(days=1)).isoformat(), 4)]
+
+    response = client.get('/reports/sales?dimension=product&limit=1', headers=admin_headers)
+    assert response.get_json()['data'] == [{"id": 2, "units": 1, "revenue": 25.0}]
+
+
+def test_sales_report_is_admin_only_and_validates(client, setup_data, admin_headers):
+    assert client.get('/reports/sales', headers=setup_data['headers']).status_code == 403
+    assert client.get('/reports/sales?dimension=user', headers=admin_headers).status_code == 400
+    assert client.get('/reports/sales?group=week', headers=admin_headers).status_code == 400
+    assert client.get('/reports/sales?from=yesterday', headers=admin_headers).status_code == 400
+    assert client.get('/reports/sales?from=2024-02-01&to=2024-01-01', headers=admin_headers).status_code == 400
+    assert client.get('/reports/sales?from=2022-01-01&to=2024-01-01', headers=admin_headers).status_code == 400
+    assert client.get('/reports/sales?limit=-1', headers=admin_headers).status_code == 400
+    assert client.get('/reports/sales?limit=0', headers=admin_headers).status_code == 400
+    assert client.get('/reports/sales?limit=many', headers=admin_headers).status_code == 400
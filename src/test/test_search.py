@@ -0,0 +1,107 @@
+import pytest
+from flask_jwt_extended import create_access_token
+from api.models import db, Product, Category, Brand
+from app import create_app
+
+
+@pytest.fixture
+def app():
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+        'JWT_SECRET_KEY': 'your_secret_key',
+        'AUTH_HASH_WORKERS': 0,
+        'API_RESOURCES': {
+            "api.controllers:ProductResource": ("/products", "/products/<int:product_id>"),
+            "api.controllers:ProductSearch": ("/products/search",),
+        },
+    })
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def headers():
+    return {'Authorization': f'Bearer {create_access_token(identity="test_user")}'}
+
+
+@pytest.fixture
+def setup_data(app):
+    """Crea un catálogo pequeño para las búsquedas."""
+    category = Category(name="Electronics", description="Gadgets and devices")
+    brand = Brand(username="BrandA", address="123 Brand St", phone="1234567890")
+    db.session.add_all([category, brand])
+    db.session.commit()
+    products = [
+        Product(name="Gaming Laptop", price=1500, description="Laptop with a fast laptop GPU", stock=3,
+                category_id=category.id, brand_id=brand.id, img="http://example.com/1.jpg"),
+        Product(name="Office Laptop", price=700, description="Light and quiet", stock=8,
+                category_id=category.id, brand_id=brand.id, img="http://example.com/2.jpg"),
+        Product(name="Cámara", price=400, description="Mirrorless camera", stock=2,
+                category_id=category.id, brand_id=brand.id, img="http://example.com/3.jpg"),
+    ]
+    db.session.add_all(products)
+    db.session.commit()
+    return {"category": category, "brand": brand, "products": products}
+
+
+def test_search_ranks_hits(client, setup_data, headers):
+    response = client.get('/products/search?q=laptop', headers=headers)
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert [item['name'] for item in data] == ["Gaming Laptop", "Office Laptop"]
+    assert data[0]['score'] >= data[1]['score']
+    assert data[0]['category_name'] == "Electronics"
+    assert data[0]['brand_username'] == "BrandA"
+
+
+def test_search_prefix_and_diacritics(client, setup_data, headers):
+    response = client.get('/products/search?q=camar', headers=headers)
+
+    assert [item['name'] for item in response.get_json()] == ["Cámara"]
+
+
+def test_search_is_paginated(client, setup_data, headers):
+    first = client.get('/products/search?q=laptop&limit=1', headers=headers).get_json()
+    assert len(first['data']) == 1
+    assert first['next_cursor']
+
+    second = client.get(f"/products/search?q=laptop&limit=1&after={first['next_cursor']}", headers=headers).get_json()
+    assert [item['name'] for item in second['data']] == ["Office Laptop"]
+    assert second['next_cursor'] is None
+
+
+def test_search_index_follows_writes(client, setup_data, headers):
+    response = client.post('/products', json={
+        "name": "Tablet", "price": 300, "description": "Portable tablet", "stock": 4,
+        "category_id": setup_data['category'].id, "brand_id": setup_data['brand'].id,
+        "img": "http://example.com/tablet.jpg",
+    }, headers=headers)
+    product_id = response.get_json()['id']
+    assert [item['id'] for item in client.get('/products/search?q=tablet', headers=headers).get_json()] == [product_id]
+
+    client.patch(f'/products/{product_id}', json={
+        "name": "Phablet", "price": 300, "description": "Portable phablet", "stock": 4,
+        "category_id": setup_data['category'].id, "brand_id": setup_data['brand'].id,
+        "img": "http://example.com/tablet.jpg",
+    }, headers=headers)
+    assert client.get('/products/search?q=tablet', headers=headers).get_json() == []
+    assert len(client.get('/products/search?q=phablet', headers=headers).get_json()) == 1
+
+    client.delete(f'/products/{product_id}', headers=headers)
+    assert client.get('/products/search?q=phablet', headers=headers).get_json() == []
+
+
+def test_search_rejects_empty_query(client, setup_data, headers):
+    response = client.get('/products/search?q=%22%20*', headers=headers)
+
+    assert response.status_code == 400
+    assert "cannot be empty" in response.get_data(as_text=True)
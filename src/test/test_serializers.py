@@ -0,0 +1,66 @@
+import json
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from flask import Flask
+from flask_restful import fields, marshal
+from api.models import Product, Category
+from api.controllers import product_fields, user_fields, category_fields, brand_fields, search_fields
+from api.serializers import compile_fields, output_json, rfc822
+
+
+def make_product(i, **overrides):
+    values = dict(
+        id=i, name=f"Product {i}", price=Decimal("10.50") + i, description="Ñandú & \"quotes\"", stock=i,
+        img="http://example.com/p.jpg", created_at=datetime(2024, 2, 29, 23, 59, 58) + timedelta(hours=i),
+        updated_at=datetime(1999, 12, 31, 0, 0, 1),
+    )
+    values.update(overrides)
+    product = Product(**values)
+    product.category_name = "Electronics"
+    product.brand_username = None
+    return product
+
+
+@pytest.mark.parametrize("field_map", [product_fields, user_fields, category_fields, brand_fields, search_fields])
+def test_compiled_fields_match_marshal(field_map):
+    rows = [make_product(1), make_product(2, stock=None, created_at=None, name=None, price=None), {"id": 3, "name": 7}]
+    rows[0].score = 1.5
+
+    assert json.dumps(compile_fields(field_map)(rows)) == json.dumps(marshal(rows, field_map))
+    assert json.dumps(compile_fields(field_map)(rows[0])) == json.dumps(marshal(rows[0], field_map))
+
+
+def test_unsupported_fields_fall_back_to_marshal():
+    field_map = {
+        "id": fields.Integer,
+        "label": fields.String(attribute=lambda row: f"#{row.id}"),
+        "category": fields.Nested({"name": fields.String}, attribute="category"),
+        "dates": {"created": fields.DateTime(dt_format="iso8601", attribute="created_at")},
+    }
+    product = make_product(5)
+    product.category = Category(name="Books", description="Paper")
+
+    assert compile_fields(field_map)(product) == json.loads(json.dumps(marshal(product, field_map)))
+
+
+def test_rfc822_matches_flask_restful():
+    start = datetime(1969, 12, 31, 23, 0, 0)
+    for hours in range(0, 24 * 800, 37):
+        value = start + timedelta(hours=hours, seconds=hours % 60)
+        assert rfc822(value) == fields._rfc822(value)
+
+
+def test_output_json_body_parses_to_same_document():
+    app = Flask(__name__)
+    data = compile_fields(product_fields)([make_product(1), make_product(2)])
+
+    with app.test_request_context():
+        response = output_json(data, 200, {"X-Next-Cursor": "abc"})
+
+    assert response.status_code == 200
+    assert response.mimetype == "application/json"
+    assert response.headers["X-Next-Cursor"] == "abc"
+    assert response.get_data().endswith(b"\n")
+    assert json.loads(response.get_data()) == json.loads(json.dumps(marshal([make_product(1), make_product(2)], product_fields)))
@@ -0,0 +1,54 @@
+import pytest
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import text
+
+from api.sqlite_pragmas import SQLitePragmas
+
+
+def make_app(tmp_path, name='tuned.db', **config):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / name}"
+    app.config.update(config)
+    db = SQLAlchemy()
+    db.init_app(app)
+    SQLitePragmas(db).init_app(app)
+    return app, db
+
+
+def pragma(db, name):
+    return db.session.execute(text(f"PRAGMA {name}")).scalar()
+
+
+def test_pragmas_applied_on_every_connection(tmp_path):
+    """Cada conexión nueva sale con WAL, busy_timeout, synchronous=NORMAL, etc."""
+    app, db = make_app(tmp_path)
+    with app.app_context():
+        assert pragma(db, "journal_mode") == "wal"
+        assert pragma(db, "busy_timeout") == 5000
+        assert pragma(db, "synchronous") == 1  # NORMAL
+        assert pragma(db, "cache_size") == -64000
+        assert pragma(db, "temp_store") == 2  # MEMORY
+
+        # Una segunda conexión del pool también queda configurada
+        with db.engine.connect() as first, db.engine.connect() as second:
+            assert second.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+
+
+def test_pragmas_are_configurable(tmp_path):
+    """SQLITE_PRAGMAS cambia u omite valores; SQLITE_PRAGMAS_ENABLED los desactiva."""
+    app, db = make_app(tmp_path, SQLITE_PRAGMAS={"busy_timeout": 250, "mmap_size": None})
+    with app.app_context():
+        assert pragma(db, "busy_timeout") == 250
+        assert pragma(db, "mmap_size") == 0
+        assert pragma(db, "journal_mode") == "wal"
+
+    app, db = make_app(tmp_path, "plain.db", SQLITE_PRAGMAS_ENABLED=False)
+    with app.app_context():
+        assert pragma(db, "journal_mode") == "delete"
+        assert pragma(db, "synchronous") == 2  # FULL, el valor por defecto
+
+
+def test_invalid_pragma_name_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        make_app(tmp_path, SQLITE_PRAGMAS={"journal_mode; DROP TABLE user": "x"})